@@ -1,2 +1,2 @@
-from .agent_minimax import generate_move_minimax
+from .agent_minimax import generate_move_minimax, generate_move_minimax_worker
 from .agent_human_user import user_move
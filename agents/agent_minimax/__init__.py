@@ -1 +1,2 @@
 from .minimax import generate_move_minimax
+from .search_worker import generate_move_minimax_worker
@@ -1,37 +1,67 @@
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Callable, TYPE_CHECKING
+import functools
+import logging
 import multiprocessing
+import multiprocessing.connection
 import multiprocessing.sharedctypes
+import time
 
 from agents.game_utils import *
 from agents.saved_state import SavedState
-from agents.agent_minimax.minimax_window_list import MINIMAX_EVALUATION_WINDOWS_LIST
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.time_control import SearchDeadline, GameClock, StableBestMove, get_time_budget, \
+    STABLE_ITERATIONS
+from agents.agent_minimax.threats import get_immediate_win, get_threat_aware_moves
+from agents.agent_minimax.position_cache import PositionCache, get_distance_of_score, get_score_of_distance
+from agents.agent_minimax.search_statistics import SearchStatistics
+
+if TYPE_CHECKING:  # The opening book itself builds on this module.
+    from agents.agent_minimax.opening_book import OpeningBook
+from agents.agent_minimax.minimax_window_list import MINIMAX_EVALUATION_WINDOWS_LIST, \
+    MINIMAX_EVALUATION_WINDOWS_BY_POSITION, MINIMAX_EVALUATION_WINDOW_DIRECTIONS
+from agents.agent_minimax.transposition_table import TranspositionTable, SharedTranspositionTable, BOUND_EXACT, \
+    BOUND_LOWER, BOUND_UPPER, NO_MOVE, START_VALUE, is_mate_evaluation, mirror_player_board, canonical_position_key, \
+    get_entry_from_transposition_table, save_entry_in_transposition_table
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 SECONDS_TO_PLAY: int = 5
 DEPTH_TO_PLAY: int = 8
+SECONDS_TO_RETURN_STATE: int = 5
 
-START_VALUE: int = 100
 MAX_VALUE: int = 1_000_000_000_000_000_000
 THREE_PIECES_IN_A_WINDOW_EVAL: int = 6
 EVAL_DRAWN_POSITION: int = 0
 
-COLUMN_0_FILLED: int = 0b0111111_0000000_0000000_0000000_0000000_0000000_0000000
-COLUMN_1_FILLED: int = 0b0000000_0111111_0000000_0000000_0000000_0000000_0000000
-COLUMN_2_FILLED: int = 0b0000000_0000000_0111111_0000000_0000000_0000000_0000000
-COLUMN_3_FILLED: int = 0b0000000_0000000_0000000_0111111_0000000_0000000_0000000
-COLUMN_4_FILLED: int = 0b0000000_0000000_0000000_0000000_0111111_0000000_0000000
-COLUMN_5_FILLED: int = 0b0000000_0000000_0000000_0000000_0000000_0111111_0000000
-COLUMN_6_FILLED: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0111111
+SINGLE_COLUMN_FILLED: int = 0b1111111
 
-SHIFT_6_COLUMNS: int = 42
-SHIFT_4_COLUMNS: int = 28
-SHIFT_2_COLUMNS: int = 14
+
+class SearchInterrupted(Exception):
+    """
+    Raised inside the search when it was asked to stop, to leave the recursion without storing unfinished results.
+    Carries the best evaluation of the root if the first root move was already searched completely.
+    """
+    pass
 
 
 def generate_move_minimax(board_player_one: int, board_player_two: int, player: BoardPiece,
-                          saved_state: Optional[SavedState], seconds: int = SECONDS_TO_PLAY) -> Tuple[
-    PlayerAction, Optional[SavedState]]:
+                          saved_state: Optional[SavedState], seconds: int = SECONDS_TO_PLAY,
+                          evaluate_board: Optional[Callable[[int, int], int]] = None,
+                          milliseconds: Optional[int] = None, game_milliseconds: Optional[int] = None,
+                          increment_milliseconds: int = 0, processes: int = 1,
+                          search_function: Optional[Callable[..., list]] = None,
+                          opening_book: Optional["OpeningBook"] = None,
+                          on_info: Optional[Callable[[dict], Optional[bool]]] = None,
+                          stable_iterations: Optional[int] = STABLE_ITERATIONS) -> \
+        Tuple[PlayerAction, Optional[SavedState]]:
     """
-    Starting point to use the minimax algorithm. Handles the interrupting after the amount of seconds given.
+    Starting point to use the minimax algorithm. Handles the interrupting after the amount of seconds given, the search
+    also stops itself when the time is over or it stops early, see generate_move_loop_to_stop. Moves of the opening
+    book, moves winning right away, the only move not losing right away and moves of the position cache of the saved
+    state are returned without searching, and positions with few enough empty cells for the remaining time are solved
+    exactly instead, see solve_endgame. Solved positions are saved in the position cache. The search process reports
+    every iteration of the iterative deepening to the info callback, see create_search_info, which can stop the
+    search.
     Parameters
     ----------
     board_player_one: int
@@ -41,33 +71,206 @@ def generate_move_minimax(board_player_one: int, board_player_two: int, player:
     player: BoardPiece
         The next player to make a move.
     saved_state: Optional[SavedState]
-        Can be used to save a state of the game for future calculations. Not used here.
+        State of the agent from its previous move, containing the transposition table. A new state with a shared
+        transposition table is created if it is not a MinimaxSavedState.
     seconds: int
         Time given for minimax-calculation.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, e.g. evaluate_board_using_bitboards. The evaluation is
+        updated incrementally with every move if it is None.
+    milliseconds: Optional[int]
+        Time given for minimax-calculation in milliseconds, replaces the seconds if it is not None.
+    game_milliseconds: Optional[int]
+        Time for the whole game. If it is given, a game clock is kept in the saved state and the time of every move is
+        taken from it.
+    increment_milliseconds: int
+        Time added to the game clock after every move.
+    processes: int
+        Number of processes searching the root moves in parallel, the search is not parallel if it is 1. The pool of
+        processes is started for every move, generate_move_minimax_worker keeps it for the whole game.
+    search_function: Optional[Callable[..., list]]
+        Search of a single depth with the arguments of generate_move_minimax_id, e.g. generate_move_negamax_id.
+        generate_move_minimax_id is used if it is None.
+    opening_book: Optional[OpeningBook]
+        Book to look up the move in before searching, the book is not used if it is None.
+    on_info: Optional[Callable[[dict], Optional[bool]]]
+        Called with the info of every iteration of the search, see create_search_info. The search is stopped if it
+        returns True.
+    stable_iterations: Optional[int]
+        Number of iterations in a row with the same best move after which the search may stop early, see
+        StableBestMove. The search uses the whole time if it is None.
 
     Returns
     -------
     :Tuple[PlayerAction, Optional[SavedState]]
-        Tuple containing the move to play and the saved state.
+        Tuple containing the move to play and the saved state containing the updated transposition table.
     """
+    start_time: float = time.monotonic()
+    if not isinstance(saved_state, MinimaxSavedState):
+        saved_state = MinimaxSavedState(shared_transposition_table=True)
+    if game_milliseconds is not None and saved_state.clock is None:
+        saved_state.clock = GameClock(milliseconds=game_milliseconds, increment_milliseconds=increment_milliseconds)
+    seconds = get_time_budget(seconds=seconds, milliseconds=milliseconds, clock=saved_state.clock,
+                              board_player_one=board_player_one, board_player_two=board_player_two)
+    clock: Optional[GameClock] = saved_state.clock
+    known_move: Optional[PlayerAction] = None
+    if opening_book is not None:
+        known_move = opening_book.get_move(board_player_one=board_player_one, board_player_two=board_player_two)
+    if known_move is None:
+        known_move = get_immediate_win(board_player_one=board_player_one, board_player_two=board_player_two,
+                                       player=player)
+    if known_move is None:
+        known_move = get_single_move(board_player_one=board_player_one, board_player_two=board_player_two,
+                                     player=player)
+    position_cache: Optional[PositionCache] = saved_state.position_cache
+    if known_move is None and position_cache is not None:
+        proven_result: Optional[tuple[int, PlayerAction]] = position_cache.get_entry(
+            board_player_one=board_player_one, board_player_two=board_player_two)
+        if proven_result is not None:
+            known_move = proven_result[1]
+    if known_move is None:
+        # Imported here, the solver itself builds on this module.
+        from agents.agent_minimax.solver import solve_endgame, SOLVER_TRANSPOSITION_TABLE_SIZE_MB
+        if saved_state.solver_transposition_table is None:
+            saved_state.solver_transposition_table = TranspositionTable(size_mb=SOLVER_TRANSPOSITION_TABLE_SIZE_MB)
+        solved: Optional[tuple[int, PlayerAction]] = solve_endgame(
+            board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+            seconds=start_time + seconds - time.monotonic(),
+            transposition_table=saved_state.solver_transposition_table)
+        if solved is not None:
+            known_move = solved[1]
+            if position_cache is not None:
+                position_cache.store_entry(board_player_one=board_player_one, board_player_two=board_player_two,
+                                           score=solved[0], move=solved[1])
+    if known_move is not None:
+        saved_state.depth, saved_state.evaluation, saved_state.nodes = 0, None, 0
+        if saved_state.statistics is not None:
+            saved_state.statistics.new_search()
+        if clock is not None:
+            clock.update(used_milliseconds=round((time.monotonic() - start_time) * 1000))
+        return known_move, saved_state
     depth: int = 1  # Starting with depth one.
-    move_output: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    solver_transposition_table: Optional[TranspositionTable] = saved_state.solver_transposition_table
+    # Played if no depth is finished in time.
+    move_output: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', get_fallback_move(
+        board_player_one=board_player_one, board_player_two=board_player_two, player=player))
+    stop_flag: multiprocessing.sharedctypes.Synchronized = multiprocessing.RawValue('b', False)
+    state_receiver, state_sender = multiprocessing.Pipe(duplex=False)
+    info_receiver, info_sender = None, None
+    if on_info is not None:
+        info_receiver, info_sender = multiprocessing.Pipe(duplex=False)
 
     loop_over_flag = multiprocessing.Event()
-    process_minimax = multiprocessing.Process(target=generate_move_loop_to_stop,
+    process_minimax = multiprocessing.Process(target=generate_move_process,
                                               args=(move_output, board_player_one, board_player_two, player, depth,
-                                                    loop_over_flag))
+                                                    loop_over_flag, saved_state, stop_flag, state_sender,
+                                                    evaluate_board, start_time + seconds, processes,
+                                                    search_function, info_sender, stable_iterations))
     process_minimax.start()
-    loop_over_flag.wait(seconds)
-    process_minimax.terminate()
-    process_minimax.join()
-    return move_output.value, None
+    if info_receiver is None:
+        loop_over_flag.wait(seconds)
+    else:
+        receive_search_info(info_receiver=info_receiver, deadline=start_time + seconds, on_info=on_info)
+    stop_flag.value = True  # The search stops at the next node and sends back the saved state.
+    if state_receiver.poll(SECONDS_TO_RETURN_STATE):
+        received_state: MinimaxSavedState = state_receiver.recv()
+        if not isinstance(saved_state.transposition_table, SharedTranspositionTable):
+            saved_state = received_state  # Otherwise, the search already wrote into the table of this process.
+        saved_state.depth = received_state.depth
+        saved_state.evaluation = received_state.evaluation
+        saved_state.nodes = received_state.nodes
+        saved_state.statistics = received_state.statistics
+        saved_state.solver_transposition_table = solver_transposition_table
+    process_minimax.join(SECONDS_TO_RETURN_STATE)
+    if process_minimax.is_alive():
+        process_minimax.terminate()
+        process_minimax.join()
+    if clock is not None:
+        saved_state.clock = clock
+        clock.update(used_milliseconds=round((time.monotonic() - start_time) * 1000))
+    return move_output.value, saved_state
+
+
+def generate_move_process(move_output: multiprocessing.sharedctypes.Synchronized, board_player_one: int,
+                          board_player_two: int, player: BoardPiece, depth: int,
+                          loop_over_flag: multiprocessing.Event, saved_state: MinimaxSavedState,
+                          stop_flag: multiprocessing.sharedctypes.Synchronized,
+                          state_sender: multiprocessing.connection.Connection,
+                          evaluate_board: Optional[Callable[[int, int], int]] = None, deadline: Optional[float] = None,
+                          processes: int = 1, search_function: Optional[Callable[..., list]] = None,
+                          info_sender: Optional[multiprocessing.connection.Connection] = None,
+                          stable_iterations: Optional[int] = STABLE_ITERATIONS):
+    """
+    Target of the process running the iterative deepening. Sends the saved state back to the parent process after the
+    search has finished or was stopped, with the deepest depth searched completely, its evaluation and the number of
+    nodes searched, but without the table of the solver, which the parent process keeps. If there is an info
+    connection, the info of every iteration is sent through it, followed by None when the search is over.
+
+    Parameters
+    ----------
+    move_output: multiprocessing.sharedctypes.Synchronized
+        Variable to return the move in - needed for execution in another process.
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    depth: int
+        Depth to start the iterative deepening with.
+    loop_over_flag: multiprocessing.Event
+        Event to stop loop if all moves are calculated.
+    saved_state: MinimaxSavedState
+        Saved state containing the transposition table to use and fill.
+    stop_flag: multiprocessing.sharedctypes.Synchronized
+        Flag set by the parent process when the time is over.
+    state_sender: multiprocessing.connection.Connection
+        Connection to send the saved state back to the parent process.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at.
+    processes: int
+        Number of processes searching the root moves in parallel.
+    search_function: Optional[Callable[..., list]]
+        Search of a single depth, generate_move_minimax_id if it is None. Not used by the parallel search.
+    info_sender: Optional[multiprocessing.connection.Connection]
+        Connection to send the info of every iteration through, None to not send any.
+    stable_iterations: Optional[int]
+        Number of iterations in a row with the same best move after which the search may stop early, see
+        StableBestMove. The search uses the whole time if it is None.
+    """
+    generate_move_loop = functools.partial(generate_move_loop_to_stop, search_function=search_function)
+    if processes > 1:
+        # Imported here, the parallel search itself builds on this module.
+        from agents.agent_minimax.parallel_search import generate_move_loop_parallel
+        generate_move_loop = functools.partial(generate_move_loop_parallel, processes=processes)
+    saved_state.depth = generate_move_loop(move_output=move_output, board_player_one=board_player_one,
+                                           board_player_two=board_player_two, player=player, depth=depth,
+                                           loop_over_flag=loop_over_flag, saved_state=saved_state,
+                                           stop_flag=stop_flag, evaluate_board=evaluate_board, deadline=deadline,
+                                           on_iteration=None if info_sender is None else info_sender.send,
+                                           stable_iterations=stable_iterations)
+    if info_sender is not None:
+        info_sender.send(None)
+    saved_state.solver_transposition_table = None
+    state_sender.send(saved_state)
 
 
 def generate_move_loop_to_stop(move_output: multiprocessing.sharedctypes.Synchronized, board_player_one: int,
                                board_player_two: int, player: BoardPiece, depth: int,
-                               loop_over_flag: multiprocessing.Event):
+                               loop_over_flag: multiprocessing.Event, saved_state: Optional[MinimaxSavedState] = None,
+                               stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                               evaluate_board: Optional[Callable[[int, int], int]] = None,
+                               deadline: Optional[float] = None,
+                               search_function: Optional[Callable[..., list]] = None,
+                               on_iteration: Optional[Callable[[dict], None]] = None,
+                               stable_iterations: Optional[int] = STABLE_ITERATIONS) -> int:
     """
+    Iterative deepening, writing the first move of the deepest search into the move output. If a search is interrupted
+    after its first root move was searched completely, the best root move found so far is used. The loop stops early
+    if a forced win or loss was found, as deeper searches cannot find a faster one, or if the search has a deadline and
+    its best move is stable, see StableBestMove.
 
     Parameters
     ----------
@@ -83,27 +286,190 @@ def generate_move_loop_to_stop(move_output: multiprocessing.sharedctypes.Synchro
         Current depth (decreasing).
     loop_over_flag: multiprocessing.Event
         Event to stop loop if all moves are calculated.
+    saved_state: Optional[MinimaxSavedState]
+        Saved state containing the transposition table shared by all depths.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the loop from the outside when the time is over.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at, checked every few nodes.
+    search_function: Optional[Callable[..., list]]
+        Search of a single depth with the arguments of generate_move_minimax_id, which is used if it is None.
+    on_iteration: Optional[Callable[[dict], None]]
+        Called with the info of every depth searched completely, see create_search_info.
+    stable_iterations: Optional[int]
+        Number of iterations in a row with the same best move after which the search may stop early, None to not stop
+        early at a stable best move.
 
     Returns
     -------
-
+    :int
+        The deepest depth searched completely.
     """
+    start_time: float = time.monotonic()
+    if saved_state is None:
+        saved_state = MinimaxSavedState()
+    if search_function is None:
+        search_function = generate_move_minimax_id
+    saved_state.transposition_table.new_search()
+    saved_state.move_ordering.new_search()
+    statistics: Optional[SearchStatistics] = saved_state.statistics
+    if statistics is not None:
+        statistics.new_search()
+    if deadline is not None:
+        stop_flag = SearchDeadline(deadline=deadline, stop_flag=stop_flag)
+    saved_state.evaluation, saved_state.line, saved_state.nodes = None, [], 0
     evaluation: list[int, [PlayerAction]] = [0, []]
+    stable_best_move: Optional[StableBestMove] = None
+    if stable_iterations is not None and isinstance(stop_flag, SearchDeadline):
+        stable_best_move = StableBestMove(stable_iterations=stable_iterations)
     while True:  # Gets stopped from the outside when time is over.
-        evaluation: list[int, [PlayerAction]] = generate_move_minimax_id(board_player_one=board_player_one,
-                                                                         board_player_two=board_player_two,
-                                                                         player=player, saved_state=None,
-                                                                         next_moves=evaluation[1], depth=depth)
-        if depth >= len(evaluation[1]) + 1:  # The agent found all possible moves at this point.
+        iteration_start_time: float = time.monotonic()
+        iteration_start_nodes: int = saved_state.nodes
+        try:
+            evaluation: list[int, [PlayerAction]] = search_function(board_player_one=board_player_one,
+                                                                    board_player_two=board_player_two, player=player,
+                                                                    saved_state=saved_state, next_moves=evaluation[1],
+                                                                    depth=depth, stop_flag=stop_flag,
+                                                                    evaluate_board=evaluate_board)
+        except SearchInterrupted as interrupted:
+            if interrupted.args and interrupted.args[0][1][0] >= 0:  # Result of the partially searched depth.
+                move_output.value = interrupted.args[0][1][0]
+                logger.info("Moves at depth %2d (partial) : %s", depth, interrupted.args[0][1])
+            return depth - 1
+        if statistics is not None:
+            statistics.finish_depth()
+        if on_iteration is not None:
+            on_iteration(create_search_info(depth=depth, evaluation=evaluation, nodes=saved_state.nodes,
+                                            start_time=start_time))
+        if depth >= len(evaluation[1]) + 1 and \
+                line_ends_game(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                               moves=evaluation[1]):  # The agent found all possible moves at this point.
             loop_over_flag.set()
-            return
+            saved_state.evaluation = evaluation[0]
+            saved_state.line = list(evaluation[1])
+            return depth
         move_output.value = evaluation[1][0]
-        print("Moves at depth {:>2} : {}".format(depth, evaluation[1]))
+        saved_state.evaluation, saved_state.line = evaluation[0], list(evaluation[1])
+        logger.info("Moves at depth %2d : %s", depth, evaluation[1])
+        if is_mate_evaluation(evaluation=evaluation[0]):  # A forced win or loss ends the search.
+            loop_over_flag.set()
+            return depth
+        if stable_best_move is not None and \
+                stable_best_move.update(best_move=evaluation[1][0], seconds=time.monotonic() - iteration_start_time,
+                                        nodes=saved_state.nodes - iteration_start_nodes,
+                                        seconds_left=stop_flag.deadline - time.monotonic()):
+            loop_over_flag.set()
+            return depth
         depth += 1
 
 
+def get_single_move(board_player_one: int, board_player_two: int, player: BoardPiece) -> Optional[PlayerAction]:
+    """
+    Finds the move to play if there is only one legal move, or only one move after which the opponent cannot win
+    right away.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+
+    Returns
+    -------
+    :Optional[PlayerAction]
+        The only move worth playing, None if there is more than one or none.
+    """
+    moves, _ = get_threat_aware_moves(board_player_one=board_player_one, board_player_two=board_player_two,
+                                      player=player)
+    if len(moves) == 1:
+        return moves[0]
+    return None
+
+
+def get_fallback_move(board_player_one: int, board_player_two: int, player: BoardPiece) -> PlayerAction:
+    """
+    Finds a move to play if the search does not finish a single depth in time: the first move worth playing in
+    MOVE_ORDER, or the first legal move if every move loses.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+
+    Returns
+    -------
+    :PlayerAction
+        A legal move, -1 if the game is over.
+    """
+    for get_moves in (get_threat_aware_moves, get_possible_moves):
+        moves, _ = get_moves(board_player_one=board_player_one, board_player_two=board_player_two, player=player)
+        if moves:
+            return PlayerAction(moves[0])
+    return PlayerAction(-1)
+
+
+def create_search_info(depth: int, evaluation: list[int, [PlayerAction]], nodes: int, start_time: float) -> dict:
+    """
+    Creates the info of an iteration of the iterative deepening, sent to the parent process after every depth.
+
+    Parameters
+    ----------
+    depth: int
+        Depth searched completely.
+    evaluation: list[int, [PlayerAction]]
+        Result of the search of the depth.
+    nodes: int
+        Nodes searched since the start of the iterative deepening.
+    start_time: float
+        Point in time of time.monotonic() the iterative deepening was started at.
+
+    Returns
+    -------
+    :dict
+        The depth, the score from the view of player one, the principal variation, the nodes, the nodes per second
+        and the seconds since the start of the search, with plain types only.
+    """
+    seconds: float = time.monotonic() - start_time
+    return dict(depth=depth, score=int(evaluation[0]), pv=[int(move) for move in evaluation[1]], nodes=nodes,
+                nps=nodes / seconds if seconds > 0 else 0.0, seconds=seconds)
+
+
+def receive_search_info(info_receiver: multiprocessing.connection.Connection, deadline: float,
+                        on_info: Optional[Callable[[dict], Optional[bool]]] = None):
+    """
+    Receives the info of the iterations of the search process until the search is over, the deadline has passed or
+    the callback asks to stop.
+
+    Parameters
+    ----------
+    info_receiver: multiprocessing.connection.Connection
+        Connection the search process sends the info of every iteration through, and None when it is over.
+    deadline: float
+        Point in time of time.monotonic() to stop waiting at.
+    on_info: Optional[Callable[[dict], Optional[bool]]]
+        Called with the info of every iteration, stops the search by returning True.
+    """
+    while info_receiver.poll(max(deadline - time.monotonic(), 0)):
+        info: Optional[dict] = info_receiver.recv()
+        if info is None:  # The search is over.
+            return
+        if on_info is not None and on_info(info):
+            return
+
+
 def generate_move_minimax_id(board_player_one: int, board_player_two: int, player: BoardPiece,
-                             saved_state: Optional[SavedState], next_moves: list[int], depth: int = DEPTH_TO_PLAY) -> \
+                             saved_state: Optional[SavedState], next_moves: list[int], depth: int = DEPTH_TO_PLAY,
+                             stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                             evaluate_board: Optional[Callable[[int, int], int]] = None) -> \
         list[int, [PlayerAction]]:
     """
     Generates the next move using the minimax algorithm.
@@ -116,31 +482,57 @@ def generate_move_minimax_id(board_player_one: int, board_player_two: int, playe
     player: BoardPiece
         The next player to make a move.
     saved_state: Optional[SavedState]
-        Can be used to save a state of the game for future calculations. Not used here.
+        Saved state containing the transposition table, the position cache and the search statistics to use, the
+        nodes searched are added to its nodes. A new transposition table is used if it is not a MinimaxSavedState.
     next_moves: list[int]
-        Move order to try first to improve alpha-beta-pruning.
+        Move order to try first to improve alpha-beta-pruning. The list itself is not changed.
     depth: int
         Depth of the search tree to stop calculating.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
     Returns
     -------
     :Tuple[PlayerAction, Optional[SavedState]]
         Tuple containing the move to play and the saved state.
     """
-    use_mirror = use_mirror_functions(board_player_one=board_player_one, board_player_two=board_player_two)
-    evaluation: list[int, [PlayerAction]] = minimax_rec(current_depth=depth, board_player_one=board_player_one,
-                                                        board_player_two=board_player_two, player=player,
-                                                        alpha=[-MAX_VALUE, [PlayerAction(-1)]],
-                                                        beta=[MAX_VALUE, [PlayerAction(-1)]], dictionary={-1: {}},
-                                                        moves_line=[],
-                                                        next_moves=next_moves, maximizing=player == PLAYER1,
-                                                        use_mirror=use_mirror)
-    return evaluation
+    position_cache: Optional[PositionCache] = None
+    statistics: Optional[SearchStatistics] = None
+    if isinstance(saved_state, MinimaxSavedState):
+        transposition_table = saved_state.transposition_table
+        position_cache = saved_state.position_cache
+        statistics = saved_state.statistics
+    else:
+        saved_state = None
+        transposition_table = TranspositionTable()
+    if statistics is None:
+        statistics = SearchStatistics()  # Only used to count the nodes, which costs next to nothing in minimax_rec.
+    start_nodes: int = statistics.nodes
+    board_evaluation: Optional[int] = None
+    if evaluate_board is None:
+        board_evaluation = evaluate_board_using_windows(board_player_one=board_player_one,
+                                                        board_player_two=board_player_two)
+    try:
+        return minimax_rec(current_depth=depth, board_player_one=board_player_one,
+                           board_player_two=board_player_two, player=player, alpha=[-MAX_VALUE, [PlayerAction(-1)]],
+                           beta=[MAX_VALUE, [PlayerAction(-1)]], transposition_table=transposition_table,
+                           moves_line=[], next_moves=next_moves.copy(), maximizing=player == PLAYER1,
+                           stop_flag=stop_flag, board_evaluation=board_evaluation, evaluate_board=evaluate_board,
+                           position_cache=position_cache, statistics=statistics)
+    finally:
+        if saved_state is not None:
+            saved_state.nodes += statistics.nodes - start_nodes
 
 
 def minimax_rec(current_depth: int, board_player_one: int, board_player_two: int,
-                player: BoardPiece, alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]], dictionary: {},
-                moves_line: list[int], next_moves: list[int], maximizing: bool, use_mirror: bool) -> list[
-    int, [PlayerAction]]:
+                player: BoardPiece, alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]],
+                transposition_table: TranspositionTable, moves_line: list[int], next_moves: list[int],
+                maximizing: bool, stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                board_evaluation: Optional[int] = None,
+                evaluate_board: Optional[Callable[[int, int], int]] = None,
+                position_cache: Optional[PositionCache] = None,
+                statistics: Optional[SearchStatistics] = None) -> list[int, [PlayerAction]]:
     """
     Main recursion function for the minimax algorith. Handles the anchors and the calls to further needed calculation.
     Parameters
@@ -157,56 +549,112 @@ def minimax_rec(current_depth: int, board_player_one: int, board_player_two: int
         Alpha for alpha-beta pruning.
     beta: list[int, [PlayerAction]]
         Beta for alpha-beta pruning.
-    dictionary: {}
-        Dictionary for the transposition table.
+    transposition_table: TranspositionTable
+        Transposition table to look up and save evaluations.
     moves_line: list[int]
         Current line of move taken.
     next_moves: list[int]
         Next moves to evaluate first from recent calculation for better pruning.
     maximizing: bool
         Flag for maximizing and minimizing of the algorithm.
-    use_mirror: bool
-        If the mirrored board should be saved in the transposition table.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    board_evaluation: Optional[int]
+        Evaluation of the boards, updated incrementally with every move. The boards are evaluated from scratch at the
+        maximum depth if it is None.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards from scratch, evaluate_board_using_windows if it is None.
+    position_cache: Optional[PositionCache]
+        Cache of proven results, looked up for every position but the root. Forced wins and losses found by the
+        search are saved in it, see save_proven_eval_in_position_cache. Not used if it is None.
+    statistics: Optional[SearchStatistics]
+        Statistics to count the nodes, leaves, cutoffs and transposition table accesses in, None to not count them.
+
+    Raises
+    ----------
+    SearchInterrupted
+        If the stop flag is set.
 
     Returns
     -------
     :list[int, [PlayerAction]]
         List containing the evaluation and the list of PlayerActions to get to that evaluation.
     """
+    if stop_flag is not None and stop_flag.value:
+        raise SearchInterrupted
+    if statistics is not None:  # The only check of the statistics at every node, see count_node.
+        count_node(statistics=statistics, current_depth=current_depth, ply=len(moves_line))
     possible_moves, game_state = get_possible_moves_iterative(board_player_one=board_player_one,
                                                               board_player_two=board_player_two, player=player,
                                                               next_moves=next_moves)
     if not possible_moves:
+        if statistics is not None and current_depth:
+            statistics.leaves += 1
         return [handle_empty_moves_eval(player=player, game_state=game_state, current_depth=current_depth), moves_line]
+    if position_cache is not None:
+        if moves_line:
+            proven_result: Optional[tuple[int, PlayerAction]] = position_cache.get_entry(
+                board_player_one=board_player_one, board_player_two=board_player_two)
+            if proven_result is not None:
+                if statistics is not None and current_depth:
+                    statistics.leaves += 1
+                return [handle_proven_eval(player=player, score=proven_result[0], current_depth=current_depth,
+                                           pieces=int(board_player_one | board_player_two).bit_count()),
+                        moves_line + [proven_result[1]]]
+        window: tuple[int, int] = (alpha[0], beta[0])  # Results inside the window are exact.
     if current_depth == 0:  # desired depth reached - recursion anchor
-        evaluation: int = evaluate_board_using_windows(board_player_one=board_player_one,
-                                                       board_player_two=board_player_two)
+        if board_evaluation is not None:
+            return [board_evaluation, moves_line]
+        if evaluate_board is None:
+            evaluate_board = evaluate_board_using_windows
+        evaluation: int = evaluate_board(board_player_one, board_player_two)
         return [evaluation, moves_line]
     if maximizing:
         get_alpha_or_beta = get_alpha
     else:
         get_alpha_or_beta = get_beta
-    for move in possible_moves:
+    for move_index, move in enumerate(possible_moves):
         new_board_player_one, new_board_player_two = apply_player_action(board_player_one=board_player_one,
                                                                          board_player_two=board_player_two,
                                                                          player=player,
                                                                          action=move)
-        alpha_or_beta_result = get_alpha_or_beta(current_depth=current_depth, board_player_one=new_board_player_one,
-                                                 board_player_two=new_board_player_two, player=player,
-                                                 alpha=alpha, beta=beta, dictionary=dictionary, moves_line=moves_line,
-                                                 next_moves=next_moves, move=move, use_mirror=use_mirror)
+        try:
+            alpha_or_beta_result = get_alpha_or_beta(current_depth=current_depth,
+                                                     board_player_one=new_board_player_one,
+                                                     board_player_two=new_board_player_two, player=player,
+                                                     alpha=alpha, beta=beta, transposition_table=transposition_table,
+                                                     moves_line=moves_line, next_moves=next_moves, move=move,
+                                                     stop_flag=stop_flag, board_evaluation=board_evaluation,
+                                                     evaluate_board=evaluate_board, position_cache=position_cache,
+                                                     statistics=statistics)
+        except SearchInterrupted:
+            if moves_line or move == possible_moves[0]:
+                raise
+            # At the root, the moves searched completely are passed on.
+            raise SearchInterrupted(alpha if maximizing else beta)
         if maximizing:
             alpha = alpha_or_beta_result
         else:
             beta = alpha_or_beta_result
         if beta[0] <= alpha[0]:
+            if statistics is not None:
+                statistics.cutoffs[move_index] += 1
             return alpha_or_beta_result
+    if position_cache is not None and window[0] < alpha_or_beta_result[0] < window[1]:
+        save_proven_eval_in_position_cache(board_player_one=board_player_one, board_player_two=board_player_two,
+                                           position_cache=position_cache, current_depth=current_depth,
+                                           evaluation=alpha_or_beta_result, moves_line=moves_line)
     return alpha_or_beta_result
 
 
 def get_alpha(current_depth: int, board_player_one: int, board_player_two: int, player: BoardPiece,
-              alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]], dictionary: {}, moves_line: list[int],
-              next_moves: list[int], move: PlayerAction, use_mirror: bool) -> list[int, [PlayerAction]]:
+              alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]],
+              transposition_table: TranspositionTable, moves_line: list[int], next_moves: list[int],
+              move: PlayerAction, stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+              board_evaluation: Optional[int] = None,
+              evaluate_board: Optional[Callable[[int, int], int]] = None,
+              position_cache: Optional[PositionCache] = None,
+              statistics: Optional[SearchStatistics] = None) -> list[int, [PlayerAction]]:
     """
     Function to calculate the new alpha-value and then continue in the recursion.
     Parameters
@@ -223,43 +671,65 @@ def get_alpha(current_depth: int, board_player_one: int, board_player_two: int,
         Alpha for alpha-beta pruning.
     beta: list[int, [PlayerAction]]
         Beta for alpha-beta pruning.
-    dictionary: {}
-        Dictionary for the transposition table.
+    transposition_table: TranspositionTable
+        Transposition table to look up and save evaluations.
     moves_line: list[int]
         Current line of move taken.
     next_moves: list[int]
         Next moves to evaluate first from recent calculation for better pruning.
     move: PlayerAction
         The last played moved.
-    use_mirror: bool
-        If the mirrored board should be saved in the transposition table.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    board_evaluation: Optional[int]
+        Evaluation of the boards before the last move was played, None to not evaluate incrementally.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards from scratch if they are not evaluated incrementally.
+    position_cache: Optional[PositionCache]
+        Cache of proven results, None to not use a cache.
+    statistics: Optional[SearchStatistics]
+        Statistics to count the search in, None to not count it.
     Returns
     -------
     :list[int, [PlayerAction]]
         Values for alpha.
     """
-    saved_eval = get_eval_from_dictionary(board_player_one=board_player_one, board_player_two=board_player_two,
-                                          dictionary=dictionary)
-    if saved_eval is not None:  # There is an entry in the transposition table.
-        return max([alpha, saved_eval], key=lambda x: x[0])
-
     moves_line_new = moves_line.copy()
     moves_line_new.append(move)
+    saved_eval = get_eval_from_transposition_table(board_player_one=board_player_one,
+                                                   board_player_two=board_player_two, player=BoardPiece(3 - player),
+                                                   transposition_table=transposition_table, depth=current_depth - 1,
+                                                   alpha=alpha[0], beta=beta[0], moves_line=moves_line_new)
+    if saved_eval is not None:  # There is a usable entry in the transposition table.
+        if statistics is not None:
+            count_transposition_table_hit(statistics=statistics)
+        return max([alpha, saved_eval], key=lambda x: x[0])
+
+    if board_evaluation is not None:
+        board_evaluation += evaluate_action_difference(board_player_one=board_player_one,
+                                                       board_player_two=board_player_two, player=player, action=move)
     recursion_eval = minimax_rec(current_depth=current_depth - 1, board_player_one=board_player_one,
                                  board_player_two=board_player_two, player=BoardPiece(3 - player),
-                                 alpha=alpha, beta=beta, dictionary=dictionary, moves_line=moves_line_new,
-                                 next_moves=next_moves, maximizing=False, use_mirror=use_mirror)
-    alpha = max([alpha, recursion_eval], key=lambda x: x[0])
-    dictionary[board_player_one] = {board_player_two: [alpha[0], alpha[1]]}
-    if use_mirror:
-        add_mirrored_boards_to_dictionary(board_player_one=board_player_one, board_player_two=board_player_two,
-                                          dictionary=dictionary, alpha_beta=alpha)
-    return alpha
+                                 alpha=alpha, beta=beta, transposition_table=transposition_table,
+                                 moves_line=moves_line_new, next_moves=next_moves, maximizing=False,
+                                 stop_flag=stop_flag, board_evaluation=board_evaluation,
+                                 evaluate_board=evaluate_board, position_cache=position_cache,
+                                 statistics=statistics)
+    save_eval_in_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                     transposition_table=transposition_table, depth=current_depth - 1,
+                                     alpha=alpha[0], beta=beta[0], evaluation=recursion_eval,
+                                     moves_line=moves_line_new)
+    return max([alpha, recursion_eval], key=lambda x: x[0])
 
 
 def get_beta(current_depth: int, board_player_one: int, board_player_two: int, player: BoardPiece,
-             alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]], dictionary: {}, moves_line: list[int],
-             next_moves: list[int], move: PlayerAction, use_mirror: bool) -> list[int, [PlayerAction]]:
+             alpha: list[int, [PlayerAction]], beta: list[int, [PlayerAction]],
+             transposition_table: TranspositionTable, moves_line: list[int], next_moves: list[int],
+             move: PlayerAction, stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+             board_evaluation: Optional[int] = None,
+             evaluate_board: Optional[Callable[[int, int], int]] = None,
+             position_cache: Optional[PositionCache] = None,
+             statistics: Optional[SearchStatistics] = None) -> list[int, [PlayerAction]]:
     """
     Function to calculate the new beta-value and then continue in the recursion.
     Parameters
@@ -276,66 +746,253 @@ def get_beta(current_depth: int, board_player_one: int, board_player_two: int, p
         Alpha for alpha-beta pruning.
     beta: list[int, [PlayerAction]]
         Beta for alpha-beta pruning.
-    dictionary: {}
-        Dictionary for the transposition table.
+    transposition_table: TranspositionTable
+        Transposition table to look up and save evaluations.
     moves_line: list[int]
         Current line of move taken.
     next_moves: list[int]
         Next moves to evaluate first from recent calculation for better pruning.
     move: PlayerAction
         The last played moved.
-    use_mirror: bool
-        If the mirrored board should be saved in the transposition table.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    board_evaluation: Optional[int]
+        Evaluation of the boards before the last move was played, None to not evaluate incrementally.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards from scratch if they are not evaluated incrementally.
+    position_cache: Optional[PositionCache]
+        Cache of proven results, None to not use a cache.
+    statistics: Optional[SearchStatistics]
+        Statistics to count the search in, None to not count it.
     Returns
     -------
     :list[int, [PlayerAction]]
         Values for beta.
     """
-    saved_eval = get_eval_from_dictionary(board_player_one=board_player_one, board_player_two=board_player_two,
-                                          dictionary=dictionary)
+    moves_line_new = moves_line.copy()
+    moves_line_new.append(move)
+    saved_eval = get_eval_from_transposition_table(board_player_one=board_player_one,
+                                                   board_player_two=board_player_two, player=BoardPiece(3 - player),
+                                                   transposition_table=transposition_table, depth=current_depth - 1,
+                                                   alpha=alpha[0], beta=beta[0], moves_line=moves_line_new)
     if saved_eval is not None:
+        if statistics is not None:
+            count_transposition_table_hit(statistics=statistics)
         return min([beta, saved_eval], key=lambda x: x[0])
 
-    moves_line_new = moves_line.copy()
-    moves_line_new.append(move)
+    if board_evaluation is not None:
+        board_evaluation += evaluate_action_difference(board_player_one=board_player_one,
+                                                       board_player_two=board_player_two, player=player, action=move)
     recursion_eval = minimax_rec(current_depth=current_depth - 1, board_player_one=board_player_one,
                                  board_player_two=board_player_two, player=BoardPiece(3 - player),
-                                 alpha=alpha, beta=beta, dictionary=dictionary, moves_line=moves_line_new,
-                                 next_moves=next_moves, maximizing=True, use_mirror=use_mirror)
-    beta = min([beta, recursion_eval], key=lambda x: x[0])
-    dictionary[board_player_one] = {board_player_two: [beta[0], beta[1]]}
-    if use_mirror:
-        add_mirrored_boards_to_dictionary(board_player_one=board_player_one, board_player_two=board_player_two,
-                                          dictionary=dictionary, alpha_beta=beta)
-    return beta
+                                 alpha=alpha, beta=beta, transposition_table=transposition_table,
+                                 moves_line=moves_line_new, next_moves=next_moves, maximizing=True,
+                                 stop_flag=stop_flag, board_evaluation=board_evaluation,
+                                 evaluate_board=evaluate_board, position_cache=position_cache,
+                                 statistics=statistics)
+    save_eval_in_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                     transposition_table=transposition_table, depth=current_depth - 1,
+                                     alpha=alpha[0], beta=beta[0], evaluation=recursion_eval,
+                                     moves_line=moves_line_new)
+    return min([beta, recursion_eval], key=lambda x: x[0])
+
+
+def count_node(statistics: SearchStatistics, current_depth: int, ply: int):
+    """
+    Counts a node of minimax_rec. Every position but the root was looked up in the transposition table without a
+    usable entry before and its result is saved after the search, so the lookup and the save are counted here as
+    well. Counting everything at once keeps the checks for the statistics out of the rest of the search.
+
+    Parameters
+    ----------
+    statistics: SearchStatistics
+        Statistics to count the node in.
+    current_depth: int
+        Remaining depth of the node, nodes at depth 0 are leaves.
+    ply: int
+        Distance of the node to the root.
+    """
+    statistics.nodes += 1
+    if ply:
+        statistics.transposition_table_probes += 1
+        statistics.transposition_table_stores += 1
+        if ply > statistics.max_ply:
+            statistics.max_ply = ply
+    if not current_depth:
+        statistics.leaves += 1
+
+
+def count_transposition_table_hit(statistics: SearchStatistics):
+    """
+    Counts a lookup in the transposition table finding a usable entry, see count_node for the other lookups.
+
+    Parameters
+    ----------
+    statistics: SearchStatistics
+        Statistics to count the hit in.
+    """
+    statistics.transposition_table_probes += 1
+    statistics.transposition_table_hits += 1
 
 
-def get_eval_from_dictionary(board_player_one: int, board_player_two: int, dictionary: {}) -> [int, [int]] or None:
+def get_eval_from_transposition_table(board_player_one: int, board_player_two: int, player: BoardPiece,
+                                      transposition_table: TranspositionTable, depth: int, alpha: int, beta: int,
+                                      moves_line: list[int]) -> [int, [int]] or None:
     """
-    Function to get the value from the transposition table corresponding to the given boards.
+    Function to get a usable evaluation from the transposition table corresponding to the given boards. An entry is
+    only usable if it was calculated with at least the given depth and if it is either exact or a bound which is
+    already outside the alpha-beta window.
     Parameters
     ----------
     board_player_one: int
         Board player one.
     board_player_two: int
         Board player two.
-    dictionary: {}
+    player: BoardPiece
+        The player to make a move in the position.
+    transposition_table: TranspositionTable
         Transposition table.
+    depth: int
+        Remaining depth the position would be calculated with.
+    alpha: int
+        Current alpha value.
+    beta: int
+        Current beta value.
+    moves_line: list[int]
+        Line of moves taken to get to the position.
     Returns
     -------
     : [int, [int]] or None
-        None if there is no entry, otherwise the entry.
+        None if there is no usable entry, otherwise the evaluation and the line of moves.
     """
-    try:
-        return dictionary[board_player_one][board_player_two]
-    except KeyError:
+    entry = get_entry_from_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                               transposition_table=transposition_table, depth=depth)
+    if entry is None:
+        return None
+    evaluation, entry_depth, bound, _ = entry
+    if entry_depth < depth:
         return None
+    if bound == BOUND_EXACT or (bound == BOUND_LOWER and evaluation >= beta) or \
+            (bound == BOUND_UPPER and evaluation <= alpha):
+        return [evaluation, moves_line + get_line_from_transposition_table(board_player_one=board_player_one,
+                                                                           board_player_two=board_player_two,
+                                                                           player=player,
+                                                                           transposition_table=transposition_table,
+                                                                           depth=depth)]
+    return None
+
+
+def get_line_from_transposition_table(board_player_one: int, board_player_two: int, player: BoardPiece,
+                                      transposition_table: TranspositionTable, depth: int) -> list[PlayerAction]:
+    """
+    Function to restore the line of moves leading to the evaluation of a position by following the best moves saved
+    in the transposition table. The line is shorter than the depth if an entry on the way was already replaced.
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move in the position.
+    transposition_table: TranspositionTable
+        Transposition table.
+    depth: int
+        Maximum amount of moves to restore.
+    Returns
+    -------
+    :list[PlayerAction]
+        The restored line of moves.
+    """
+    line: list[PlayerAction] = []
+    for _ in range(depth):
+        entry = get_entry_from_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                               transposition_table=transposition_table)
+        if entry is None or entry[3] == NO_MOVE:
+            break
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=entry[3])
+        line.append(entry[3])
+        if check_end_state(board_player_one=board_player_one, board_player_two=board_player_two,
+                           player=player) != GameState.STILL_PLAYING:
+            break
+        player = BoardPiece(3 - player)
+    return line
+
+
+def line_ends_game(board_player_one: int, board_player_two: int, player: BoardPiece, moves: list[PlayerAction]) -> \
+        bool:
+    """
+    Checks if playing the given line of moves ends the game.
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make the first move of the line.
+    moves: list[PlayerAction]
+        Line of moves to play.
+    Returns
+    -------
+    :bool
+        True if the game is won or drawn after the last move of the line.
+    """
+    for move in moves:
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=move)
+        player = BoardPiece(3 - player)
+    return check_end_state(board_player_one=board_player_one, board_player_two=board_player_two,
+                           player=BoardPiece(3 - player)) != GameState.STILL_PLAYING
+
+
+def save_eval_in_transposition_table(board_player_one: int, board_player_two: int,
+                                     transposition_table: TranspositionTable, depth: int, alpha: int, beta: int,
+                                     evaluation: list[int, [PlayerAction]], moves_line: list[int]):
+    """
+    Function to save the result of a search in the transposition table. The type of bound is derived from the
+    alpha-beta window the search was started with.
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    transposition_table: TranspositionTable
+        Transposition table.
+    depth: int
+        Remaining depth the position was calculated with.
+    alpha: int
+        Alpha value the search was started with.
+    beta: int
+        Beta value the search was started with.
+    evaluation: list[int, [PlayerAction]]
+        Result of the search.
+    moves_line: list[int]
+        Line of moves taken to get to the position.
+    """
+    if evaluation[0] <= alpha:
+        bound = BOUND_UPPER
+    elif evaluation[0] >= beta:
+        bound = BOUND_LOWER
+    else:
+        bound = BOUND_EXACT
+    move: PlayerAction = NO_MOVE
+    if len(evaluation[1]) > len(moves_line) and evaluation[1][:len(moves_line)] == moves_line:
+        move = evaluation[1][len(moves_line)]  # Results from other branches do not contain a move to save.
+    save_entry_in_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                      transposition_table=transposition_table, evaluation=evaluation[0], depth=depth,
+                                      bound=bound, move=move)
 
 
 def get_possible_moves_iterative(board_player_one: int, board_player_two: int, player: BoardPiece,
                                  next_moves: list[int]) -> ([PlayerAction], GameState):
     """
     Function to get the possible moves. Distinguishes between a function call with and without the use of the better move-ordering.
+    The first of the next moves is used up, so the following node of the search uses the next one.
     Parameters
     ----------
     board_player_one: int
@@ -358,6 +1015,69 @@ def get_possible_moves_iterative(board_player_one: int, board_player_two: int, p
         return get_possible_moves(board_player_one=board_player_one, board_player_two=board_player_two, player=player)
 
 
+def handle_proven_eval(player: BoardPiece, score: int, current_depth: int, pieces: int) -> int:
+    """
+    Function to evaluate a position whose result is proven. A win or loss is evaluated like the end of the game found
+    by the search at the distance of the score, a win further away than the current depth like a win at the maximum
+    depth, see decode_mate_evaluation.
+
+    Parameters
+    ----------
+    player: BoardPiece
+        The player to make a move.
+    score: int
+        Exact score of the position from the view of the player to move, see Solver.
+    current_depth: int
+        Current depth (decreasing).
+    pieces: int
+        Number of pieces on the board.
+
+    Returns
+    -------
+    :int
+        Evaluation of the position.
+    """
+    if score == 0:
+        return EVAL_DRAWN_POSITION
+    mate: int = START_VALUE * 2 ** max(current_depth - get_distance_of_score(score=score, pieces=pieces), 0)
+    if (score > 0) == (player == PLAYER1):
+        return mate
+    return -mate
+
+
+def save_proven_eval_in_position_cache(board_player_one: int, board_player_two: int, position_cache: PositionCache,
+                                       current_depth: int, evaluation: list[int, [PlayerAction]],
+                                       moves_line: list[int]):
+    """
+    Saves an exact result of the search in the position cache if it is a forced win or loss. Only the end of the game
+    found before the maximum depth gives the exact distance, the fastest win and the slowest loss are found then, so
+    the distance gives the score of the solver. Draws are not saved, as the evaluation of the boards can be 0 as well.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    position_cache: PositionCache
+        Cache of proven results.
+    current_depth: int
+        Remaining depth the position was searched with.
+    evaluation: list[int, [PlayerAction]]
+        Exact result of the search.
+    moves_line: list[int]
+        Line of moves taken to get to the position.
+    """
+    remaining_depth: int = (abs(evaluation[0]) // START_VALUE).bit_length() - 1
+    if remaining_depth < 1 or len(evaluation[1]) <= len(moves_line) or \
+            evaluation[1][:len(moves_line)] != moves_line:
+        return  # Not a win before the maximum depth, or the result of another branch without a move.
+    pieces: int = int(board_player_one | board_player_two).bit_count()
+    position_cache.store_entry(board_player_one=board_player_one, board_player_two=board_player_two,
+                               score=get_score_of_distance(distance=current_depth - remaining_depth, pieces=pieces),
+                               move=evaluation[1][len(moves_line)])
+
+
 def handle_empty_moves_eval(player: BoardPiece, game_state: GameState, current_depth: int) -> int:
     """
     Function to handle the recursion anchor when there are no more moves possible to play.
@@ -474,99 +1194,193 @@ def calculate_evaluation_score(number_of_player_one_pieces: int, number_of_playe
         # Player two gets negative points.
 
 
-def mirror_boards(board_player_one: int, board_player_two: int) -> tuple[int, int]:
+# Change of the evaluation of a window caused by the last piece played in it, indexed by the amount of pieces of
+# player one and player two in the window after the piece was played.
+EVALUATION_DIFFERENCES_PLAYER_ONE: [[int]] = [
+    [calculate_evaluation_score(number_of_player_one_pieces=pieces_one, number_of_player_two_pieces=pieces_two) -
+     calculate_evaluation_score(number_of_player_one_pieces=pieces_one - 1, number_of_player_two_pieces=pieces_two)
+     if pieces_one > 0 else 0 for pieces_two in range(5)] for pieces_one in range(5)]
+EVALUATION_DIFFERENCES_PLAYER_TWO: [[int]] = [
+    [calculate_evaluation_score(number_of_player_one_pieces=pieces_one, number_of_player_two_pieces=pieces_two) -
+     calculate_evaluation_score(number_of_player_one_pieces=pieces_one, number_of_player_two_pieces=pieces_two - 1)
+     if pieces_two > 0 else 0 for pieces_two in range(5)] for pieces_one in range(5)]
+
+
+def evaluate_action_difference(board_player_one: int, board_player_two: int, player: BoardPiece,
+                               action: PlayerAction) -> int:
     """
-    Mirrors the board by mirroring both player's board string.
+    Calculates the change of the evaluation caused by the last piece played. Only the windows containing the position
+    of this piece are evaluated, so adding the result to the evaluation of the boards before the move results in the
+    same value as evaluate_board_using_windows on the new boards.
 
     Parameters
     ----------
     board_player_one: int
-        Board of player one.
+        Board of player one after the move.
+    board_player_two: int
+        Board of player two after the move.
+    player: BoardPiece
+        The player who played the last piece.
+    action: PlayerAction
+        The column the last piece was played in.
+
+    Returns
+    -------
+    :int
+        Difference of the evaluation after and before the move.
+    """
+    column_shift: int = action * (HEIGHT_BOARD + 1)
+    position: int = column_shift + \
+        (((board_player_one | board_player_two) >> column_shift) & SINGLE_COLUMN_FILLED).bit_length() - 1
+    if player == PLAYER1:
+        evaluation_differences = EVALUATION_DIFFERENCES_PLAYER_ONE
+    else:
+        evaluation_differences = EVALUATION_DIFFERENCES_PLAYER_TWO
+    difference: int = 0
+    for window in MINIMAX_EVALUATION_WINDOWS_BY_POSITION[position]:
+        difference += evaluation_differences[(window & board_player_one).bit_count()][
+            (window & board_player_two).bit_count()]
+    return difference
+
+
+# Evaluation of a window containing only pieces of one player, indexed by the amount of pieces in the window.
+WINDOW_EVALUATIONS: [int] = [calculate_evaluation_score(number_of_player_one_pieces=pieces,
+                                                        number_of_player_two_pieces=0) for pieces in range(5)]
 
+
+def evaluate_board_using_bitboards(board_player_one: int, board_player_two: int) -> int:
+    """
+    Evaluates the board and returns the same score as evaluate_board_using_windows. Instead of looking at every window
+    on its own, all windows of one direction are evaluated at once by shifting the boards onto the lowest positions of
+    the windows and counting the pieces with bitwise operations.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board of player 1.
     board_player_two: int
-        Board of player two.
+        Board of player 2.
 
     Returns
     -------
-    tuple[int, int]:
-        Two mirrored boards.
+    :int
+        Evaluation of the board.
     """
-    return mirror_player_board(player_board=board_player_one), mirror_player_board(player_board=board_player_two)
+    board_evaluation: int = 0
+    for shift, lowest_positions in MINIMAX_EVALUATION_WINDOW_DIRECTIONS:
+        board_evaluation += evaluate_player_windows(board_player=board_player_one, board_opponent=board_player_two,
+                                                    shift=shift, lowest_positions=lowest_positions)
+        board_evaluation -= evaluate_player_windows(board_player=board_player_two, board_opponent=board_player_one,
+                                                    shift=shift, lowest_positions=lowest_positions)
+    return board_evaluation
 
 
-def mirror_player_board(player_board) -> int:
+def evaluate_player_windows(board_player: int, board_opponent: int, shift: int, lowest_positions: int) -> int:
     """
-    Mirrors a single board around the middle column by bit shifting separate
-    columns and putting them together.
+    Evaluates all windows of one direction which contain pieces of the given player only. Every window is represented
+    by its lowest position; the amount of pieces of each window is calculated bit-parallel as a three bit number
+    spread over three boards.
 
     Parameters
     ----------
-    player_board:
-        The players board.
+    board_player: int
+        Board of the player to evaluate the windows for.
+    board_opponent: int
+        Board of the other player.
+    shift: int
+        Amount of bits between neighbouring positions of the windows.
+    lowest_positions: int
+        Board containing the lowest position of every window in this direction.
 
     Returns
     -------
-    int:
-        The mirrored board.
+    :int
+        Sum of the evaluations of the windows from the perspective of the player (always positive).
     """
-    new_column_0: int = COLUMN_0_FILLED & (player_board << SHIFT_6_COLUMNS)
-    # Shifts the board to the left so that column six is in place
-    # of column zero, then removes the other columns.
-    new_column_1: int = COLUMN_1_FILLED & (player_board << SHIFT_4_COLUMNS)
-    new_column_2: int = COLUMN_2_FILLED & (player_board << SHIFT_2_COLUMNS)
-    new_column_3: int = COLUMN_3_FILLED & player_board  # not shifted because in the middle
-    new_column_4: int = COLUMN_4_FILLED & (player_board >> SHIFT_2_COLUMNS)
-    new_column_5: int = COLUMN_5_FILLED & (player_board >> SHIFT_4_COLUMNS)
-    new_column_6: int = COLUMN_6_FILLED & (player_board >> SHIFT_6_COLUMNS)
-    return new_column_0 | new_column_1 | new_column_2 | new_column_3 | new_column_4 | new_column_5 | new_column_6
-    # Puts all the columns together.
+    # Windows without any piece of the opponent.
+    free_windows: int = lowest_positions & ~(board_opponent | board_opponent >> shift | board_opponent >> 2 * shift |
+                                             board_opponent >> 3 * shift)
+    piece_zero: int = board_player & free_windows
+    piece_one: int = (board_player >> shift) & free_windows
+    piece_two: int = (board_player >> 2 * shift) & free_windows
+    piece_three: int = (board_player >> 3 * shift) & free_windows
+    # Adds up the four pieces of every window at once.
+    sum_first_half: int = piece_zero ^ piece_one
+    carry_first_half: int = piece_zero & piece_one
+    sum_second_half: int = piece_two ^ piece_three
+    carry_second_half: int = piece_two & piece_three
+    carry_sum: int = sum_first_half & sum_second_half
+    count_bit_zero: int = sum_first_half ^ sum_second_half
+    count_bit_one: int = carry_first_half ^ carry_second_half ^ carry_sum
+    count_bit_two: int = (carry_first_half & carry_second_half) | (carry_sum & (carry_first_half ^ carry_second_half))
+    return WINDOW_EVALUATIONS[1] * (count_bit_zero & ~count_bit_one).bit_count() + \
+        WINDOW_EVALUATIONS[2] * (count_bit_one & ~count_bit_zero).bit_count() + \
+        WINDOW_EVALUATIONS[3] * (count_bit_zero & count_bit_one).bit_count() + \
+        WINDOW_EVALUATIONS[4] * count_bit_two.bit_count()
+
 
+# Positions of every window as a matrix with one row per window, used to evaluate many boards at once.
+MINIMAX_EVALUATION_WINDOWS_MATRIX: np.ndarray = np.array(MINIMAX_EVALUATION_WINDOWS_LIST, dtype=np.uint64)
+# Evaluation of a window indexed by the amount of pieces of player one and player two in the window.
+WINDOW_EVALUATIONS_TABLE: np.ndarray = np.array(
+    [[calculate_evaluation_score(number_of_player_one_pieces=pieces_one, number_of_player_two_pieces=pieces_two)
+      for pieces_two in range(5)] for pieces_one in range(5)], dtype=np.int64)
+BATCH_SIZE: int = 4096  # Amount of boards evaluated in one vectorized pass, limits the memory used.
 
-def add_mirrored_boards_to_dictionary(board_player_one: int, board_player_two: int, dictionary,
-                                      alpha_beta: list[int, [PlayerAction]]):
+
+def evaluate_boards_batch(boards_one: np.ndarray, boards_two: np.ndarray) -> np.ndarray:
     """
-    Uses the mirror functions to add a mirrored board, its evaluation and mirrored playeractions to the dictionary.
+    Evaluates many boards at once and returns the same scores as evaluate_board_using_windows for every pair of boards.
+    The pieces in all windows of all boards are counted in a single vectorized pass using the window matrix.
 
     Parameters
     ----------
-    board_player_one: int
-        Board player one.
-    board_player_two: int
-        Board player two.
-    dictionary: {}
-        Dictionary.  # should be reference of dictionary
-    alpha_beta: tuple[int, int]
-        Tuple that contains evaluation and playeractions.
+    boards_one: np.ndarray
+        One dimensional array of boards of player one.
+    boards_two: np.ndarray
+        One dimensional array of boards of player two, with the same length as boards_one.
+
+    Raises
+    ----------
+    ValueError
+        If the arrays are not one dimensional or their lengths differ.
+
+    Returns
+    -------
+    :np.ndarray
+        Array of the evaluations of the boards.
     """
-    mirrored_board_player_one, mirrored_board_player_two = mirror_boards(board_player_one=board_player_one,
-                                                                         board_player_two=board_player_two)
-    mirror_player_actions: Callable = np.vectorize(lambda arr: 6 - arr)  # Mirrors each action in the move list.
-    mirrored_player_actions = list(map(mirror_player_actions, alpha_beta[1]))
-    dictionary[mirrored_board_player_one] = {mirrored_board_player_two: [alpha_beta[0], mirrored_player_actions]}
+    boards_one = np.asarray(boards_one, dtype=np.uint64)
+    boards_two = np.asarray(boards_two, dtype=np.uint64)
+    if boards_one.shape != boards_two.shape or boards_one.ndim != 1:
+        raise ValueError("The boards of both players must be one dimensional arrays of the same length, not of shapes "
+                         "{} and {}".format(boards_one.shape, boards_two.shape))
+    evaluations: np.ndarray = np.empty(len(boards_one), dtype=np.int64)
+    for start in range(0, len(boards_one), BATCH_SIZE):
+        end: int = start + BATCH_SIZE
+        pieces_one: np.ndarray = np.count_nonzero(
+            boards_one[start:end, None, None] & MINIMAX_EVALUATION_WINDOWS_MATRIX, axis=2)
+        pieces_two: np.ndarray = np.count_nonzero(
+            boards_two[start:end, None, None] & MINIMAX_EVALUATION_WINDOWS_MATRIX, axis=2)
+        evaluations[start:end] = WINDOW_EVALUATIONS_TABLE[pieces_one, pieces_two].sum(axis=1)
+    return evaluations
 
 
-def use_mirror_functions(board_player_one: int, board_player_two: int) -> bool:
+def mirror_boards(board_player_one: int, board_player_two: int) -> tuple[int, int]:
     """
-    Checks if the board is symmetrical around the middle column. This is accomplished by selecting two columns,
-    removing the other columns, shifting them to the same position and using logical operations to evaluate if they
-    are equal or not.
-    This is done three times per player.
+    Mirrors the board by mirroring both player's board string.
 
     Parameters
     ----------
     board_player_one: int
-        Board player one.
+        Board of player one.
+
     board_player_two: int
-        Board player two.
+        Board of player two.
 
     Returns
     -------
-    bool:
-        If mirror functions should be used in minimax or not.
-    """
-    return (board_player_one & COLUMN_0_FILLED == (board_player_one << SHIFT_6_COLUMNS) & COLUMN_0_FILLED) and \
-           (board_player_one & COLUMN_1_FILLED == (board_player_one << SHIFT_4_COLUMNS) & COLUMN_1_FILLED) and \
-           (board_player_one & COLUMN_2_FILLED == (board_player_one << SHIFT_2_COLUMNS) & COLUMN_2_FILLED) and \
-           (board_player_two & COLUMN_0_FILLED == (board_player_two << SHIFT_6_COLUMNS) & COLUMN_0_FILLED) and \
-           (board_player_two & COLUMN_1_FILLED == (board_player_two << SHIFT_4_COLUMNS) & COLUMN_1_FILLED) and \
-           (board_player_two & COLUMN_2_FILLED == (board_player_two << SHIFT_2_COLUMNS) & COLUMN_2_FILLED)
+    tuple[int, int]:
+        Two mirrored boards.
+    """
+    return mirror_player_board(player_board=board_player_one), mirror_player_board(player_board=board_player_two)
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from agents.game_utils import PlayerAction
+from agents.saved_state import SavedState
+from agents.agent_minimax.transposition_table import TranspositionTable, SharedTranspositionTable, \
+    TRANSPOSITION_TABLE_SIZE_MB
+from agents.agent_minimax.time_control import GameClock
+from agents.agent_minimax.move_ordering import MoveOrdering
+from agents.agent_minimax.position_cache import PositionCache
+from agents.agent_minimax.search_statistics import SearchStatistics
+
+
+class MinimaxSavedState(SavedState):
+    """
+    State of the minimax agent which is kept between the moves of one game. Holds the transposition table so that
+    positions already calculated in earlier moves do not have to be calculated again. If the game is played with a
+    clock, it also holds the clock of the player. The killer moves and the history table of the dynamic move ordering
+    are kept as well. A shared transposition table is kept in shared memory, so all search
+    processes can use it and it does not have to be copied between them. If a position cache path is given, proven
+    results are looked up in and saved to the persistent position cache at that path. If statistics are collected,
+    the statistics of the search for the last move are kept as well. The transposition table of the endgame solver is
+    created by the first move trying to solve the position and is only kept in the process playing the game.
+    """
+
+    def __init__(self, transposition_table_size_mb: int = TRANSPOSITION_TABLE_SIZE_MB,
+                 shared_transposition_table: bool = False, position_cache_path: Optional[str] = None,
+                 collect_statistics: bool = False):
+        if shared_transposition_table:
+            self.transposition_table: TranspositionTable = SharedTranspositionTable(
+                size_mb=transposition_table_size_mb)
+        else:
+            self.transposition_table: TranspositionTable = TranspositionTable(size_mb=transposition_table_size_mb)
+        self.clock: Optional[GameClock] = None
+        self.move_ordering: MoveOrdering = MoveOrdering()
+        self.depth: int = 0  # Deepest depth searched completely for the last move, 0 if the move was not searched.
+        self.evaluation: Optional[int] = None  # Evaluation of that depth from the view of player one.
+        self.line: list[PlayerAction] = []  # Best line of that depth, starting with the move.
+        self.nodes: int = 0  # Nodes searched for the last move.
+        self.statistics: Optional[SearchStatistics] = SearchStatistics() if collect_statistics else None
+        self.position_cache: Optional[PositionCache] = None
+        self.solver_transposition_table: Optional[TranspositionTable] = None
+        if position_cache_path is not None:
+            self.position_cache = PositionCache(path=position_cache_path)
@@ -69,3 +69,45 @@ def list_windows() -> [(int, int, int, int)]:
     for bit_shift_amount in DIAGONAL_DOWN_WINDOW_STARTING_POINTS:
         result += [(1 << bit_shift_amount, 1 << (bit_shift_amount - 6), 1 << (bit_shift_amount - 12), 1 << (bit_shift_amount - 18))]
     return result
+
+
+def list_windows_by_position() -> [[int]]:
+    """
+    Builds a list containing for every position of the board the windows this position is part of. Each window is
+    represented as a board with the four pieces of the window on it.
+
+    Returns
+    -------
+    [[int]]:
+        List of length 49 containing the windows for every position, empty for the buffer positions above the columns.
+    """
+    result: [[int]] = [[] for _ in range(49)]
+    for window in MINIMAX_EVALUATION_WINDOWS_LIST:
+        window_board: int = window[0] | window[1] | window[2] | window[3]
+        for position in window:
+            result[position.bit_length() - 1].append(window_board)
+    return result
+
+
+MINIMAX_EVALUATION_WINDOWS_BY_POSITION: [[int]] = list_windows_by_position()
+
+
+def list_window_directions() -> [(int, int)]:
+    """
+    Builds for every direction of the windows the amount of bits between neighbouring positions of a window and a
+    board containing the lowest position of every window in this direction. Shifting a board by multiples of the
+    amount of bits aligns all positions of the windows on the lowest position.
+
+    Returns
+    -------
+    [(int, int)]:
+        List of tuples containing the shift and the board of lowest positions, one for each of the four directions.
+    """
+    lowest_positions: {int: int} = {}
+    for window in MINIMAX_EVALUATION_WINDOWS_LIST:
+        shift: int = window[-2].bit_length() - window[-1].bit_length()
+        lowest_positions[shift] = lowest_positions.get(shift, 0) | window[-1]
+    return list(lowest_positions.items())
+
+
+MINIMAX_EVALUATION_WINDOW_DIRECTIONS: [(int, int)] = list_window_directions()
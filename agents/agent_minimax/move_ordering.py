@@ -0,0 +1,97 @@
+from agents.game_utils import BoardPiece, PlayerAction, HEIGHT_BOARD, BINARY_SIZE, MOVE_ORDER
+
+MAX_PLY: int = 43  # One more than the amount of positions on the board.
+KILLER_MOVES_PER_PLY: int = 2
+HISTORY_AGING_SHIFT: int = 1  # The history scores are halved at the start of every search.
+COLUMN_HEIGHT: int = HEIGHT_BOARD + 1
+COLUMN_FILLED: int = (1 << COLUMN_HEIGHT) - 1
+
+
+class MoveOrdering:
+    """
+    Dynamic move ordering learned during the search. Moves which caused a cutoff are remembered as killer moves of
+    their distance to the root, and the history table sums up for every player and cell how often, weighted with the
+    remaining depth, a piece played into that cell caused a cutoff. The order of the moves is: the given first moves
+    (e.g. the move of the previous principal variation and the best move from the transposition table), the killer
+    moves, then the other moves by their history score, with ties broken by MOVE_ORDER.
+    """
+
+    def __init__(self):
+        self.killer_moves: [[PlayerAction]] = [[] for _ in range(MAX_PLY)]
+        # History score of every cell for each player, indexed by the player and the position of the cell.
+        self.history: [[int]] = [[0] * BINARY_SIZE for _ in range(3)]
+
+    def new_search(self):
+        """
+        Ages the history scores and forgets the killer moves, which belong to the position of the last search.
+        """
+        for history in self.history:
+            for cell, score in enumerate(history):
+                history[cell] = score >> HISTORY_AGING_SHIFT
+        for killer_moves in self.killer_moves:
+            killer_moves.clear()
+
+    def get_move_order(self, board_player_one: int, board_player_two: int, player: BoardPiece, ply: int,
+                       first_moves: [PlayerAction] = ()) -> [PlayerAction]:
+        """
+        Orders all columns for the given position. Full columns are not removed.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        player: BoardPiece
+            The player to make a move.
+        ply: int
+            Distance of the position to the root of the search.
+        first_moves: [PlayerAction]
+            Moves to put in front of all others in the given order, moves which are not in MOVE_ORDER are ignored.
+
+        Returns
+        -------
+        :[PlayerAction]
+            All columns, ordered by how promising the moves are.
+        """
+        both_boards: int = board_player_one | board_player_two
+        history: [int] = self.history[player]
+        # The cell a piece falls into is above the pieces of its column, sorted is stable for equal scores.
+        order: [PlayerAction] = sorted(MOVE_ORDER, key=lambda column: -history[
+            column * COLUMN_HEIGHT + ((both_boards >> column * COLUMN_HEIGHT) & COLUMN_FILLED).bit_length()])
+        front: [PlayerAction] = []
+        for move in (*first_moves, *self.killer_moves[ply]):
+            if move in MOVE_ORDER and move not in front:
+                front.append(move)
+        if not front:
+            return order
+        return front + [move for move in order if move not in front]
+
+    def update(self, board_player_one: int, board_player_two: int, player: BoardPiece, ply: int,
+               move: PlayerAction, depth: int):
+        """
+        Remembers a move which caused a cutoff.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one before the move.
+        board_player_two: int
+            Board player two before the move.
+        player: BoardPiece
+            The player who made the move.
+        ply: int
+            Distance of the position before the move to the root of the search.
+        move: PlayerAction
+            The move which caused the cutoff.
+        depth: int
+            Remaining depth of the position before the move.
+        """
+        killer_moves: [PlayerAction] = self.killer_moves[ply]
+        if move in killer_moves:
+            killer_moves.remove(move)
+        killer_moves.insert(0, move)
+        del killer_moves[KILLER_MOVES_PER_PLY:]
+        cell: int = move * COLUMN_HEIGHT + \
+            (((board_player_one | board_player_two) >> move * COLUMN_HEIGHT) & COLUMN_FILLED).bit_length()
+        self.history[player][cell] += depth * depth
@@ -0,0 +1,649 @@
+from typing import Optional, Callable
+import multiprocessing.sharedctypes
+
+from agents.game_utils import BoardPiece, PlayerAction, GameState, PLAYER1, HEIGHT_BOARD, FULL_BOARD, MOVE_ORDER, \
+    check_end_state, connected_four
+from agents.saved_state import SavedState
+from agents.agent_minimax.minimax import SearchInterrupted, START_VALUE, MAX_VALUE, EVAL_DRAWN_POSITION, \
+    EVALUATION_DIFFERENCES_PLAYER_ONE, EVALUATION_DIFFERENCES_PLAYER_TWO, evaluate_board_using_windows, \
+    handle_empty_moves_eval, handle_proven_eval, get_line_from_transposition_table
+from agents.agent_minimax.minimax_window_list import MINIMAX_EVALUATION_WINDOWS_BY_POSITION
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.move_ordering import MoveOrdering
+from agents.agent_minimax.position_cache import PositionCache, get_score_of_distance
+from agents.agent_minimax.search_statistics import SearchStatistics
+from agents.agent_minimax.threats import BOTTOM_ROW, get_threat_aware_positions
+from agents.agent_minimax.transposition_table import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, \
+    NO_MOVE, get_canonical_key, mirror_move, get_entry_from_transposition_table, save_entry_in_transposition_table
+
+MAX_PLY: int = 43  # One more than the amount of positions on the board.
+FOREIGN_LINE: int = -1  # Length of the line of a node whose result came from another branch of the tree.
+COLUMN_HEIGHT: int = HEIGHT_BOARD + 1
+BOTTOM_POSITIONS: [int] = [1 << (column * COLUMN_HEIGHT) for column in range(7)]
+TOP_POSITIONS: [int] = [1 << (column * COLUMN_HEIGHT + HEIGHT_BOARD - 1) for column in range(7)]
+COLUMNS_FILLED: [int] = [((1 << COLUMN_HEIGHT) - 1) << (column * COLUMN_HEIGHT) for column in range(7)]
+# MOVE_ORDER with the given move in front, for every possible move and for no given move.
+MOVE_ORDERS: {int: [int]} = {next_move: [next_move] + [move for move in MOVE_ORDER if move != next_move]
+                             for next_move in MOVE_ORDER}
+MOVE_ORDERS[None] = MOVE_ORDERS[3]
+ASPIRATION_WINDOW: int = 16
+ASPIRATION_WINDOW_GROWTH: int = 4
+MAX_ASPIRATION_WINDOW: int = 256  # The failing side of the window is opened completely above this size.
+MIN_MOVE_ORDERING_DEPTH: int = 2  # Below, ordering the moves costs more time than the cutoffs it gains.
+
+
+class NegamaxSearch:
+    """
+    Negamax version of minimax_rec. Scores are plain integers from the view of the player to move, moves are played
+    and taken back on the boards kept in the search, and the principal variation is collected in a preallocated
+    triangular table instead of lists created at every node. The tree is searched in the same order, with the same
+    transposition table accesses and the same cutoffs as minimax_rec, so both return the same evaluation and line.
+
+    Optionally, the moves after the first one are searched with principal variation search, the root is searched with
+    aspiration windows and the moves are ordered by the best move of the transposition table, killer moves and the
+    history table. The evaluation stays the same, but the line can differ between moves of equal value. With threat
+    pruning, immediate wins are played right away, immediate threats of the opponent are blocked and moves below a
+    winning cell of the opponent are not searched. This changes evaluations close to the maximum depth, as threats
+    are seen earlier.
+
+    With a position cache, proven results are looked up for every position but the root and forced wins and losses
+    found by the search are saved, like minimax_rec does it.
+
+    The nodes are counted in the nodes attribute, the other search statistics are collected by
+    NegamaxSearchWithStatistics.
+    """
+
+    def __init__(self, transposition_table: TranspositionTable,
+                 stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                 evaluate_board: Optional[Callable[[int, int], int]] = None,
+                 principal_variation_search: bool = False, aspiration_window: Optional[int] = None,
+                 move_ordering: Optional[MoveOrdering] = None, threat_pruning: bool = False,
+                 position_cache: Optional[PositionCache] = None):
+        self.transposition_table: TranspositionTable = transposition_table
+        self.stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = stop_flag
+        self.evaluate_board: Optional[Callable[[int, int], int]] = evaluate_board
+        self.board_player_one: int = 0
+        self.board_player_two: int = 0
+        self.next_moves: list[int] = []
+        # Line of the principal variation of every ply, pv_table[ply][:pv_length[ply]].
+        self.pv_table: [[int]] = [[0] * MAX_PLY for _ in range(MAX_PLY + 1)]
+        self.pv_length: [int] = [0] * (MAX_PLY + 1)
+        self.nodes: int = 0
+        self.principal_variation_search: bool = principal_variation_search
+        # Half the size of the window around the previous evaluation the root is searched with, None for no window.
+        self.aspiration_window: Optional[int] = aspiration_window
+        # Killer moves and history table to order the moves with, None to use MOVE_ORDER.
+        self.move_ordering: Optional[MoveOrdering] = move_ordering
+        # Whether to only search the moves worth playing according to the winning cells of both players.
+        self.threat_pruning: bool = threat_pruning
+        self.position_cache: Optional[PositionCache] = position_cache  # Cache of proven results, None to not use one.
+
+    def search(self, board_player_one: int, board_player_two: int, player: BoardPiece, depth: int,
+               next_moves: list[int]) -> list[int, [PlayerAction]]:
+        """
+        Searches the position with the full window.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        player: BoardPiece
+            The player to make a move.
+        depth: int
+            Depth of the search tree.
+        next_moves: list[int]
+            Moves to evaluate first, from the line of the previous depth. The list itself is not changed.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set, carrying the best result of the root if its first move was searched completely.
+
+        Returns
+        -------
+        :list[int, [PlayerAction]]
+            List containing the evaluation and the line of moves leading to it, like minimax_rec.
+        """
+        self.board_player_one = board_player_one
+        self.board_player_two = board_player_two
+        self.next_moves = next_moves.copy()
+        board_evaluation: Optional[int] = None
+        if self.evaluate_board is None:
+            board_evaluation = evaluate_board_using_windows(board_player_one=board_player_one,
+                                                            board_player_two=board_player_two)
+        sign: int = 1 if player == PLAYER1 else -1
+        if check_end_state(board_player_one=board_player_one, board_player_two=board_player_two,
+                           player=BoardPiece(3 - player)) == GameState.IS_WIN:
+            if self.next_moves:
+                self.next_moves.pop(0)
+            return [handle_empty_moves_eval(player=player, game_state=GameState.IS_WIN, current_depth=depth), []]
+        if self.aspiration_window is None:
+            evaluation: int = sign * self.negamax(depth=depth, alpha=-MAX_VALUE, beta=MAX_VALUE, ply=0, player=player,
+                                                  board_evaluation=board_evaluation)
+            return [evaluation, self.get_line(ply=0)]
+        return self.search_aspiration_windows(board_player_one=board_player_one, board_player_two=board_player_two,
+                                              player=player, depth=depth, board_evaluation=board_evaluation)
+
+    def search_aspiration_windows(self, board_player_one: int, board_player_two: int, player: BoardPiece, depth: int,
+                                  board_evaluation: Optional[int]) -> list[int, [PlayerAction]]:
+        """
+        Searches the root with a window around the evaluation of the previous search of the position, saved in the
+        transposition table. If the result is outside the window, the failing side of the window is widened and the
+        root is searched again. The result is saved in the transposition table for the next depth.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        player: BoardPiece
+            The player to make a move.
+        depth: int
+            Depth of the search tree.
+        board_evaluation: Optional[int]
+            Evaluation of the boards, None to evaluate the boards from scratch.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set, carrying the best result of the root if one is known.
+
+        Returns
+        -------
+        :list[int, [PlayerAction]]
+            List containing the evaluation and the line of moves leading to it.
+        """
+        sign: int = 1 if player == PLAYER1 else -1
+        alpha, beta = -MAX_VALUE, MAX_VALUE
+        previous_entry = get_entry_from_transposition_table(board_player_one=board_player_one,
+                                                            board_player_two=board_player_two,
+                                                            transposition_table=self.transposition_table)
+        if previous_entry is not None:
+            alpha = sign * previous_entry[0] - self.aspiration_window
+            beta = sign * previous_entry[0] + self.aspiration_window
+        next_moves: list[int] = self.next_moves.copy()
+        window: int = self.aspiration_window
+        best_result: Optional[list] = None  # Result of a search which failed high.
+        while True:
+            try:
+                score: int = self.negamax(depth=depth, alpha=alpha, beta=beta, ply=0, player=player,
+                                          board_evaluation=board_evaluation)
+            except SearchInterrupted as interrupted:
+                if interrupted.args or best_result is None:
+                    raise
+                raise SearchInterrupted(best_result)
+            window *= ASPIRATION_WINDOW_GROWTH
+            if score <= alpha and alpha > -MAX_VALUE:  # Failed low, the line is not known.
+                alpha = -MAX_VALUE if window > MAX_ASPIRATION_WINDOW else alpha - window
+            elif score >= beta and beta < MAX_VALUE:  # Failed high, the line is a better move than expected.
+                best_result = [sign * score, self.get_line(ply=0)]
+                beta = MAX_VALUE if window > MAX_ASPIRATION_WINDOW else beta + window
+            else:
+                break
+            self.board_player_one, self.board_player_two = board_player_one, board_player_two
+            self.next_moves = next_moves.copy()
+        line: list[PlayerAction] = self.get_line(ply=0)
+        save_entry_in_transposition_table(board_player_one=board_player_one, board_player_two=board_player_two,
+                                          transposition_table=self.transposition_table, evaluation=sign * score,
+                                          depth=depth, bound=BOUND_EXACT, move=line[0] if line else NO_MOVE)
+        return [sign * score, line]
+
+    def get_line(self, ply: int) -> list[PlayerAction]:
+        """
+        Returns the principal variation found at the given ply.
+
+        Parameters
+        ----------
+        ply: int
+            Distance to the root of the search.
+
+        Returns
+        -------
+        :list[PlayerAction]
+            The line of moves, [NO_MOVE] if the result of the ply came from another branch.
+        """
+        if self.pv_length[ply] == FOREIGN_LINE:
+            return [NO_MOVE]
+        return self.pv_table[ply][:self.pv_length[ply]]
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int, player: BoardPiece,
+                board_evaluation: Optional[int]) -> int:
+        """
+        Main recursion of the negamax search. Like minimax_rec, results outside the window are not made more precise
+        than the window bound on the failing-low side. With principal variation search, every move but the first is
+        searched with a null window first and only searched again with the full window if it turns out to be better.
+
+        Parameters
+        ----------
+        depth: int
+            Remaining depth.
+        alpha: int
+            Alpha for alpha-beta pruning, from the view of the player to move.
+        beta: int
+            Beta for alpha-beta pruning, from the view of the player to move.
+        ply: int
+            Distance to the root of the search.
+        player: BoardPiece
+            The player to make a move.
+        board_evaluation: Optional[int]
+            Evaluation of the boards, updated incrementally with every move. None to evaluate the boards from scratch.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set.
+
+        Returns
+        -------
+        :int
+            Evaluation of the position from the view of the player to move.
+        """
+        if self.stop_flag is not None and self.stop_flag.value:
+            raise SearchInterrupted
+        self.nodes += 1
+        board_player_one: int = self.board_player_one
+        board_player_two: int = self.board_player_two
+        both_boards: int = board_player_one | board_player_two
+        next_move: Optional[int] = self.next_moves.pop(0) if self.next_moves else None
+        pv_length: [int] = self.pv_length
+        if both_boards == FULL_BOARD:
+            pv_length[ply] = 0
+            return EVAL_DRAWN_POSITION
+        sign: int = 1 if player == PLAYER1 else -1
+        if depth == 0:  # Only reached if the search is started at depth 0.
+            pv_length[ply] = 0
+            return sign * self.evaluate_leaf(board_player_one=board_player_one, board_player_two=board_player_two,
+                                             board_evaluation=board_evaluation)
+        pv: [int] = self.pv_table[ply]
+        child_pv: [int] = self.pv_table[ply + 1]
+        search_child = self.search_child
+        move_ordering: Optional[MoveOrdering] = self.move_ordering
+        if move_ordering is None or depth < MIN_MOVE_ORDERING_DEPTH:
+            moves: [PlayerAction] = MOVE_ORDERS[next_move]
+        else:
+            entry = get_entry_from_transposition_table(board_player_one=board_player_one,
+                                                       board_player_two=board_player_two,
+                                                       transposition_table=self.transposition_table)
+            moves: [PlayerAction] = move_ordering.get_move_order(
+                board_player_one=board_player_one, board_player_two=board_player_two, player=player, ply=ply,
+                first_moves=(next_move, NO_MOVE if entry is None else entry[3]))
+        if self.threat_pruning:
+            if sign == 1:
+                playable: int = get_threat_aware_positions(board_player=board_player_one,
+                                                           board_opponent=board_player_two)
+            else:
+                playable: int = get_threat_aware_positions(board_player=board_player_two,
+                                                           board_opponent=board_player_one)
+        else:
+            playable: int = (both_boards + BOTTOM_ROW) & FULL_BOARD
+        pv_length[ply] = FOREIGN_LINE
+        first_move: bool = True
+        for move in moves:
+            if not playable & COLUMNS_FILLED[move]:
+                continue
+            try:
+                if first_move or not self.principal_variation_search:
+                    score: int = search_child(depth, alpha, beta, ply, player, board_evaluation, move)
+                else:
+                    score: int = search_child(depth, alpha, alpha + 1, ply, player, board_evaluation, move)
+                    if alpha < score < beta:  # The move is better than the first one, its exact value is needed.
+                        score = search_child(depth, alpha, beta, ply, player, board_evaluation, move)
+            except SearchInterrupted:
+                self.board_player_one, self.board_player_two = board_player_one, board_player_two
+                if ply or first_move:
+                    raise
+                # At the root, the moves searched completely are passed on.
+                raise SearchInterrupted([sign * alpha, self.get_line(ply=0)])
+            first_move = False
+            if score > alpha:
+                alpha = score
+                length: int = pv_length[ply + 1]
+                if length == FOREIGN_LINE:
+                    pv_length[ply] = FOREIGN_LINE
+                else:
+                    pv[0] = move
+                    pv[1:length + 1] = child_pv[:length]
+                    pv_length[ply] = length + 1
+                if alpha >= beta:
+                    if move_ordering is not None and depth >= MIN_MOVE_ORDERING_DEPTH:
+                        move_ordering.update(board_player_one=board_player_one, board_player_two=board_player_two,
+                                             player=player, ply=ply, move=move, depth=depth)
+                    return alpha
+        return alpha
+
+    def search_child(self, depth: int, alpha: int, beta: int, ply: int, player: BoardPiece,
+                     board_evaluation: Optional[int], move: PlayerAction) -> int:
+        """
+        Plays the given move, evaluates the resulting position and takes the move back. The result is taken from the
+        transposition table if there is a usable entry, otherwise the position is searched and the result is saved,
+        like get_alpha and get_beta do it. Positions at the maximum depth are evaluated directly.
+
+        Parameters
+        ----------
+        depth: int
+            Remaining depth before the move.
+        alpha: int
+            Alpha for alpha-beta pruning, from the view of the player making the move.
+        beta: int
+            Beta for alpha-beta pruning, from the view of the player making the move.
+        ply: int
+            Distance of the position before the move to the root of the search.
+        player: BoardPiece
+            The player making the move.
+        board_evaluation: Optional[int]
+            Evaluation of the boards before the move, None to evaluate the boards from scratch.
+        move: PlayerAction
+            The move to play, its column must not be full.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set, the move is not taken back then.
+
+        Returns
+        -------
+        :int
+            Evaluation of the position after the move from the view of the player making the move.
+        """
+        board_player_one: int = self.board_player_one
+        board_player_two: int = self.board_player_two
+        both_boards: int = board_player_one | board_player_two
+        position: int = (both_boards + BOTTOM_POSITIONS[move]) & COLUMNS_FILLED[move]
+        new_both_boards: int = both_boards | position
+        if player == PLAYER1:
+            sign: int = 1
+            new_board_player_one: int = board_player_one | position
+            new_board_player_two: int = board_player_two
+            mover_board: int = new_board_player_one
+            # Window as absolute values, the transposition table is used with absolute evaluations.
+            window_alpha, window_beta = alpha, beta
+        else:
+            sign: int = -1
+            new_board_player_one: int = board_player_one
+            new_board_player_two: int = board_player_two | position
+            mover_board: int = new_board_player_two
+            window_alpha, window_beta = -beta, -alpha
+        self.board_player_one, self.board_player_two = new_board_player_one, new_board_player_two
+        child_depth: int = depth - 1
+        pv_length: [int] = self.pv_length
+        transposition_table: TranspositionTable = self.transposition_table
+        key, mirrored = get_canonical_key(board_player_one=new_board_player_one, board_player_two=new_board_player_two)
+        entry = transposition_table.get_entry(key=key, depth=child_depth)
+        if entry is not None and entry[1] >= child_depth:
+            evaluation, _, bound, _ = entry
+            if bound == BOUND_EXACT or (bound == BOUND_LOWER and evaluation >= window_beta) or \
+                    (bound == BOUND_UPPER and evaluation <= window_alpha):
+                line: list[PlayerAction] = get_line_from_transposition_table(
+                    board_player_one=new_board_player_one, board_player_two=new_board_player_two,
+                    player=BoardPiece(3 - player), transposition_table=transposition_table, depth=child_depth)
+                self.pv_table[ply + 1][:len(line)] = line
+                pv_length[ply + 1] = len(line)
+                self.board_player_one, self.board_player_two = board_player_one, board_player_two
+                return sign * evaluation
+        stop_flag = self.stop_flag
+        position_cache: Optional[PositionCache] = self.position_cache
+        won: bool = connected_four(board=mover_board)
+        proven_result: Optional[tuple[int, PlayerAction]] = None
+        if position_cache is not None and not won and new_both_boards != FULL_BOARD:
+            proven_result = position_cache.get_entry(board_player_one=new_board_player_one,
+                                                     board_player_two=new_board_player_two)
+        if won:  # The position is won by the move.
+            if stop_flag is not None and stop_flag.value:
+                raise SearchInterrupted
+            self.nodes += 1
+            if self.next_moves:
+                self.next_moves.pop(0)
+            pv_length[ply + 1] = 0
+            score: int = START_VALUE * 2 ** child_depth
+        elif proven_result is not None:  # Like a leaf, with the best move of the cache as its line.
+            if stop_flag is not None and stop_flag.value:
+                raise SearchInterrupted
+            self.nodes += 1
+            if self.next_moves:
+                self.next_moves.pop(0)
+            self.pv_table[ply + 1][0] = proven_result[1]
+            pv_length[ply + 1] = 1
+            score: int = sign * handle_proven_eval(player=BoardPiece(3 - player), score=proven_result[0],
+                                                   current_depth=child_depth, pieces=new_both_boards.bit_count())
+        elif child_depth:
+            child_evaluation: Optional[int] = None
+            if board_evaluation is not None:  # Like evaluate_action_difference, the position of the piece is known.
+                evaluation_differences: [[int]] = EVALUATION_DIFFERENCES_PLAYER_ONE if sign == 1 else \
+                    EVALUATION_DIFFERENCES_PLAYER_TWO
+                child_evaluation = board_evaluation
+                for window in MINIMAX_EVALUATION_WINDOWS_BY_POSITION[position.bit_length() - 1]:
+                    child_evaluation += evaluation_differences[(window & new_board_player_one).bit_count()][
+                        (window & new_board_player_two).bit_count()]
+            score: int = -self.negamax(depth=child_depth, alpha=-beta, beta=-alpha, ply=ply + 1,
+                                       player=BoardPiece(3 - player), board_evaluation=child_evaluation)
+        else:  # The position is a leaf, it is evaluated here to save the call of negamax.
+            if stop_flag is not None and stop_flag.value:
+                raise SearchInterrupted
+            self.nodes += 1
+            if self.next_moves:
+                self.next_moves.pop(0)
+            pv_length[ply + 1] = 0
+            if new_both_boards == FULL_BOARD:
+                score: int = EVAL_DRAWN_POSITION
+            elif board_evaluation is not None:
+                evaluation_differences: [[int]] = EVALUATION_DIFFERENCES_PLAYER_ONE if sign == 1 else \
+                    EVALUATION_DIFFERENCES_PLAYER_TWO
+                score: int = board_evaluation
+                for window in MINIMAX_EVALUATION_WINDOWS_BY_POSITION[position.bit_length() - 1]:
+                    score += evaluation_differences[(window & new_board_player_one).bit_count()][
+                        (window & new_board_player_two).bit_count()]
+                score *= sign
+            else:
+                score: int = sign * self.evaluate_leaf(board_player_one=new_board_player_one,
+                                                       board_player_two=new_board_player_two, board_evaluation=None)
+        self.board_player_one, self.board_player_two = board_player_one, board_player_two
+        # Saves the result like save_eval_in_transposition_table.
+        evaluation: int = sign * score
+        if evaluation <= window_alpha:
+            bound: int = BOUND_UPPER
+        elif evaluation >= window_beta:
+            bound: int = BOUND_LOWER
+        else:
+            bound: int = BOUND_EXACT
+        best_move: PlayerAction = self.pv_table[ply + 1][0] if pv_length[ply + 1] > 0 else NO_MOVE
+        if position_cache is not None and bound == BOUND_EXACT and proven_result is None and best_move != NO_MOVE:
+            remaining_depth: int = (abs(score) // START_VALUE).bit_length() - 1
+            if remaining_depth >= 1:  # Saved like save_proven_eval_in_position_cache.
+                position_cache.store_entry(board_player_one=new_board_player_one,
+                                           board_player_two=new_board_player_two, move=best_move,
+                                           score=get_score_of_distance(distance=child_depth - remaining_depth,
+                                                                       pieces=new_both_boards.bit_count()))
+        if mirrored:
+            best_move = mirror_move(move=best_move)
+        transposition_table.store_entry(key=key, evaluation=evaluation, depth=child_depth, bound=bound, move=best_move)
+        return score
+
+    def evaluate_leaf(self, board_player_one: int, board_player_two: int, board_evaluation: Optional[int]) -> int:
+        """
+        Evaluates a position at the maximum depth.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        board_evaluation: Optional[int]
+            Evaluation of the boards updated incrementally, None to evaluate the boards from scratch.
+
+        Returns
+        -------
+        :int
+            Evaluation of the position, positive if it is good for player one.
+        """
+        if board_evaluation is not None:
+            return board_evaluation
+        if self.evaluate_board is None:
+            return evaluate_board_using_windows(board_player_one=board_player_one, board_player_two=board_player_two)
+        return self.evaluate_board(board_player_one, board_player_two)
+
+
+class NegamaxSearchWithStatistics(NegamaxSearch):
+    """
+    NegamaxSearch counting the leaves, cutoffs, transposition table accesses and the deepest ply in the given
+    statistics. The counting wraps the methods of the search, so a search without statistics does not pay for it.
+
+    A call of search_child which does not add a node is a transposition table hit, every other finished call saves
+    its result in the table. A call adding a node without a line is a leaf. A cutoff happened if negamax returns at
+    least beta after searching a move.
+    """
+
+    def __init__(self, statistics: SearchStatistics, **kwargs):
+        """
+        Parameters
+        ----------
+        statistics: SearchStatistics
+            Statistics to count the search in.
+        kwargs
+            Arguments of NegamaxSearch.
+        """
+        super().__init__(**kwargs)
+        self.statistics: SearchStatistics = statistics
+        # Amount of moves searched and the last move searched at every ply.
+        self.moves_searched: [int] = [0] * (MAX_PLY + 1)
+        self.last_moves: [Optional[PlayerAction]] = [None] * (MAX_PLY + 1)
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int, player: BoardPiece,
+                board_evaluation: Optional[int]) -> int:
+        nodes: int = self.nodes
+        self.moves_searched[ply], self.last_moves[ply] = 0, None
+        score: int = super().negamax(depth=depth, alpha=alpha, beta=beta, ply=ply, player=player,
+                                     board_evaluation=board_evaluation)
+        statistics: SearchStatistics = self.statistics
+        if ply == 0 and self.nodes == nodes + 1 and self.pv_length[0] == 0:  # Other leaves are counted by the parent.
+            statistics.leaves += 1
+        if score >= beta and self.moves_searched[ply]:
+            statistics.cutoffs[self.moves_searched[ply] - 1] += 1
+        return score
+
+    def search_child(self, depth: int, alpha: int, beta: int, ply: int, player: BoardPiece,
+                     board_evaluation: Optional[int], move: PlayerAction) -> int:
+        if move != self.last_moves[ply]:  # Principal variation search can search the same move twice.
+            self.moves_searched[ply] += 1
+            self.last_moves[ply] = move
+        nodes: int = self.nodes
+        score: int = super().search_child(depth, alpha, beta, ply, player, board_evaluation, move)
+        statistics: SearchStatistics = self.statistics
+        statistics.transposition_table_probes += 1
+        if self.nodes == nodes:
+            statistics.transposition_table_hits += 1
+        else:
+            statistics.transposition_table_stores += 1
+            statistics.max_ply = max(statistics.max_ply, ply + 1)
+            if self.pv_length[ply + 1] == 0:
+                statistics.leaves += 1
+        return score
+
+
+def generate_move_negamax_id(board_player_one: int, board_player_two: int, player: BoardPiece,
+                             saved_state: Optional[SavedState], next_moves: list[int], depth: int,
+                             stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                             evaluate_board: Optional[Callable[[int, int], int]] = None,
+                             principal_variation_search: bool = False, aspiration_window: Optional[int] = None,
+                             dynamic_move_ordering: bool = False, threat_pruning: bool = False) -> \
+        list[int, [PlayerAction]]:
+    """
+    Generates the next move using the negamax search. Can be used in place of generate_move_minimax_id, with the same
+    arguments and the same result.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The next player to make a move.
+    saved_state: Optional[SavedState]
+        Saved state containing the transposition table, the position cache and the search statistics to use, the
+        nodes searched are added to its nodes. A new transposition table is used if it is not a MinimaxSavedState.
+    next_moves: list[int]
+        Move order to try first to improve alpha-beta-pruning.
+    depth: int
+        Depth of the search tree to stop calculating.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    principal_variation_search: bool
+        Whether to search the moves after the first one with a null window first.
+    aspiration_window: Optional[int]
+        Half the size of the window around the previous evaluation of the position to search the root with, None to
+        search it with the full window.
+    dynamic_move_ordering: bool
+        Whether to order the moves with the move ordering of the saved state instead of MOVE_ORDER.
+    threat_pruning: bool
+        Whether to only search immediate wins, forced blocks and moves not below a winning cell of the opponent.
+
+    Returns
+    -------
+    :list[int, [PlayerAction]]
+        List containing the evaluation and the list of PlayerActions to get to that evaluation.
+    """
+    if not isinstance(saved_state, MinimaxSavedState):
+        saved_state = MinimaxSavedState()
+    search_arguments: dict = dict(transposition_table=saved_state.transposition_table, stop_flag=stop_flag,
+                                  evaluate_board=evaluate_board, principal_variation_search=principal_variation_search,
+                                  aspiration_window=aspiration_window,
+                                  move_ordering=saved_state.move_ordering if dynamic_move_ordering else None,
+                                  threat_pruning=threat_pruning, position_cache=saved_state.position_cache)
+    if saved_state.statistics is None:
+        search = NegamaxSearch(**search_arguments)
+    else:
+        search = NegamaxSearchWithStatistics(statistics=saved_state.statistics, **search_arguments)
+    try:
+        return search.search(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                             depth=depth, next_moves=next_moves)
+    finally:
+        saved_state.nodes += search.nodes
+        if saved_state.statistics is not None:
+            saved_state.statistics.nodes += search.nodes
+
+
+def generate_move_pvs_id(board_player_one: int, board_player_two: int, player: BoardPiece,
+                         saved_state: Optional[SavedState], next_moves: list[int], depth: int,
+                         stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                         evaluate_board: Optional[Callable[[int, int], int]] = None) -> list[int, [PlayerAction]]:
+    """
+    Generates the next move using the negamax search with principal variation search, aspiration windows around the
+    evaluation of the previous depth, the dynamic move ordering of the saved state and threat pruning. Can be used in
+    place of generate_move_minimax_id.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The next player to make a move.
+    saved_state: Optional[SavedState]
+        Saved state containing the transposition table to use. A new transposition table is used if it is not a
+        MinimaxSavedState.
+    next_moves: list[int]
+        Move order to try first to improve alpha-beta-pruning.
+    depth: int
+        Depth of the search tree to stop calculating.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the search.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+
+    Returns
+    -------
+    :list[int, [PlayerAction]]
+        List containing the evaluation and the list of PlayerActions to get to that evaluation.
+    """
+    return generate_move_negamax_id(board_player_one=board_player_one, board_player_two=board_player_two,
+                                    player=player, saved_state=saved_state, next_moves=next_moves, depth=depth,
+                                    stop_flag=stop_flag, evaluate_board=evaluate_board,
+                                    principal_variation_search=True, aspiration_window=ASPIRATION_WINDOW,
+                                    dynamic_move_ordering=True, threat_pruning=True)
@@ -0,0 +1,200 @@
+"""
+Opening book: the best moves of all positions of the first plies, searched offline and saved in a sorted binary file.
+
+Create a book from the root of the project:
+    python -m agents.agent_minimax.opening_book --plies 4 --depth 10 --output opening_book.bin
+"""
+from typing import Optional, Callable
+import argparse
+import mmap
+import struct
+
+from agents.game_utils import BoardPiece, PlayerAction, PLAYER1, PLAYER2, apply_player_action, get_possible_moves
+from agents.agent_minimax.transposition_table import get_canonical_key, mirror_move
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import generate_move_pvs_id
+
+BOOK_MAGIC: bytes = b"C4BOOK01"
+# Magic bytes, number of plies and search depth the book was created with.
+HEADER: struct.Struct = struct.Struct("<8sHH")
+# Canonical position key, evaluation from the view of player one and the best move of the canonical position.
+RECORD: struct.Struct = struct.Struct("<Qib")
+MAX_RECORD_EVALUATION: int = 2 ** 31 - 1
+BOOK_PLIES: int = 4
+BOOK_DEPTH: int = 10
+BOOK_TRANSPOSITION_TABLE_SIZE_MB: int = 64
+
+
+class OpeningBook:
+    """
+    Read-only opening book. The file is memory-mapped and the sorted records are binary-searched in place, so looking
+    up a position takes microseconds and the book is never loaded into Python objects. Positions are saved under
+    their canonical key, the move of a mirrored position is mirrored back when it is looked up.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, "rb") as file:
+            self.mmap: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.plies, self.depth = HEADER.unpack_from(self.mmap, 0)
+        if magic != BOOK_MAGIC or (len(self.mmap) - HEADER.size) % RECORD.size:
+            self.mmap.close()
+            raise ValueError("{} is not an opening book".format(path))
+        self.number_of_records: int = (len(self.mmap) - HEADER.size) // RECORD.size
+
+    def get_entry(self, board_player_one: int, board_player_two: int) -> Optional[tuple[int, PlayerAction]]:
+        """
+        Looks up a position in the book.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+
+        Returns
+        -------
+        :Optional[tuple[int, PlayerAction]]
+            None if the position is not in the book, otherwise a tuple containing the evaluation of the position from
+            the view of player one and the best move.
+        """
+        canonical_key, mirrored = get_canonical_key(board_player_one=int(board_player_one),
+                                                    board_player_two=int(board_player_two))
+        low: int = 0
+        high: int = self.number_of_records
+        while low < high:
+            middle: int = (low + high) // 2
+            record_key, evaluation, move = RECORD.unpack_from(self.mmap, HEADER.size + middle * RECORD.size)
+            if record_key < canonical_key:
+                low = middle + 1
+            elif record_key > canonical_key:
+                high = middle
+            else:
+                return evaluation, mirror_move(move=PlayerAction(move)) if mirrored else PlayerAction(move)
+        return None
+
+    def get_move(self, board_player_one: int, board_player_two: int) -> Optional[PlayerAction]:
+        """
+        Looks up the best move of a position in the book.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+
+        Returns
+        -------
+        :Optional[PlayerAction]
+            The best move, None if the position is not in the book.
+        """
+        entry: Optional[tuple[int, PlayerAction]] = self.get_entry(board_player_one=board_player_one,
+                                                                   board_player_two=board_player_two)
+        return None if entry is None else entry[1]
+
+    def close(self):
+        self.mmap.close()
+
+    def __len__(self) -> int:
+        return self.number_of_records
+
+
+def get_book_positions(plies: int) -> dict[int, tuple[int, int, BoardPiece]]:
+    """
+    Collects all positions with at most the given number of pieces which can be reached without the game ending, one
+    of every pair of mirrored positions.
+
+    Parameters
+    ----------
+    plies: int
+        Number of plies played in the deepest positions of the book.
+
+    Returns
+    -------
+    :dict[int, tuple[int, int, BoardPiece]]
+        The boards of both players and the player to move of every position, by the canonical key of the position.
+    """
+    positions: dict[int, tuple[int, int, BoardPiece]] = {}
+    current_positions: [tuple[int, int, BoardPiece]] = [(0, 0, PLAYER1)]
+    for _ in range(plies + 1):
+        next_positions: [tuple[int, int, BoardPiece]] = []
+        for board_player_one, board_player_two, player in current_positions:
+            canonical_key: int = get_canonical_key(board_player_one=board_player_one,
+                                                   board_player_two=board_player_two)[0]
+            if canonical_key in positions:
+                continue
+            moves, _ = get_possible_moves(board_player_one=board_player_one, board_player_two=board_player_two,
+                                          player=player)
+            if not moves:  # The game is over.
+                continue
+            positions[canonical_key] = (board_player_one, board_player_two, player)
+            for move in moves:
+                next_positions.append((*apply_player_action(board_player_one=board_player_one,
+                                                            board_player_two=board_player_two, player=player,
+                                                            action=move), PLAYER2 if player == PLAYER1 else PLAYER1))
+        current_positions = next_positions
+    return positions
+
+
+def generate_opening_book(path: str, plies: int = BOOK_PLIES, depth: int = BOOK_DEPTH,
+                          search_function: Callable[..., list] = generate_move_pvs_id,
+                          transposition_table_size_mb: int = BOOK_TRANSPOSITION_TABLE_SIZE_MB) -> int:
+    """
+    Searches all positions with at most the given number of pieces with iterative deepening to the given depth and
+    writes the best moves into an opening book file.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file to write.
+    plies: int
+        Number of plies played in the deepest positions of the book.
+    depth: int
+        Depth to search every position to.
+    search_function: Callable[..., list]
+        Search of a single depth with the arguments of generate_move_minimax_id.
+    transposition_table_size_mb: int
+        Size of the transposition table shared by the searches of all positions.
+
+    Returns
+    -------
+    :int
+        The number of positions in the book.
+    """
+    saved_state: MinimaxSavedState = MinimaxSavedState(transposition_table_size_mb=transposition_table_size_mb)
+    records: [tuple[int, int, int]] = []
+    for canonical_key, (board_player_one, board_player_two, player) in \
+            sorted(get_book_positions(plies=plies).items()):
+        evaluation: list[int, [PlayerAction]] = [0, []]
+        for search_depth in range(1, depth + 1):
+            evaluation = search_function(board_player_one=board_player_one, board_player_two=board_player_two,
+                                         player=player, saved_state=saved_state, next_moves=evaluation[1],
+                                         depth=search_depth)
+        if not evaluation[1]:
+            continue
+        move: int = int(evaluation[1][0])
+        if get_canonical_key(board_player_one=board_player_one, board_player_two=board_player_two)[1]:
+            move = mirror_move(move=move)  # The position is saved as its mirrored position.
+        records.append((canonical_key, min(max(evaluation[0], -MAX_RECORD_EVALUATION), MAX_RECORD_EVALUATION), move))
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(BOOK_MAGIC, plies, depth))
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return len(records)
+
+
+def main(arguments: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plies", type=int, default=BOOK_PLIES, help="number of pieces of the deepest positions")
+    parser.add_argument("--depth", type=int, default=BOOK_DEPTH, help="search depth of every position")
+    parser.add_argument("--output", default="opening_book.bin", help="path of the book to write")
+    arguments = parser.parse_args(arguments)
+    number_of_positions: int = generate_opening_book(path=arguments.output, plies=arguments.plies,
+                                                     depth=arguments.depth)
+    print("{} positions written to {}".format(number_of_positions, arguments.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Callable
+import contextlib
+import logging
+import multiprocessing
+import multiprocessing.sharedctypes
+import os
+import time
+
+from agents.game_utils import BoardPiece, PlayerAction, PLAYER1, apply_player_action
+from agents.agent_minimax.minimax import SearchInterrupted, MAX_VALUE, is_mate_evaluation, minimax_rec, \
+    get_possible_moves_iterative, handle_empty_moves_eval, evaluate_board_using_windows, evaluate_action_difference, \
+    line_ends_game, save_eval_in_transposition_table, create_search_info
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.search_statistics import SearchStatistics
+from agents.agent_minimax.time_control import SearchDeadline, PonderDeadline, StableBestMove, STABLE_ITERATIONS
+from agents.agent_minimax.transposition_table import TranspositionTable, SharedTranspositionTable, \
+    TRANSPOSITION_TABLE_SIZE_MB
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+PARALLEL_PROCESSES: int = os.cpu_count() or 1
+MAX_ROOT_MOVES: int = 7  # More processes than root moves are never used.
+
+# Transposition table, stop flag and ponder deadline of a process of the pool, set by initialize_search_process.
+process_transposition_table: Optional[TranspositionTable] = None
+process_stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None
+process_ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized] = None
+
+
+def initialize_search_process(stop_flag: Optional[multiprocessing.sharedctypes.Synchronized],
+                              transposition_table_size_mb: int,
+                              shared_transposition_table: Optional[SharedTranspositionTable] = None,
+                              ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized] = None):
+    """
+    Initializer of the processes of the pool. All processes use the shared transposition table if there is one,
+    otherwise every process keeps its own transposition table for all root moves it searches.
+
+    Parameters
+    ----------
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the searches from the outside.
+    transposition_table_size_mb: int
+        Size of the transposition table of the process.
+    shared_transposition_table: Optional[SharedTranspositionTable]
+        Transposition table shared by all processes.
+    ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized]
+        Deadline of the searches without a deadline of their own, set by the search worker on a ponder hit.
+    """
+    global process_transposition_table, process_stop_flag, process_ponder_deadline
+    if shared_transposition_table is None:
+        process_transposition_table = TranspositionTable(size_mb=transposition_table_size_mb)
+    else:
+        process_transposition_table = shared_transposition_table
+    process_stop_flag = stop_flag
+    process_ponder_deadline = ponder_deadline
+
+
+def create_search_pool(processes: int, stop_flag: Optional[multiprocessing.sharedctypes.Synchronized],
+                       transposition_table_size_mb: int = TRANSPOSITION_TABLE_SIZE_MB,
+                       shared_transposition_table: Optional[SharedTranspositionTable] = None,
+                       ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized] = None) -> \
+        ProcessPoolExecutor:
+    """
+    Starts the pool of processes searching the root moves. A pool kept for several searches, e.g. by the search
+    worker, saves the start of the processes and keeps the transposition tables of the processes filled.
+
+    Parameters
+    ----------
+    processes: int
+        Number of processes searching in parallel, at most MAX_ROOT_MOVES are started.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the searches from the outside.
+    transposition_table_size_mb: int
+        Size of the transposition table of every process.
+    shared_transposition_table: Optional[SharedTranspositionTable]
+        Transposition table shared by all processes.
+    ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized]
+        Deadline of the searches without a deadline of their own, see PonderDeadline.
+
+    Returns
+    -------
+    :ProcessPoolExecutor
+        The pool, to be shut down by the caller.
+    """
+    return ProcessPoolExecutor(max_workers=max(1, min(processes, MAX_ROOT_MOVES)),
+                               initializer=initialize_search_process,
+                               initargs=(stop_flag, transposition_table_size_mb, shared_transposition_table,
+                                         ponder_deadline))
+
+
+def generate_move_loop_parallel(move_output: multiprocessing.sharedctypes.Synchronized, board_player_one: int,
+                                board_player_two: int, player: BoardPiece, depth: int,
+                                loop_over_flag: multiprocessing.Event, saved_state: Optional[MinimaxSavedState] = None,
+                                stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                                evaluate_board: Optional[Callable[[int, int], int]] = None,
+                                deadline: Optional[float] = None, processes: int = PARALLEL_PROCESSES,
+                                on_iteration: Optional[Callable[[dict], None]] = None,
+                                executor: Optional[ProcessPoolExecutor] = None,
+                                stable_iterations: Optional[int] = STABLE_ITERATIONS) -> int:
+    """
+    Iterative deepening like generate_move_loop_to_stop, but the root moves of every depth are searched in parallel by
+    a pool of processes, see generate_move_minimax_parallel. The loop stops early at a forced win or loss and at a
+    stable best move like generate_move_loop_to_stop.
+
+    Parameters
+    ----------
+    move_output: multiprocessing.sharedctypes.Synchronized
+        Variable to return from this function - needed for execution in another process.
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    depth: int
+        Depth to start the iterative deepening with.
+    loop_over_flag: multiprocessing.Event
+        Event to stop loop if all moves are calculated.
+    saved_state: Optional[MinimaxSavedState]
+        Saved state to save the evaluations of the root moves in. If its transposition table is shared, it is used by
+        all processes of the pool.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the loop from the outside when the time is over.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at, checked every few nodes.
+    processes: int
+        Number of processes searching in parallel.
+    on_iteration: Optional[Callable[[dict], None]]
+        Called with the info of every depth searched completely, see create_search_info.
+    executor: Optional[ProcessPoolExecutor]
+        Pool to search in, see create_search_pool. A pool of the given number of processes is started for this search
+        if it is None.
+    stable_iterations: Optional[int]
+        Number of iterations in a row with the same best move after which the search may stop early, None to not stop
+        early at a stable best move.
+
+    Returns
+    -------
+    :int
+        The deepest depth searched completely.
+    """
+    start_time: float = time.monotonic()
+    if saved_state is None:
+        saved_state = MinimaxSavedState()
+    saved_state.transposition_table.new_search()
+    saved_state.evaluation, saved_state.line, saved_state.nodes = None, [], 0
+    evaluation: list[int, [PlayerAction]] = [0, []]
+    stable_best_move: Optional[StableBestMove] = None
+    if stable_iterations is not None and (deadline is not None or isinstance(stop_flag, SearchDeadline)):
+        stable_best_move = StableBestMove(stable_iterations=stable_iterations)
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            shared_transposition_table: Optional[SharedTranspositionTable] = None
+            if isinstance(saved_state.transposition_table, SharedTranspositionTable):
+                shared_transposition_table = saved_state.transposition_table
+            executor = stack.enter_context(create_search_pool(
+                processes=processes, stop_flag=stop_flag,
+                transposition_table_size_mb=saved_state.transposition_table.size_mb,
+                shared_transposition_table=shared_transposition_table))
+        while True:  # Gets stopped from the outside or by the deadline.
+            iteration_start_time: float = time.monotonic()
+            iteration_start_nodes: int = saved_state.nodes
+            try:
+                evaluation = generate_move_minimax_parallel(board_player_one=board_player_one,
+                                                            board_player_two=board_player_two, player=player,
+                                                            saved_state=saved_state, next_moves=evaluation[1],
+                                                            executor=executor, depth=depth, deadline=deadline,
+                                                            evaluate_board=evaluate_board, stop_flag=stop_flag)
+            except SearchInterrupted as interrupted:
+                if interrupted.args and interrupted.args[0][1][0] >= 0:  # Result of the partially searched depth.
+                    move_output.value = interrupted.args[0][1][0]
+                    logger.info("Moves at depth %2d (partial) : %s", depth, interrupted.args[0][1])
+                return depth - 1
+            if on_iteration is not None:
+                on_iteration(create_search_info(depth=depth, evaluation=evaluation, nodes=saved_state.nodes,
+                                                start_time=start_time))
+            if depth >= len(evaluation[1]) + 1 and \
+                    line_ends_game(board_player_one=board_player_one, board_player_two=board_player_two,
+                                   player=player, moves=evaluation[1]):  # All possible moves are calculated.
+                loop_over_flag.set()
+                saved_state.evaluation, saved_state.line = evaluation[0], list(evaluation[1])
+                return depth
+            move_output.value = evaluation[1][0]
+            saved_state.evaluation, saved_state.line = evaluation[0], list(evaluation[1])
+            logger.info("Moves at depth %2d : %s", depth, evaluation[1])
+            if is_mate_evaluation(evaluation=evaluation[0]):  # A forced win or loss ends the search.
+                loop_over_flag.set()
+                return depth
+            if stable_best_move is not None:
+                # Without a deadline of its own, the search is pondering with the deadline of a PonderDeadline.
+                search_deadline: float = stop_flag.deadline if deadline is None else deadline
+                if stable_best_move.update(best_move=evaluation[1][0],
+                                           seconds=time.monotonic() - iteration_start_time,
+                                           nodes=saved_state.nodes - iteration_start_nodes,
+                                           seconds_left=search_deadline - time.monotonic()):
+                    loop_over_flag.set()
+                    return depth
+            depth += 1
+
+
+def generate_move_minimax_parallel(board_player_one: int, board_player_two: int, player: BoardPiece,
+                                   saved_state: MinimaxSavedState, next_moves: list[int], executor: ProcessPoolExecutor,
+                                   depth: int, deadline: Optional[float] = None,
+                                   evaluate_board: Optional[Callable[[int, int], int]] = None,
+                                   stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None) -> \
+        list[int, [PlayerAction]]:
+    """
+    Searches the first root move in this process with the full window and the transposition table of the saved state.
+    Its evaluation bounds the window of the other root moves, which are searched in parallel by the processes of the
+    pool: a move which is not better than the first one fails low quickly. Ties are broken by the move order, so the
+    best move of the previous depth is kept if it is still as good as any other. The nodes searched by all processes
+    are added to the nodes of the saved state.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The next player to make a move.
+    saved_state: MinimaxSavedState
+        Saved state to save the evaluations of the root moves in.
+    next_moves: list[int]
+        Best line of the previous depth, its first move is searched first.
+    executor: ProcessPoolExecutor
+        Pool of processes to search the root moves in.
+    depth: int
+        Depth of the search tree to stop calculating.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the search of the first root move, the processes of the pool use the stop flag of the pool.
+
+    Raises
+    ----------
+    SearchInterrupted
+        If the search was stopped, carrying the best result found so far if the first root move was searched
+        completely.
+
+    Returns
+    -------
+    :list[int, [PlayerAction]]
+        List containing the evaluation and the list of PlayerActions to get to that evaluation.
+    """
+    next_moves = next_moves.copy()
+    possible_moves, game_state = get_possible_moves_iterative(board_player_one=board_player_one,
+                                                              board_player_two=board_player_two, player=player,
+                                                              next_moves=next_moves)
+    if not possible_moves:
+        return [handle_empty_moves_eval(player=player, game_state=game_state, current_depth=depth), []]
+    best_result, nodes = search_move(board_player_one=board_player_one, board_player_two=board_player_two,
+                                     player=player, move=possible_moves[0], depth=depth, next_moves=next_moves,
+                                     transposition_table=saved_state.transposition_table, stop_flag=stop_flag,
+                                     deadline=deadline, evaluate_board=evaluate_board)
+    saved_state.nodes += nodes
+    if best_result is None:
+        raise SearchInterrupted
+    save_root_move(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                   move=possible_moves[0], saved_state=saved_state, depth=depth, window=None, result=best_result)
+    window: int = best_result[0]
+    futures: list[Future] = [executor.submit(search_root_move, board_player_one, board_player_two, player, move,
+                                             depth, window, saved_state.transposition_table.generation, deadline,
+                                             evaluate_board)
+                             for move in possible_moves[1:]]
+    interrupted: bool = False
+    for move, future in zip(possible_moves[1:], futures):
+        result, nodes = future.result()
+        saved_state.nodes += nodes
+        if result is None:
+            interrupted = True
+            continue
+        save_root_move(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                       move=move, saved_state=saved_state, depth=depth, window=window, result=result)
+        if result[0] > best_result[0] if player == PLAYER1 else result[0] < best_result[0]:
+            best_result = result
+    if interrupted:
+        raise SearchInterrupted(best_result)
+    return best_result
+
+
+def save_root_move(board_player_one: int, board_player_two: int, player: BoardPiece, move: PlayerAction,
+                   saved_state: MinimaxSavedState, depth: int, window: Optional[int], result: list):
+    """
+    Saves the result of a root move in the transposition table of the saved state, as a bound if the move was searched
+    with the window of the first root move.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make the root move.
+    move: PlayerAction
+        The root move searched.
+    saved_state: MinimaxSavedState
+        Saved state containing the transposition table.
+    depth: int
+        Depth of the search tree, including the root move.
+    window: Optional[int]
+        Evaluation of the first root move the move was searched against, None for the full window.
+    result: list
+        Result of the search of the move.
+    """
+    alpha, beta = -MAX_VALUE, MAX_VALUE
+    if window is not None and player == PLAYER1:
+        alpha = window
+    elif window is not None:
+        beta = window
+    new_board_player_one, new_board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                     board_player_two=board_player_two,
+                                                                     player=player, action=move)
+    save_eval_in_transposition_table(board_player_one=new_board_player_one, board_player_two=new_board_player_two,
+                                     transposition_table=saved_state.transposition_table, depth=depth - 1,
+                                     alpha=alpha, beta=beta, evaluation=result, moves_line=[move])
+
+
+def search_root_move(board_player_one: int, board_player_two: int, player: BoardPiece, move: PlayerAction,
+                     depth: int, window: Optional[int] = None, generation: Optional[int] = None,
+                     deadline: Optional[float] = None, evaluate_board: Optional[Callable[[int, int], int]] = None) -> \
+        tuple[Optional[list], int]:
+    """
+    Task of a process of the pool: searches the root move with the transposition table and the stop flag of the
+    process, see search_move. A search without a deadline goes on until the ponder deadline of the pool if there is
+    one.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make the root move.
+    move: PlayerAction
+        The root move to search.
+    depth: int
+        Depth of the search tree, including the root move.
+    window: Optional[int]
+        Evaluation of the first root move, None to search with the full window.
+    generation: Optional[int]
+        Generation of the transposition table of the caller, taken over by the table of the process.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+
+    Returns
+    -------
+    :tuple[Optional[list[int, [PlayerAction]]], int]
+        The evaluation and the line starting with the root move, None if the search was stopped, and the nodes
+        searched.
+    """
+    if process_transposition_table is None:  # Called outside the pool.
+        initialize_search_process(stop_flag=None, transposition_table_size_mb=TRANSPOSITION_TABLE_SIZE_MB)
+    if generation is not None:
+        process_transposition_table.generation = generation
+    stop_flag = process_stop_flag
+    if deadline is None and process_ponder_deadline is not None:
+        stop_flag = PonderDeadline(shared_deadline=process_ponder_deadline, stop_flag=stop_flag)
+    return search_move(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                       move=move, depth=depth, next_moves=[], transposition_table=process_transposition_table,
+                       stop_flag=stop_flag, window=window, deadline=deadline, evaluate_board=evaluate_board)
+
+
+def search_move(board_player_one: int, board_player_two: int, player: BoardPiece, move: PlayerAction, depth: int,
+                next_moves: list[int], transposition_table: TranspositionTable,
+                stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None, window: Optional[int] = None,
+                deadline: Optional[float] = None, evaluate_board: Optional[Callable[[int, int], int]] = None) -> \
+        tuple[Optional[list], int]:
+    """
+    Plays the given root move and searches the resulting position. With a window, only a better evaluation than the
+    one of the window is exact, a move which is not better fails low and its evaluation is a bound.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make the root move.
+    move: PlayerAction
+        The root move to search.
+    depth: int
+        Depth of the search tree, including the root move.
+    next_moves: list[int]
+        Best line of the previous depth if the move is its first move, otherwise an empty list.
+    transposition_table: TranspositionTable
+        Transposition table to use.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to stop the search from the outside.
+    window: Optional[int]
+        Evaluation of the first root move, None to search with the full window.
+    deadline: Optional[float]
+        Point in time of time.monotonic() to stop the search at.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+
+    Returns
+    -------
+    :tuple[Optional[list[int, [PlayerAction]]], int]
+        The evaluation and the line starting with the root move, None if the search was stopped, and the nodes
+        searched.
+    """
+    if deadline is not None:
+        stop_flag = SearchDeadline(deadline=deadline, stop_flag=stop_flag)
+    alpha: list[int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: list[int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    if window is not None and player == PLAYER1:
+        alpha = [window, [PlayerAction(-1)]]
+    elif window is not None:
+        beta = [window, [PlayerAction(-1)]]
+    new_board_player_one, new_board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                     board_player_two=board_player_two,
+                                                                     player=player, action=move)
+    board_evaluation: Optional[int] = None
+    if evaluate_board is None:
+        board_evaluation = evaluate_board_using_windows(board_player_one=board_player_one,
+                                                        board_player_two=board_player_two) + \
+            evaluate_action_difference(board_player_one=new_board_player_one, board_player_two=new_board_player_two,
+                                       player=player, action=move)
+    statistics: SearchStatistics = SearchStatistics()  # Counts the nodes.
+    try:
+        return minimax_rec(current_depth=depth - 1, board_player_one=new_board_player_one,
+                           board_player_two=new_board_player_two, player=BoardPiece(3 - player), alpha=alpha,
+                           beta=beta, transposition_table=transposition_table, moves_line=[move],
+                           next_moves=next_moves, maximizing=player != PLAYER1, stop_flag=stop_flag,
+                           board_evaluation=board_evaluation, evaluate_board=evaluate_board,
+                           statistics=statistics), statistics.nodes
+    except SearchInterrupted:
+        return None, statistics.nodes
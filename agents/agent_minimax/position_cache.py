@@ -0,0 +1,181 @@
+from typing import Optional
+import mmap
+import os
+import struct
+
+from agents.game_utils import PlayerAction, FULL_BOARD, position_key
+from agents.agent_minimax.transposition_table import previous_prime
+
+POSITION_CACHE_SIZE_MB: int = 16
+CACHE_MAGIC: bytes = b"C4CACHE1"
+# Magic bytes and number of buckets of the cache.
+HEADER: struct.Struct = struct.Struct("<8sQ")
+# The position key XOR the data word, and the data word.
+RECORD: struct.Struct = struct.Struct("<QQ")
+RECORDS_PER_BUCKET: int = 4
+SCORE_OFFSET: int = 128  # Scores are saved shifted to be positive.
+USED_RECORD: int = 1 << 16  # Set in every data word, so a data word of 0 marks an empty record.
+NUMBER_OF_POSITIONS: int = FULL_BOARD.bit_count()
+
+
+class PositionCache:
+    """
+    Persistent cache of proven results, shared by all game processes using the same file. The file is a hash table of
+    fixed-size records, memory-mapped by every process, so results proven in one game are available in all later
+    games without loading the file. Every record holds the exact score of a position from the view of the player to
+    move (see Solver) and a best move.
+
+    Like in the transposition table, the position key XOR the data word is saved instead of the key, so a record whose
+    two words were not written together, e.g. when two processes write the same record at once, is detected and
+    ignored. This allows several processes to read and write the file at the same time without locks.
+    """
+
+    def __init__(self, path: str, size_mb: int = POSITION_CACHE_SIZE_MB):
+        self.path: str = path
+        self.size_mb: int = size_mb
+        if not os.path.exists(path):
+            create_position_cache_file(path=path, size_mb=size_mb)
+        with open(path, "r+b") as file:
+            self.mmap: mmap.mmap = mmap.mmap(file.fileno(), 0)
+        magic, self.number_of_buckets = HEADER.unpack_from(self.mmap, 0)
+        if magic != CACHE_MAGIC or len(self.mmap) != HEADER.size + \
+                self.number_of_buckets * RECORDS_PER_BUCKET * RECORD.size:
+            self.mmap.close()
+            raise ValueError("{} is not a position cache".format(path))
+
+    def get_entry(self, board_player_one: int, board_player_two: int) -> Optional[tuple[int, PlayerAction]]:
+        """
+        Looks up the proven result of a position.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+
+        Returns
+        -------
+        :Optional[tuple[int, PlayerAction]]
+            None if the position is not in the cache, otherwise a tuple containing the score of the position from the
+            view of the player to move and a best move.
+        """
+        key: int = position_key(board_player_one=int(board_player_one), board_player_two=int(board_player_two))
+        offset: int = HEADER.size + key % self.number_of_buckets * RECORDS_PER_BUCKET * RECORD.size
+        for record_offset in range(offset, offset + RECORDS_PER_BUCKET * RECORD.size, RECORD.size):
+            checked_key, data = RECORD.unpack_from(self.mmap, record_offset)
+            if not data:
+                return None  # Records are filled from the start of the bucket.
+            if checked_key ^ data == key:
+                return ((data >> 8) & 0xFF) - SCORE_OFFSET, PlayerAction(data & 0xFF)
+        return None
+
+    def store_entry(self, board_player_one: int, board_player_two: int, score: int, move: PlayerAction):
+        """
+        Saves the proven result of a position. The first empty record of the bucket or the record of the same
+        position is used, if there is none, a record of the bucket chosen by the key is replaced.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        score: int
+            Exact score of the position from the view of the player to move.
+        move: PlayerAction
+            A best move of the position.
+        """
+        key: int = position_key(board_player_one=int(board_player_one), board_player_two=int(board_player_two))
+        bucket: int = key % self.number_of_buckets
+        offset: int = HEADER.size + bucket * RECORDS_PER_BUCKET * RECORD.size
+        record_offset: int = offset + (key // self.number_of_buckets) % RECORDS_PER_BUCKET * RECORD.size
+        for candidate_offset in range(offset, offset + RECORDS_PER_BUCKET * RECORD.size, RECORD.size):
+            checked_key, data = RECORD.unpack_from(self.mmap, candidate_offset)
+            if not data or checked_key ^ data == key:
+                record_offset = candidate_offset
+                break
+        new_data: int = USED_RECORD | (score + SCORE_OFFSET) << 8 | int(move)
+        RECORD.pack_into(self.mmap, record_offset, key ^ new_data, new_data)
+
+    def close(self):
+        self.mmap.close()
+
+    def __len__(self) -> int:
+        return sum(1 for index in range(self.number_of_buckets * RECORDS_PER_BUCKET)
+                   if RECORD.unpack_from(self.mmap, HEADER.size + index * RECORD.size)[1])
+
+    def __getstate__(self) -> dict:
+        return dict(path=self.path, size_mb=self.size_mb)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)  # Maps the same file again in the receiving process.
+
+
+def create_position_cache_file(path: str, size_mb: int = POSITION_CACHE_SIZE_MB):
+    """
+    Creates an empty position cache file, unless the file exists already. The file is written under a temporary name
+    and linked to the path, so processes creating the cache at the same time never see a half-written file and all
+    end up using the same file.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file to create.
+    size_mb: int
+        Size of the file.
+    """
+    number_of_buckets: int = previous_prime(max(2, size_mb * 2 ** 20 // (RECORDS_PER_BUCKET * RECORD.size)))
+    temporary_path: str = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(CACHE_MAGIC, number_of_buckets))
+        file.truncate(HEADER.size + number_of_buckets * RECORDS_PER_BUCKET * RECORD.size)
+    try:
+        os.link(temporary_path, path)
+    except FileExistsError:
+        pass  # Another process created the cache first.
+    finally:
+        os.remove(temporary_path)
+
+
+def get_distance_of_score(score: int, pieces: int) -> int:
+    """
+    Converts the score of a won or lost position into the number of moves until the game ends.
+
+    Parameters
+    ----------
+    score: int
+        Score of the position from the view of the player to move, see Solver. Must not be 0.
+    pieces: int
+        Number of pieces on the board.
+
+    Returns
+    -------
+    :int
+        Number of moves until the winning move is played, including it. Odd if the player to move wins.
+    """
+    distance: int = NUMBER_OF_POSITIONS + 2 - pieces - 2 * abs(score)
+    if distance % 2 != (score > 0):
+        distance -= 1
+    return distance
+
+
+def get_score_of_distance(distance: int, pieces: int) -> int:
+    """
+    Converts the number of moves until the game ends into the score of the position, the reverse of
+    get_distance_of_score.
+
+    Parameters
+    ----------
+    distance: int
+        Number of moves until the winning move is played, including it. Odd if the player to move wins.
+    pieces: int
+        Number of pieces on the board.
+
+    Returns
+    -------
+    :int
+        Score of the position from the view of the player to move, see Solver.
+    """
+    score: int = (NUMBER_OF_POSITIONS + 2 - pieces - distance) // 2
+    return score if distance % 2 else -score
@@ -0,0 +1,84 @@
+from typing import Optional
+import time
+
+MAX_MOVES: int = 7
+
+
+class SearchStatistics:
+    """
+    Counters of one iterative deepening search, collected by minimax_rec and NegamaxSearchWithStatistics if the saved
+    state holds a SearchStatistics object. Without it, the negamax search runs without any counting code and
+    minimax_rec checks for the object once per node.
+
+    Nodes are all positions searched, leaves the positions evaluated at the maximum depth or ending the game. A
+    transposition table hit is a probe finding an entry usable in place of searching the position. Cutoffs are counted
+    by the index of the move causing them in the order the moves were searched, with good move ordering most cutoffs
+    are caused by the first move. The root-parallel search does not collect statistics.
+    """
+
+    def __init__(self):
+        self.new_search()
+
+    def new_search(self):
+        """
+        Resets all counters at the start of the search for a move.
+        """
+        self.nodes: int = 0
+        self.leaves: int = 0
+        self.transposition_table_probes: int = 0
+        self.transposition_table_hits: int = 0
+        self.transposition_table_stores: int = 0
+        self.cutoffs: [int] = [0] * MAX_MOVES
+        self.max_ply: int = 0  # Deepest distance to the root reached.
+        self.nodes_per_depth: [int] = []  # Nodes of every depth searched completely.
+        self.seconds_per_depth: [float] = []  # Time of every depth searched completely.
+        self.depth_start_time: float = time.monotonic()
+        self.depth_start_nodes: int = 0
+
+    def finish_depth(self):
+        """
+        Records the nodes and the time of the depth which has just been searched completely.
+        """
+        now: float = time.monotonic()
+        self.nodes_per_depth.append(self.nodes - self.depth_start_nodes)
+        self.seconds_per_depth.append(now - self.depth_start_time)
+        self.depth_start_time, self.depth_start_nodes = now, self.nodes
+
+    @property
+    def depth(self) -> int:
+        """
+        The deepest depth searched completely.
+        """
+        return len(self.nodes_per_depth)
+
+    @property
+    def branching_factor(self) -> Optional[float]:
+        """
+        The effective branching factor, the nodes of the deepest depth searched completely divided by the nodes of the
+        depth before. None if less than two depths were searched.
+        """
+        if len(self.nodes_per_depth) < 2 or not self.nodes_per_depth[-2]:
+            return None
+        return self.nodes_per_depth[-1] / self.nodes_per_depth[-2]
+
+    @property
+    def transposition_table_hit_rate(self) -> float:
+        if not self.transposition_table_probes:
+            return 0.0
+        return self.transposition_table_hits / self.transposition_table_probes
+
+    def to_dict(self) -> dict:
+        """
+        Collects the statistics for logging.
+
+        Returns
+        -------
+        :dict
+            All counters and the derived values, with plain types only.
+        """
+        return dict(nodes=self.nodes, leaves=self.leaves, transposition_table_probes=self.transposition_table_probes,
+                    transposition_table_hits=self.transposition_table_hits,
+                    transposition_table_stores=self.transposition_table_stores,
+                    transposition_table_hit_rate=self.transposition_table_hit_rate, cutoffs=list(self.cutoffs),
+                    branching_factor=self.branching_factor, depth=self.depth, max_ply=self.max_ply,
+                    nodes_per_depth=list(self.nodes_per_depth), seconds_per_depth=list(self.seconds_per_depth))
@@ -0,0 +1,455 @@
+from typing import Tuple, Optional, Callable
+import contextlib
+import math
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.sharedctypes
+import threading
+import time
+import weakref
+
+from agents.game_utils import BoardPiece, PlayerAction, GameState, PLAYER1, PLAYER2, apply_player_action, \
+    check_end_state
+from agents.saved_state import SavedState
+from agents.agent_minimax.minimax import generate_move_loop_to_stop, get_single_move, get_fallback_move, \
+    receive_search_info, SECONDS_TO_PLAY, SECONDS_TO_RETURN_STATE
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.position_cache import PositionCache
+from agents.agent_minimax.search_statistics import SearchStatistics
+from agents.agent_minimax.transposition_table import TranspositionTable, TRANSPOSITION_TABLE_SIZE_MB
+from agents.agent_minimax.time_control import GameClock, PonderDeadline, get_time_budget, STABLE_ITERATIONS
+from agents.agent_minimax.threats import get_immediate_win
+from agents.agent_minimax.solver import solve_endgame, SOLVER_TRANSPOSITION_TABLE_SIZE_MB
+from agents.agent_minimax.opening_book import OpeningBook
+from agents.agent_minimax.parallel_search import create_search_pool, generate_move_loop_parallel
+
+
+class SearchWorker(SavedState):
+    """
+    State of the minimax agent when searching in a long-lived worker process. The worker is started once, receives
+    the positions to search through a pipe and keeps its transposition table in memory for the whole game. A search is
+    stopped cooperatively with a shared stop flag, the worker is only killed if it does not react to it. If the game is
+    played with a clock, it also holds the clock of the player. If statistics are collected, the worker sends the
+    statistics of every search back with its answer. With more than one process, the worker keeps a pool of processes
+    for the whole game and searches the root moves in parallel, see generate_move_minimax_parallel. The worker sends the
+    info of every iteration of its searches through a second pipe, see create_search_info. If a position cache path
+    is given, the worker and this process use the persistent position cache at that path, like MinimaxSavedState. The
+    processes searching the root moves in parallel do not use it.
+
+    While the opponent thinks, the worker can ponder: it searches the position after the expected reply, the second
+    move of the best line, without a deadline. If the opponent plays the expected reply (a ponder hit), the running
+    search gets the deadline of the move and goes on from the depth it reached, otherwise it is stopped.
+    """
+
+    def __init__(self, transposition_table_size_mb: int = TRANSPOSITION_TABLE_SIZE_MB,
+                 collect_statistics: bool = False, processes: int = 1, position_cache_path: Optional[str] = None):
+        self.transposition_table_size_mb: int = transposition_table_size_mb
+        self.collect_statistics: bool = collect_statistics
+        self.processes: int = processes
+        self.position_cache_path: Optional[str] = position_cache_path
+        self.position_cache: Optional[PositionCache] = None  # Looked up and filled before the worker searches.
+        if position_cache_path is not None:
+            self.position_cache = PositionCache(path=position_cache_path)
+        self.statistics: Optional[SearchStatistics] = None  # Statistics of the last search.
+        self.clock: Optional[GameClock] = None
+        self.line: list[PlayerAction] = []  # Best line of the last search.
+        self.ponder_position: Optional[tuple[int, int, BoardPiece]] = None  # Position searched while pondering.
+        self.ponder_hits: int = 0
+        # Table of the endgame solver, which runs in this process. Created by the first move trying to solve.
+        self.solver_transposition_table: Optional[TranspositionTable] = None
+        self.start()
+
+    def start(self):
+        """
+        Starts the worker process. The worker is shut down when this object is garbage collected or the interpreter
+        exits.
+        """
+        self.move_output: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+        self.stop_flag: multiprocessing.sharedctypes.Synchronized = multiprocessing.RawValue('b', False)
+        self.ponder_deadline: multiprocessing.sharedctypes.Synchronized = multiprocessing.RawValue('d', math.inf)
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.info_receiver, info_sender = multiprocessing.Pipe(duplex=False)
+        self.process: multiprocessing.Process = multiprocessing.Process(
+            target=run_search_worker, args=(worker_connection, self.move_output, self.stop_flag,
+                                            self.transposition_table_size_mb, self.collect_statistics,
+                                            self.ponder_deadline, self.processes, info_sender,
+                                            self.position_cache_path))
+        self.process.start()
+        worker_connection.close()
+        info_sender.close()
+        self.ponder_position = None
+        self._finalizer = weakref.finalize(self, stop_search_worker, self.connection, self.process, self.stop_flag,
+                                           self.info_receiver)
+
+    def search(self, board_player_one: int, board_player_two: int, player: BoardPiece,
+               seconds: float = SECONDS_TO_PLAY,
+               evaluate_board: Optional[Callable[[int, int], int]] = None,
+               search_function: Optional[Callable[..., list]] = None,
+               on_info: Optional[Callable[[dict], Optional[bool]]] = None,
+               stable_iterations: Optional[int] = STABLE_ITERATIONS) -> PlayerAction:
+        """
+        Lets the worker search the given position until the time is over, the search is finished or the info callback
+        stops it. The worker stops itself at the deadline, the stop flag is set afterwards in case it did not. If the
+        worker is pondering the position, the running search is continued until the deadline, any other search on the
+        opponent's time is stopped first.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        player: BoardPiece
+            The next player to make a move.
+        seconds: float
+            Time given for the search.
+        evaluate_board: Optional[Callable[[int, int], int]]
+            Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+        search_function: Optional[Callable[..., list]]
+            Search of a single depth, generate_move_minimax_id if it is None.
+        on_info: Optional[Callable[[dict], Optional[bool]]]
+            Called with the info of every iteration of the search, see create_search_info. The search is stopped if it
+            returns True.
+        stable_iterations: Optional[int]
+            Number of iterations in a row with the same best move after which the search may stop early, see
+            StableBestMove. The search uses the whole time if it is None. Not used on a ponder hit, the running search
+            keeps the value it was started with.
+
+        Returns
+        -------
+        :PlayerAction
+            The best move found, see get_fallback_move if no search depth was finished.
+        """
+        deadline: float = time.monotonic() + seconds
+        if self.ponder_position == (board_player_one, board_player_two, player) and self.process.is_alive():
+            self.ponder_position = None
+            self.ponder_hits += 1
+            self.ponder_deadline.value = deadline
+        else:
+            self.stop_pondering()
+            if not self.process.is_alive():
+                self.start()
+            self.move_output.value = get_fallback_move(board_player_one=board_player_one,
+                                                       board_player_two=board_player_two, player=player)
+            self.stop_flag.value = False
+            self.connection.send((board_player_one, board_player_two, player, evaluate_board, deadline,
+                                  search_function, stable_iterations))
+        if on_info is None:
+            self.connection.poll(max(deadline - time.monotonic(), 0))  # Returns early if the worker finished.
+        else:
+            receive_search_info(info_receiver=self.info_receiver, deadline=deadline, on_info=on_info)
+        return self.receive_answer()
+
+    def receive_answer(self) -> PlayerAction:
+        """
+        Stops the current search of the worker and receives its answer. The info of the search not received yet is
+        dropped, the worker sends all of it before the answer.
+
+        Returns
+        -------
+        :PlayerAction
+            The best move found, see get_fallback_move if no search depth was finished.
+        """
+        self.stop_flag.value = True  # The search stops at the next node.
+        if self.connection.poll(SECONDS_TO_RETURN_STATE):
+            self.statistics, self.line = self.connection.recv()
+            while self.info_receiver.poll():
+                self.info_receiver.recv()
+        else:  # The worker does not react, it is replaced by a new one.
+            move: PlayerAction = self.move_output.value
+            self.line = []
+            self.close()
+            self.start()
+            return move
+        return self.move_output.value
+
+    def ponder(self, board_player_one: int, board_player_two: int, player: BoardPiece, move: PlayerAction,
+               evaluate_board: Optional[Callable[[int, int], int]] = None,
+               search_function: Optional[Callable[..., list]] = None,
+               stable_iterations: Optional[int] = STABLE_ITERATIONS) -> bool:
+        """
+        Lets the worker search the position after the move and the expected reply, the second move of the best line of
+        the last search, until the opponent moved. Nothing is pondered if the move was not the first move of that line
+        or the game ends before.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one before the move.
+        board_player_two: int
+            Board player two before the move.
+        player: BoardPiece
+            The player making the move.
+        move: PlayerAction
+            The move played.
+        evaluate_board: Optional[Callable[[int, int], int]]
+            Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+        search_function: Optional[Callable[..., list]]
+            Search of a single depth, generate_move_minimax_id if it is None.
+        stable_iterations: Optional[int]
+            Number of iterations in a row with the same best move after which the search may stop early after a ponder
+            hit, see StableBestMove.
+
+        Returns
+        -------
+        :bool
+            Whether the worker is pondering.
+        """
+        self.stop_pondering()
+        if len(self.line) < 2 or self.line[0] != move or not self.process.is_alive():
+            return False
+        opponent: BoardPiece = PLAYER2 if player == PLAYER1 else PLAYER1
+        for action, action_player in ((move, player), (self.line[1], opponent)):
+            board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                     board_player_two=board_player_two,
+                                                                     player=action_player, action=int(action))
+            if check_end_state(board_player_one=board_player_one, board_player_two=board_player_two,
+                               player=action_player) != GameState.STILL_PLAYING:
+                return False
+        self.move_output.value = get_fallback_move(board_player_one=board_player_one,
+                                                   board_player_two=board_player_two, player=player)
+        self.stop_flag.value = False
+        self.ponder_deadline.value = math.inf
+        self.connection.send((board_player_one, board_player_two, player, evaluate_board, None, search_function,
+                              stable_iterations))
+        self.ponder_position = (board_player_one, board_player_two, player)
+        return True
+
+    def stop_pondering(self):
+        """
+        Stops the search on the opponent's time, if there is one.
+        """
+        if self.ponder_position is not None:
+            self.ponder_position = None
+            self.receive_answer()
+
+    def close(self):
+        """
+        Shuts down the worker process.
+        """
+        self._finalizer()
+
+    def __getstate__(self):
+        raise TypeError("The search worker is bound to the process which started it and cannot be pickled.")
+
+
+def stop_search_worker(connection: multiprocessing.connection.Connection, process: multiprocessing.Process,
+                       stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                       info_receiver: Optional[multiprocessing.connection.Connection] = None):
+    """
+    Asks the worker process to exit and terminates it if it does not.
+
+    Parameters
+    ----------
+    connection: multiprocessing.connection.Connection
+        Connection to the worker.
+    process: multiprocessing.Process
+        The worker process.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Stop flag of the worker, set to stop a search which is still running, e.g. while pondering.
+    info_receiver: Optional[multiprocessing.connection.Connection]
+        Connection the worker sends the info of its searches through.
+    """
+    if stop_flag is not None:
+        stop_flag.value = True
+    try:
+        connection.send(None)
+    except (BrokenPipeError, OSError):
+        pass
+    process.join(SECONDS_TO_RETURN_STATE)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+    connection.close()
+    if info_receiver is not None:
+        info_receiver.close()
+
+
+def run_search_worker(connection: multiprocessing.connection.Connection,
+                      move_output: multiprocessing.sharedctypes.Synchronized,
+                      stop_flag: multiprocessing.sharedctypes.Synchronized, transposition_table_size_mb: int,
+                      collect_statistics: bool = False,
+                      ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                      processes: int = 1,
+                      info_sender: Optional[multiprocessing.connection.Connection] = None,
+                      position_cache_path: Optional[str] = None):
+    """
+    Target of the worker process. Searches every position received through the connection with iterative deepening,
+    reusing the same transposition table, and answers with the statistics of the search (None if they are not
+    collected) and the best line when the search is finished or was stopped. A position received without a deadline
+    is pondered, until the stop flag is set or the deadline written into the ponder deadline passes. With more than
+    one process, the pool searching the root moves is started once and used for every search, the search function is
+    not used then. If there is an info connection, the info of every iteration is sent through it, followed by None
+    before the answer. Exits when None is received.
+
+    Parameters
+    ----------
+    connection: multiprocessing.connection.Connection
+        Connection to receive the positions and to answer on.
+    move_output: multiprocessing.sharedctypes.Synchronized
+        Variable to return the best move of the current search in.
+    stop_flag: multiprocessing.sharedctypes.Synchronized
+        Flag set by the parent process to stop the current search.
+    transposition_table_size_mb: int
+        Size of the transposition table.
+    collect_statistics: bool
+        Whether to collect statistics of the searches.
+    ponder_deadline: Optional[multiprocessing.sharedctypes.Synchronized]
+        Deadline of the search while pondering, set by the parent process on a ponder hit.
+    processes: int
+        Number of processes searching the root moves in parallel, the search is not parallel if it is 1.
+    info_sender: Optional[multiprocessing.connection.Connection]
+        Connection to send the info of every iteration through, None to not send any.
+    position_cache_path: Optional[str]
+        Path of the persistent position cache the searches use, None to not use one.
+    """
+    saved_state = MinimaxSavedState(transposition_table_size_mb=transposition_table_size_mb,
+                                    collect_statistics=collect_statistics, position_cache_path=position_cache_path)
+    with contextlib.ExitStack() as stack:
+        executor = None
+        if processes > 1:
+            executor = stack.enter_context(create_search_pool(
+                processes=processes, stop_flag=stop_flag, transposition_table_size_mb=transposition_table_size_mb,
+                ponder_deadline=ponder_deadline))
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:  # The parent process is gone.
+                return
+            if request is None:
+                return
+            board_player_one, board_player_two, player, evaluate_board, deadline, search_function, stable_iterations = \
+                request
+            search_stop_flag = stop_flag
+            if deadline is None and ponder_deadline is not None:
+                search_stop_flag = PonderDeadline(shared_deadline=ponder_deadline, stop_flag=stop_flag)
+            arguments: dict = dict(move_output=move_output, board_player_one=board_player_one,
+                                   board_player_two=board_player_two, player=player, depth=1,
+                                   loop_over_flag=threading.Event(), saved_state=saved_state,
+                                   stop_flag=search_stop_flag, evaluate_board=evaluate_board, deadline=deadline,
+                                   on_iteration=None if info_sender is None else info_sender.send,
+                                   stable_iterations=stable_iterations)
+            if executor is None:
+                generate_move_loop_to_stop(search_function=search_function, **arguments)
+            else:
+                generate_move_loop_parallel(executor=executor, **arguments)
+            if info_sender is not None:
+                info_sender.send(None)
+            connection.send((saved_state.statistics, saved_state.line))
+
+
+def generate_move_minimax_worker(board_player_one: int, board_player_two: int, player: BoardPiece,
+                                 saved_state: Optional[SavedState], seconds: float = SECONDS_TO_PLAY,
+                                 evaluate_board: Optional[Callable[[int, int], int]] = None,
+                                 milliseconds: Optional[int] = None, game_milliseconds: Optional[int] = None,
+                                 increment_milliseconds: int = 0,
+                                 search_function: Optional[Callable[..., list]] = None,
+                                 opening_book: Optional[OpeningBook] = None, ponder: bool = False,
+                                 processes: int = 1, on_info: Optional[Callable[[dict], Optional[bool]]] = None,
+                                 stable_iterations: Optional[int] = STABLE_ITERATIONS,
+                                 position_cache_path: Optional[str] = None) -> \
+        Tuple[PlayerAction, Optional[SavedState]]:
+    """
+    Starting point to use the minimax algorithm in a long-lived worker process. Other than generate_move_minimax, no
+    process is started per move and the transposition table never has to be sent between the processes. Moves of the
+    opening book, moves winning right away, the only move not losing right away and moves of the position cache are
+    returned without searching, and positions with few enough empty cells for the remaining time are solved exactly
+    instead, see solve_endgame. Solved positions are saved in the position cache.
+    With pondering, the worker goes on searching on the opponent's time, see SearchWorker.ponder.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The next player to make a move.
+    saved_state: Optional[SavedState]
+        The search worker used for the previous move. A new worker is started if it is not a SearchWorker.
+    seconds: float
+        Time given for minimax-calculation.
+    evaluate_board: Optional[Callable[[int, int], int]]
+        Function evaluating the boards at the maximum depth, None to evaluate incrementally.
+    milliseconds: Optional[int]
+        Time given for minimax-calculation in milliseconds, replaces the seconds if it is not None.
+    game_milliseconds: Optional[int]
+        Time for the whole game. If it is given, a game clock is kept in the search worker and the time of every move
+        is taken from it.
+    increment_milliseconds: int
+        Time added to the game clock after every move.
+    search_function: Optional[Callable[..., list]]
+        Search of a single depth, e.g. generate_move_negamax_id. generate_move_minimax_id is used if it is None.
+    opening_book: Optional[OpeningBook]
+        Book to look up the move in before searching, the book is not used if it is None.
+    ponder: bool
+        Whether to search the position after the expected reply while the opponent thinks. Only useful if a core is
+        free while the opponent thinks, e.g. when playing against a human.
+    processes: int
+        Number of processes searching the root moves in parallel, used when the worker is started. The search is not
+        parallel if it is 1.
+    on_info: Optional[Callable[[dict], Optional[bool]]]
+        Called with the info of every iteration of the search, see create_search_info. The search is stopped if it
+        returns True.
+    stable_iterations: Optional[int]
+        Number of iterations in a row with the same best move after which the search may stop early, see
+        StableBestMove. The search uses the whole time if it is None.
+    position_cache_path: Optional[str]
+        Path of the persistent position cache, used when the worker is started. No cache is used if it is None.
+
+    Returns
+    -------
+    :Tuple[PlayerAction, Optional[SavedState]]
+        Tuple containing the move to play and the search worker to use for the next move.
+    """
+    start_time: float = time.monotonic()
+    if not isinstance(saved_state, SearchWorker):
+        saved_state = SearchWorker(processes=processes, position_cache_path=position_cache_path)
+    if game_milliseconds is not None and saved_state.clock is None:
+        saved_state.clock = GameClock(milliseconds=game_milliseconds, increment_milliseconds=increment_milliseconds)
+    seconds = get_time_budget(seconds=seconds, milliseconds=milliseconds, clock=saved_state.clock,
+                              board_player_one=board_player_one, board_player_two=board_player_two)
+    if saved_state.ponder_position != (board_player_one, board_player_two, player):  # Not a ponder hit.
+        saved_state.stop_pondering()
+    move: Optional[PlayerAction] = None
+    if opening_book is not None:
+        move = opening_book.get_move(board_player_one=board_player_one, board_player_two=board_player_two)
+    if move is None:
+        move = get_immediate_win(board_player_one=board_player_one, board_player_two=board_player_two, player=player)
+    if move is None:
+        move = get_single_move(board_player_one=board_player_one, board_player_two=board_player_two, player=player)
+    position_cache: Optional[PositionCache] = saved_state.position_cache
+    if move is None and position_cache is not None:
+        proven_result: Optional[tuple[int, PlayerAction]] = position_cache.get_entry(
+            board_player_one=board_player_one, board_player_two=board_player_two)
+        if proven_result is not None:
+            move = proven_result[1]
+    if move is None:
+        if saved_state.solver_transposition_table is None:
+            saved_state.solver_transposition_table = TranspositionTable(size_mb=SOLVER_TRANSPOSITION_TABLE_SIZE_MB)
+        solved: Optional[tuple[int, PlayerAction]] = solve_endgame(
+            board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+            seconds=start_time + seconds - time.monotonic(),
+            transposition_table=saved_state.solver_transposition_table)
+        if solved is not None:
+            move = solved[1]
+            if position_cache is not None:
+                position_cache.store_entry(board_player_one=board_player_one, board_player_two=board_player_two,
+                                           score=solved[0], move=solved[1])
+    if move is None:
+        move = saved_state.search(board_player_one=board_player_one, board_player_two=board_player_two,
+                                  player=player, seconds=start_time + seconds - time.monotonic(),
+                                  evaluate_board=evaluate_board, search_function=search_function, on_info=on_info,
+                                  stable_iterations=stable_iterations)
+    else:  # The move was not searched.
+        saved_state.stop_pondering()
+        saved_state.line = []
+        if saved_state.statistics is not None:
+            saved_state.statistics.new_search()
+    if saved_state.clock is not None:
+        saved_state.clock.update(used_milliseconds=round((time.monotonic() - start_time) * 1000))
+    if ponder:
+        saved_state.ponder(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                           move=move, evaluate_board=evaluate_board, search_function=search_function,
+                           stable_iterations=stable_iterations)
+    return move, saved_state
@@ -0,0 +1,397 @@
+from typing import Optional
+import logging
+import multiprocessing.sharedctypes
+import time
+
+from agents.game_utils import BoardPiece, PlayerAction, PLAYER1, FULL_BOARD, MOVE_ORDER, connected_four
+from agents.agent_minimax.minimax import SearchInterrupted
+from agents.agent_minimax.position_cache import NUMBER_OF_POSITIONS
+from agents.agent_minimax.time_control import SearchDeadline
+from agents.agent_minimax.threats import COLUMN_HEIGHT, BOTTOM_ROW, COLUMNS_FILLED, get_winning_positions
+from agents.agent_minimax.transposition_table import TranspositionTable, BOUND_LOWER, BOUND_UPPER, NO_MOVE, \
+    EMPTY_MOVE, EVALUATION_OFFSET, SHIFT_EVALUATION, SHIFT_DEPTH, SHIFT_BOUND, SHIFT_MOVE, MASK_DEPTH, MASK_BOUND, \
+    MASK_GENERATION, ENTRIES_PER_BUCKET
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SOLVER_TRANSPOSITION_TABLE_SIZE_MB: int = 16
+# Time 90 % of random positions with 20 pieces are solved in, every piece less about triples it. Measured on random
+# positions: 0.96 s with 20 pieces, 1.7 s with 18 pieces and up to 71 s with 16 pieces.
+SOLVER_SECONDS_AT_20_PIECES: float = 1.0
+SOLVER_GROWTH_PER_PIECE: float = 3.0
+# Positions with many pieces still take some time, mostly for setting up the search.
+SOLVER_MINIMUM_SECONDS: float = 0.1
+# Share of the time of a move the solver may use before the heuristic search starts. Small, as the time of a failed
+# attempt is lost for the search.
+SOLVER_TIME_SHARE: float = 0.25
+# Columns in reverse MOVE_ORDER: sorting the moves by their score is stable, so central moves come first on ties.
+SORTING_ORDER: [PlayerAction] = MOVE_ORDER[::-1]
+
+
+class Solver:
+    """
+    Exact solver in the style of Pascal Pons' solver. Every position is scored from the view of the player to move:
+    a win with the n-th own piece of the player scores NUMBER_OF_POSITIONS // 2 + 1 - n, so faster wins score higher,
+    a loss is scored as the negated win of the opponent and a draw scores 0.
+
+    The score is found with a series of null window searches narrowing the range of possible scores. Only moves not
+    losing right away are searched, ordered by the number of winning cells they create, and the bounds found are kept
+    in a transposition table. Other than in the heuristic search, the boards are the pieces of the player to move and
+    the pieces of both players, with the player to move swapped at every move.
+    """
+
+    def __init__(self, transposition_table: Optional[TranspositionTable] = None,
+                 stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None):
+        if transposition_table is None:
+            transposition_table = TranspositionTable(size_mb=SOLVER_TRANSPOSITION_TABLE_SIZE_MB)
+        # Holds the bounds of the solver only, the keys are not the ones of position_key.
+        self.transposition_table: TranspositionTable = transposition_table
+        self.stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = stop_flag
+        self.nodes: int = 0
+
+    def solve(self, board_player_one: int, board_player_two: int, player: BoardPiece) -> tuple[int, PlayerAction]:
+        """
+        Solves the position exactly.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+        player: BoardPiece
+            The player to make a move.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set.
+
+        Returns
+        -------
+        :tuple[int, PlayerAction]
+            Tuple containing the score of the position from the view of the player to move and a best move, NO_MOVE
+            if the game is already over.
+        """
+        current: int = int(board_player_one if player == PLAYER1 else board_player_two)
+        mask: int = int(board_player_one | board_player_two)
+        moves_played: int = mask.bit_count()
+        if connected_four(current ^ mask):  # The opponent won with the last piece.
+            return -((NUMBER_OF_POSITIONS + 2 - moves_played) // 2), NO_MOVE
+        if connected_four(current) or mask == FULL_BOARD:
+            return 0, NO_MOVE
+        possible: int = (mask + BOTTOM_ROW) & FULL_BOARD
+        winning: int = possible & get_winning_positions(board_player=current, both_boards=mask)
+        if winning:
+            return (NUMBER_OF_POSITIONS + 1 - moves_played) // 2, \
+                PlayerAction((winning & -winning).bit_length() // COLUMN_HEIGHT)
+        score: int = self.solve_score(current=current, mask=mask, moves_played=moves_played)
+        return score, self.get_best_move(current=current, mask=mask, moves_played=moves_played, score=score)
+
+    def solve_score(self, current: int, mask: int, moves_played: int) -> int:
+        """
+        Finds the score of a position without an immediate win with null window searches. The middle of the range of
+        possible scores is tested, moved towards 0 to first find out whether the position is won, drawn or lost.
+
+        Parameters
+        ----------
+        current: int
+            Board of the player to move.
+        mask: int
+            Board of both players.
+        moves_played: int
+            Number of pieces on the board.
+
+        Returns
+        -------
+        :int
+            The exact score of the position.
+        """
+        minimum: int = -((NUMBER_OF_POSITIONS - moves_played) // 2)
+        maximum: int = (NUMBER_OF_POSITIONS + 1 - moves_played) // 2
+        while minimum < maximum:
+            middle: int = minimum + (maximum - minimum) // 2
+            if middle <= 0 and -(-minimum // 2) < middle:
+                middle = -(-minimum // 2)
+            elif middle >= 0 and maximum // 2 > middle:
+                middle = maximum // 2
+            result: int = self.negamax(current=current, mask=mask, moves_played=moves_played, alpha=middle,
+                                       beta=middle + 1)
+            if result <= middle:
+                maximum = result
+            else:
+                minimum = result
+        return minimum
+
+    def get_best_move(self, current: int, mask: int, moves_played: int, score: int) -> PlayerAction:
+        """
+        Finds a move reaching the score of the position. The moves are tested with null window searches, which are
+        cheap as the transposition table is filled by solving the position.
+
+        Parameters
+        ----------
+        current: int
+            Board of the player to move.
+        mask: int
+            Board of both players.
+        moves_played: int
+            Number of pieces on the board.
+        score: int
+            The exact score of the position.
+
+        Returns
+        -------
+        :PlayerAction
+            A move reaching the score.
+        """
+        moves: [int] = self.get_sorted_moves(current=current, mask=mask,
+                                             positions=self.get_non_losing_positions(current=current, mask=mask))
+        if not moves:  # Every move loses, but at least block one of the immediate wins of the opponent.
+            possible: int = (mask + BOTTOM_ROW) & FULL_BOARD
+            forced: int = possible & get_winning_positions(board_player=current ^ mask, both_boards=mask)
+            move: int = forced & -forced if forced else possible & -possible
+            return PlayerAction(move.bit_length() // COLUMN_HEIGHT)
+        for move in moves:
+            if -self.negamax(current=current ^ mask, mask=mask | move, moves_played=moves_played + 1, alpha=-score,
+                             beta=1 - score) >= score:
+                return PlayerAction(move.bit_length() // COLUMN_HEIGHT)
+        return PlayerAction(moves[0].bit_length() // COLUMN_HEIGHT)  # Not reached if the score is exact.
+
+    def get_non_losing_positions(self, current: int, mask: int) -> int:
+        """
+        Calculates the cells the player to move can play into without losing right away. The player to move must not
+        be able to win right away.
+
+        Parameters
+        ----------
+        current: int
+            Board of the player to move.
+        mask: int
+            Board of both players.
+
+        Returns
+        -------
+        :int
+            Board with a bit set for every cell not losing right away.
+        """
+        possible: int = (mask + BOTTOM_ROW) & FULL_BOARD
+        opponent_winning: int = get_winning_positions(board_player=current ^ mask, both_boards=mask)
+        forced: int = possible & opponent_winning
+        if forced:
+            if forced & (forced - 1):  # The opponent has two immediate wins.
+                return 0
+            possible = forced
+        return possible & ~(opponent_winning >> 1)
+
+    def get_sorted_moves(self, current: int, mask: int, positions: int) -> [int]:
+        """
+        Orders the moves into the given cells by the number of winning cells they create.
+
+        Parameters
+        ----------
+        current: int
+            Board of the player to move.
+        mask: int
+            Board of both players.
+        positions: int
+            Board with a bit set for every playable cell to move into.
+
+        Returns
+        -------
+        :[int]
+            The moves as the board of the played piece, best moves first.
+        """
+        if not positions & (positions - 1):
+            return [positions] if positions else []
+        scored_moves: [(int, int)] = []
+        for column in SORTING_ORDER:
+            move: int = positions & COLUMNS_FILLED[column]
+            if move:
+                scored_moves.append((get_winning_positions(board_player=current | move, both_boards=mask).bit_count(),
+                                     move))
+        scored_moves.sort(key=lambda scored_move: -scored_move[0])
+        return [move for _, move in scored_moves]
+
+    def negamax(self, current: int, mask: int, moves_played: int, alpha: int, beta: int) -> int:
+        """
+        Searches a position without an immediate win of the player to move, fail-soft within the window.
+
+        Parameters
+        ----------
+        current: int
+            Board of the player to move.
+        mask: int
+            Board of both players.
+        moves_played: int
+            Number of pieces on the board.
+        alpha: int
+            Lower bound of the window.
+        beta: int
+            Upper bound of the window.
+
+        Raises
+        ----------
+        SearchInterrupted
+            If the stop flag is set.
+
+        Returns
+        -------
+        :int
+            The score if it is inside the window, otherwise a bound of the score on the side the window failed on.
+        """
+        if self.stop_flag is not None and self.stop_flag.value:
+            raise SearchInterrupted
+        self.nodes += 1
+        positions: int = self.get_non_losing_positions(current=current, mask=mask)
+        if not positions:
+            return -((NUMBER_OF_POSITIONS - moves_played) // 2)
+        if moves_played >= NUMBER_OF_POSITIONS - 2:  # Neither player can win with the last two pieces.
+            return 0
+        minimum: int = -((NUMBER_OF_POSITIONS - 2 - moves_played) // 2)  # The opponent cannot win with the next move.
+        if alpha < minimum:
+            alpha = minimum
+            if alpha >= beta:
+                return alpha
+        maximum: int = (NUMBER_OF_POSITIONS - 1 - moves_played) // 2  # The player cannot win with the next move.
+        key: int = current + mask
+        transposition_table: TranspositionTable = self.transposition_table
+        keys = transposition_table.keys
+        data = transposition_table.data
+        index: int = key % transposition_table.number_of_buckets * ENTRIES_PER_BUCKET
+        for entry_index in (index, index + 1):
+            entry: int = data[entry_index]
+            if entry and keys[entry_index] ^ entry == key:
+                saved_score: int = (entry >> SHIFT_EVALUATION) - EVALUATION_OFFSET
+                if (entry >> SHIFT_BOUND) & MASK_BOUND == BOUND_UPPER:
+                    if saved_score < maximum:
+                        maximum = saved_score
+                elif saved_score > alpha:
+                    alpha = saved_score
+                    if alpha >= beta:
+                        return alpha
+                break
+        if beta > maximum:
+            beta = maximum
+            if alpha >= beta:
+                return beta
+        opponent: int = current ^ mask
+        bound: int = BOUND_UPPER
+        for move in self.get_sorted_moves(current=current, mask=mask, positions=positions):
+            score: int = -self.negamax(current=opponent, mask=mask | move, moves_played=moves_played + 1,
+                                       alpha=-beta, beta=-alpha)
+            if score >= beta:
+                alpha = score
+                bound = BOUND_LOWER
+                break
+            if score > alpha:
+                alpha = score
+        # Inline version of TranspositionTable.store_entry, with the number of empty cells as the depth.
+        depth: int = NUMBER_OF_POSITIONS - moves_played
+        generation: int = transposition_table.generation
+        entry: int = data[index]
+        if entry and (entry & MASK_GENERATION) == generation and depth < (entry >> SHIFT_DEPTH) & MASK_DEPTH:
+            index += 1
+        entry = (alpha + EVALUATION_OFFSET) << SHIFT_EVALUATION | depth << SHIFT_DEPTH | bound << SHIFT_BOUND | \
+            EMPTY_MOVE << SHIFT_MOVE | generation
+        keys[index] = key ^ entry
+        data[index] = entry
+        return alpha
+
+
+def solve(board_player_one: int, board_player_two: int, player: BoardPiece,
+          transposition_table: Optional[TranspositionTable] = None,
+          stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None) -> tuple[int, PlayerAction]:
+    """
+    Solves the position exactly, see Solver for the scores.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    transposition_table: Optional[TranspositionTable]
+        Table to keep the bounds in, it can be reused for later positions of the same game. A new table is created if
+        it is None. It must not be used by the heuristic search as well.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the solver with, e.g. a SearchDeadline.
+
+    Raises
+    ----------
+    SearchInterrupted
+        If the stop flag is set.
+
+    Returns
+    -------
+    :tuple[int, PlayerAction]
+        Tuple containing the score of the position from the view of the player to move and a best move, NO_MOVE if
+        the game is already over.
+    """
+    return Solver(transposition_table=transposition_table, stop_flag=stop_flag).solve(
+        board_player_one=board_player_one, board_player_two=board_player_two, player=player)
+
+
+def estimate_solving_seconds(board_player_one: int, board_player_two: int) -> float:
+    """
+    Estimates the time needed to solve the position from the number of pieces on the board.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+
+    Returns
+    -------
+    :float
+        Time most positions with as many pieces are solved in, in seconds.
+    """
+    pieces: int = int(board_player_one | board_player_two).bit_count()
+    return max(SOLVER_MINIMUM_SECONDS, SOLVER_SECONDS_AT_20_PIECES * SOLVER_GROWTH_PER_PIECE ** (20 - pieces))
+
+
+def solve_endgame(board_player_one: int, board_player_two: int, player: BoardPiece, seconds: float,
+                  stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None,
+                  transposition_table: Optional[TranspositionTable] = None) -> Optional[tuple[int, PlayerAction]]:
+    """
+    Solves the position if it is expected to be solved within SOLVER_TIME_SHARE of the given time, and gives up if
+    that time is over.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    seconds: float
+        Time left for the move.
+    stop_flag: Optional[multiprocessing.sharedctypes.Synchronized]
+        Flag to interrupt the solver from the outside.
+    transposition_table: Optional[TranspositionTable]
+        Table of the solver kept for the whole game, see solve. A new table is created if it is None.
+
+    Returns
+    -------
+    :Optional[tuple[int, PlayerAction]]
+        Tuple containing the score and a best move like solve, None if the position was not solved or the game is
+        already over.
+    """
+    if estimate_solving_seconds(board_player_one=board_player_one,
+                                board_player_two=board_player_two) > seconds * SOLVER_TIME_SHARE:
+        return None
+    deadline: SearchDeadline = SearchDeadline(deadline=time.monotonic() + seconds * SOLVER_TIME_SHARE,
+                                              stop_flag=stop_flag)
+    try:
+        score, move = solve(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                            transposition_table=transposition_table, stop_flag=deadline)
+    except SearchInterrupted:
+        return None
+    if move == NO_MOVE:
+        return None
+    logger.info("Solved with score %3d : %s", score, move)
+    return score, move
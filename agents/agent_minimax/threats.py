@@ -0,0 +1,161 @@
+from typing import Optional
+
+from agents.game_utils import BoardPiece, PlayerAction, GameState, PLAYER1, HEIGHT_BOARD, FULL_BOARD, \
+    get_possible_moves
+
+COLUMN_HEIGHT: int = HEIGHT_BOARD + 1
+BOTTOM_ROW: int = sum(1 << (column * COLUMN_HEIGHT) for column in range(7))
+COLUMNS_FILLED: [int] = [((1 << COLUMN_HEIGHT) - 1) << (column * COLUMN_HEIGHT) for column in range(7)]
+# Shifts to the neighbouring cell in horizontal and both diagonal directions.
+LINE_SHIFTS: [int] = [HEIGHT_BOARD + 1, HEIGHT_BOARD, HEIGHT_BOARD + 2]
+
+
+def get_playable_positions(both_boards: int) -> int:
+    """
+    Calculates the cells the next piece can be played into: the lowest empty cell of every column which is not full.
+
+    Parameters
+    ----------
+    both_boards: int
+        Board of both players.
+
+    Returns
+    -------
+    :int
+        Board with a bit set for every playable cell.
+    """
+    return (both_boards + BOTTOM_ROW) & FULL_BOARD
+
+
+def get_winning_positions(board_player: int, both_boards: int) -> int:
+    """
+    Calculates the empty cells which would complete four in a row for the player, whether they are playable right now
+    or not.
+
+    Parameters
+    ----------
+    board_player: int
+        Board of the player.
+    both_boards: int
+        Board of both players.
+
+    Returns
+    -------
+    :int
+        Board with a bit set for every winning cell of the player.
+    """
+    # The directions of LINE_SHIFTS are written out, as this is called at every node of the solver.
+    positions: int = (board_player << 1) & (board_player << 2) & (board_player << 3)  # Vertical, only from below.
+    left: int = board_player << 7  # Horizontal.
+    right: int = board_player >> 7
+    pair: int = left & (board_player << 14)
+    positions |= pair & ((board_player << 21) | right)  # Three pieces on one side, or two and one.
+    pair = right & (board_player >> 14)
+    positions |= pair & (left | (board_player >> 21))
+    left = board_player << 6  # Diagonal down to the right.
+    right = board_player >> 6
+    pair = left & (board_player << 12)
+    positions |= pair & ((board_player << 18) | right)
+    pair = right & (board_player >> 12)
+    positions |= pair & (left | (board_player >> 18))
+    left = board_player << 8  # Diagonal up to the right.
+    right = board_player >> 8
+    pair = left & (board_player << 16)
+    positions |= pair & ((board_player << 24) | right)
+    pair = right & (board_player >> 16)
+    positions |= pair & (left | (board_player >> 24))
+    return positions & (FULL_BOARD ^ both_boards)
+
+
+def get_threat_aware_positions(board_player: int, board_opponent: int) -> int:
+    """
+    Calculates the cells worth playing into, using the winning cells of both players. If the player can win
+    immediately, only a winning cell is returned. Otherwise, a winning cell of the opponent has to be blocked, and
+    cells directly below a winning cell of the opponent are left out, because the opponent would win on top of them.
+    If every move loses, all playable cells are returned.
+
+    Parameters
+    ----------
+    board_player: int
+        Board of the player to make a move.
+    board_opponent: int
+        Board of the opponent.
+
+    Returns
+    -------
+    :int
+        Board with a bit set for every cell worth playing into.
+    """
+    both_boards: int = board_player | board_opponent
+    playable: int = get_playable_positions(both_boards=both_boards)
+    winning: int = playable & get_winning_positions(board_player=board_player, both_boards=both_boards)
+    if winning:
+        return winning & -winning  # A single winning move is enough.
+    opponent_winning: int = get_winning_positions(board_player=board_opponent, both_boards=both_boards)
+    forced: int = playable & opponent_winning
+    if forced:
+        if forced & (forced - 1):  # The opponent has two immediate wins, the game is lost.
+            return playable
+        playable = forced
+    return playable & ~(opponent_winning >> 1) or playable
+
+
+def get_immediate_win(board_player_one: int, board_player_two: int, player: BoardPiece) -> Optional[PlayerAction]:
+    """
+    Finds a move winning the game right away.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+
+    Returns
+    -------
+    :Optional[PlayerAction]
+        A winning move, None if there is none.
+    """
+    board_player: int = board_player_one if player == PLAYER1 else board_player_two
+    both_boards: int = board_player_one | board_player_two
+    winning: int = get_playable_positions(both_boards=both_boards) & \
+        get_winning_positions(board_player=board_player, both_boards=both_boards)
+    if not winning:
+        return None
+    return PlayerAction((winning & -winning).bit_length() // COLUMN_HEIGHT)
+
+
+def get_threat_aware_moves(board_player_one: int, board_player_two: int, player: BoardPiece, next_move: int = 3,
+                           move_order: Optional[list[PlayerAction]] = None) -> ([PlayerAction], GameState):
+    """
+    Like get_possible_moves, but only returns the moves worth playing according to get_threat_aware_positions.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    next_move: int
+        The move which should be first in the returned list if it is returned.
+    move_order: Optional[list[PlayerAction]]
+        Order of all columns to return the moves in, MOVE_ORDER is used if it is None.
+
+    Returns
+    -------
+    :([PlayerAction], GameState)
+        A list containing the moves worth playing and the current GameState.
+    """
+    moves, game_state = get_possible_moves(board_player_one=board_player_one, board_player_two=board_player_two,
+                                           player=player, next_move=next_move, move_order=move_order)
+    if not moves:
+        return moves, game_state
+    if player == PLAYER1:
+        positions: int = get_threat_aware_positions(board_player=board_player_one, board_opponent=board_player_two)
+    else:
+        positions: int = get_threat_aware_positions(board_player=board_player_two, board_opponent=board_player_one)
+    return [move for move in moves if positions & COLUMNS_FILLED[move]], game_state
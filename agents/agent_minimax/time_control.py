@@ -0,0 +1,200 @@
+from typing import Optional
+import math
+import multiprocessing.sharedctypes
+import time
+
+NODES_BETWEEN_TIME_CHECKS: int = 1024
+MOVES_TO_GO: int = 12  # Amount of moves the remaining time of the game clock is at most divided by.
+SAFETY_MARGIN_MILLISECONDS: int = 50  # Time of the game clock kept back for the overhead around the search.
+MIN_BUDGET_MILLISECONDS: int = 10
+NUMBER_OF_POSITIONS: int = 42
+STABLE_ITERATIONS: int = 4  # Iterations with the same best move after which the search may be stopped early.
+# The search stops early at a stable best move if the next iteration is predicted to need more than this share of the
+# remaining time.
+STABLE_ITERATION_TIME_SHARE: float = 1.0
+
+
+class SearchDeadline:
+    """
+    Flag to interrupt the search, used in place of the shared stop flag. It is set if the shared stop flag is set or,
+    checked every NODES_BETWEEN_TIME_CHECKS reads, if the deadline has passed.
+    """
+
+    def __init__(self, deadline: float, stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None):
+        self.deadline: float = deadline  # Point in time of time.monotonic() to stop at.
+        self.stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = stop_flag
+        self.nodes_until_check: int = NODES_BETWEEN_TIME_CHECKS
+        self.passed: bool = False
+
+    @property
+    def value(self) -> bool:
+        if self.stop_flag is not None and self.stop_flag.value:
+            return True
+        self.nodes_until_check -= 1
+        if self.nodes_until_check <= 0:
+            self.nodes_until_check = NODES_BETWEEN_TIME_CHECKS
+            self.passed = self.passed or time.monotonic() >= self.deadline
+        return self.passed
+
+
+class PonderDeadline(SearchDeadline):
+    """
+    Flag to interrupt a search on the opponent's time. The search has no deadline until the opponent moved, on a
+    ponder hit the parent process writes the deadline of the move into the shared deadline and the search goes on
+    until then.
+    """
+
+    def __init__(self, shared_deadline: multiprocessing.sharedctypes.Synchronized,
+                 stop_flag: Optional[multiprocessing.sharedctypes.Synchronized] = None):
+        super().__init__(deadline=math.inf, stop_flag=stop_flag)
+        self.shared_deadline: multiprocessing.sharedctypes.Synchronized = shared_deadline
+
+    @property
+    def value(self) -> bool:
+        if self.nodes_until_check <= 1:  # The deadline is read right before the time is checked.
+            self.deadline = self.shared_deadline.value
+        return super().value
+
+
+class GameClock:
+    """
+    Clock of one player for a whole game: the remaining time and the increment added after every move.
+    """
+
+    def __init__(self, milliseconds: int, increment_milliseconds: int = 0):
+        self.remaining_milliseconds: int = milliseconds
+        self.increment_milliseconds: int = increment_milliseconds
+
+    def get_budget_milliseconds(self, board_player_one: int, board_player_two: int) -> int:
+        """
+        Calculates the time to use for the next move. The remaining time is spread over the moves the player can at
+        most still make, but at least over MOVES_TO_GO moves, and the increment is added.
+
+        Parameters
+        ----------
+        board_player_one: int
+            Board player one.
+        board_player_two: int
+            Board player two.
+
+        Returns
+        -------
+        :int
+            Time for the next move in milliseconds.
+        """
+        moves_left: int = (NUMBER_OF_POSITIONS - (board_player_one | board_player_two).bit_count() + 1) // 2
+        budget: int = self.remaining_milliseconds // max(1, min(moves_left, MOVES_TO_GO)) + \
+            self.increment_milliseconds
+        return max(MIN_BUDGET_MILLISECONDS, min(budget, self.remaining_milliseconds - SAFETY_MARGIN_MILLISECONDS))
+
+    def update(self, used_milliseconds: int):
+        """
+        Subtracts the time used for a move and adds the increment.
+
+        Parameters
+        ----------
+        used_milliseconds: int
+            Time used for the move.
+        """
+        self.remaining_milliseconds += self.increment_milliseconds - used_milliseconds
+
+
+def get_time_budget(seconds: float, milliseconds: Optional[int], clock: Optional[GameClock], board_player_one: int,
+                    board_player_two: int) -> float:
+    """
+    Selects the time to use for the next move: the budget of the game clock if there is one, otherwise the given
+    milliseconds if they are not None, otherwise the given seconds.
+
+    Parameters
+    ----------
+    seconds: float
+        Time for the move in seconds.
+    milliseconds: Optional[int]
+        Time for the move in milliseconds.
+    clock: Optional[GameClock]
+        Clock of the player.
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+
+    Returns
+    -------
+    :float
+        Time for the move in seconds.
+    """
+    if clock is not None:
+        return clock.get_budget_milliseconds(board_player_one=board_player_one,
+                                             board_player_two=board_player_two) / 1000
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return seconds
+
+
+def predict_iteration_seconds(iteration_seconds: list[float], iteration_nodes: list[int]) -> Optional[float]:
+    """
+    Predicts the time of the next iteration of the iterative deepening from the effective branching factor, the
+    nodes of the last iteration divided by the nodes of the iteration before.
+
+    Parameters
+    ----------
+    iteration_seconds: list[float]
+        Time of every iteration searched completely.
+    iteration_nodes: list[int]
+        Nodes of every iteration searched completely.
+
+    Returns
+    -------
+    :Optional[float]
+        The predicted time of the next iteration, None if less than two iterations were searched.
+    """
+    if len(iteration_nodes) < 2 or not iteration_nodes[-2]:
+        return None
+    return iteration_seconds[-1] * iteration_nodes[-1] / iteration_nodes[-2]
+
+
+class StableBestMove:
+    """
+    Policy to stop the iterative deepening early, shared by all search loops: once the best move stayed the same for
+    the given number of iterations, the search stops if the next iteration is predicted to need more than
+    STABLE_ITERATION_TIME_SHARE of the remaining time, see predict_iteration_seconds.
+    """
+
+    def __init__(self, stable_iterations: int = STABLE_ITERATIONS):
+        self.stable_iterations: int = stable_iterations
+        self.best_move: Optional[int] = None
+        self.iterations_with_best_move: int = 0
+        self.iteration_seconds: list[float] = []
+        self.iteration_nodes: list[int] = []
+
+    def update(self, best_move: int, seconds: float, nodes: int, seconds_left: float) -> bool:
+        """
+        Records an iteration searched completely.
+
+        Parameters
+        ----------
+        best_move: int
+            Best move of the iteration.
+        seconds: float
+            Time of the iteration.
+        nodes: int
+            Nodes of the iteration.
+        seconds_left: float
+            Time left until the deadline of the search.
+
+        Returns
+        -------
+        :bool
+            Whether the search should stop.
+        """
+        self.iteration_seconds.append(seconds)
+        self.iteration_nodes.append(nodes)
+        if best_move == self.best_move:
+            self.iterations_with_best_move += 1
+        else:
+            self.best_move, self.iterations_with_best_move = best_move, 1
+        if self.iterations_with_best_move < self.stable_iterations:
+            return False
+        predicted_seconds: Optional[float] = predict_iteration_seconds(iteration_seconds=self.iteration_seconds,
+                                                                       iteration_nodes=self.iteration_nodes)
+        return predicted_seconds is not None and predicted_seconds > seconds_left * STABLE_ITERATION_TIME_SHARE
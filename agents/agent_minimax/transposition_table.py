@@ -0,0 +1,503 @@
+from array import array
+from multiprocessing import shared_memory
+from typing import Optional
+import os
+import weakref
+
+from agents.game_utils import PlayerAction, position_key
+
+BOUND_EXACT: int = 0  # The evaluation is the exact value of the position.
+BOUND_LOWER: int = 1  # The search failed high, the real value is at least the evaluation.
+BOUND_UPPER: int = 2  # The search failed low, the real value is at most the evaluation.
+
+NO_MOVE: PlayerAction = PlayerAction(-1)
+TRANSPOSITION_TABLE_SIZE_MB: int = 16
+
+# Layout of the 64 bit data word of an entry: | evaluation: 50 | depth: 6 | bound: 2 | move: 3 | generation: 3 |
+BITS_GENERATION: int = 3
+BITS_MOVE: int = 3
+BITS_BOUND: int = 2
+BITS_DEPTH: int = 6
+SHIFT_MOVE: int = BITS_GENERATION
+SHIFT_BOUND: int = SHIFT_MOVE + BITS_MOVE
+SHIFT_DEPTH: int = SHIFT_BOUND + BITS_BOUND
+SHIFT_EVALUATION: int = SHIFT_DEPTH + BITS_DEPTH
+EVALUATION_OFFSET: int = 1 << 49  # Evaluations are saved shifted to be positive, |evaluation| < 2^49 always holds.
+MAX_DEPTH: int = (1 << BITS_DEPTH) - 1
+MASK_GENERATION: int = (1 << BITS_GENERATION) - 1
+MASK_MOVE: int = (1 << BITS_MOVE) - 1
+MASK_BOUND: int = (1 << BITS_BOUND) - 1
+MASK_DEPTH: int = (1 << BITS_DEPTH) - 1
+EMPTY_MOVE: int = MASK_MOVE  # Value of the move field if there is no move to save.
+# A win found at a remaining depth of n is evaluated as START_VALUE * 2^n, evaluations of at least START_VALUE are
+# wins or losses. START_VALUE is above the largest evaluation of the boards, 69 windows with at most 16 points each.
+# Wins depend on the depth of the search, so they are saved as the distance of the end of the game to the position
+# instead, counted down from MATE_ENTRY.
+START_VALUE: int = 2048
+MATE_ENTRY: int = EVALUATION_OFFSET - 1
+
+WORDS_PER_ENTRY: int = 2  # The position key and the data word.
+ENTRIES_PER_BUCKET: int = 2  # One depth-preferred and one always-replace entry.
+BYTES_PER_BUCKET: int = ENTRIES_PER_BUCKET * WORDS_PER_ENTRY * 8
+
+# The column masks include the buffer bit above each column, so position keys can be mirrored as well.
+COLUMN_0_FILLED: int = 0b1111111_0000000_0000000_0000000_0000000_0000000_0000000
+COLUMN_1_FILLED: int = 0b0000000_1111111_0000000_0000000_0000000_0000000_0000000
+COLUMN_2_FILLED: int = 0b0000000_0000000_1111111_0000000_0000000_0000000_0000000
+COLUMN_3_FILLED: int = 0b0000000_0000000_0000000_1111111_0000000_0000000_0000000
+COLUMN_4_FILLED: int = 0b0000000_0000000_0000000_0000000_1111111_0000000_0000000
+COLUMN_5_FILLED: int = 0b0000000_0000000_0000000_0000000_0000000_1111111_0000000
+COLUMN_6_FILLED: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_1111111
+
+SHIFT_6_COLUMNS: int = 42
+SHIFT_4_COLUMNS: int = 28
+SHIFT_2_COLUMNS: int = 14
+
+
+class TranspositionTable:
+    """
+    Transposition table storing already calculated evaluations of board-positions. Every entry also contains the
+    remaining search depth the evaluation was calculated with and the type of bound it represents, so that entries
+    can safely be reused in later iterations of the iterative deepening and in later moves of the same game.
+
+    The table has a fixed size. It is backed by preallocated arrays of 64 bit words and organised in buckets of two
+    entries: the first entry keeps the deepest result of the current search, the second one is always replaced.
+    Instead of the position key itself, the key XOR the data word is saved, so an entry whose two words were not
+    written together is detected and ignored. This allows several processes to use the same table without locks.
+    """
+
+    def __init__(self, size_mb: int = TRANSPOSITION_TABLE_SIZE_MB):
+        self.size_mb: int = size_mb
+        self.number_of_buckets: int = previous_prime(max(2, size_mb * 2 ** 20 // BYTES_PER_BUCKET))
+        number_of_entries: int = self.number_of_buckets * ENTRIES_PER_BUCKET
+        self.keys: array = array('Q', bytes(8 * number_of_entries))  # The position key XOR the data word.
+        self.data: array = array('Q', bytes(8 * number_of_entries))  # A data word of 0 marks an empty entry.
+        self.generation: int = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search. Entries of earlier searches are preferably replaced by newer ones.
+        """
+        self.generation = (self.generation + 1) & MASK_GENERATION
+
+    def get_entry(self, key: int, depth: Optional[int] = None) -> Optional[tuple[int, int, int, PlayerAction]]:
+        """
+        Function to get the entry corresponding to the given position key.
+
+        Parameters
+        ----------
+        key: int
+            Key of the board-position.
+        depth: Optional[int]
+            Remaining depth the position is searched with, wins and losses are evaluated for this depth. None to
+            evaluate them for the depth of the entry.
+
+        Returns
+        -------
+        :Optional[tuple[int, int, int, PlayerAction]]
+            None if there is no entry, otherwise a tuple containing the evaluation, the depth, the bound type and the
+            best move in the given position (NO_MOVE if there is none).
+        """
+        index = key % self.number_of_buckets * ENTRIES_PER_BUCKET
+        for entry_index in (index, index + 1):
+            data = self.data[entry_index]
+            if data and self.keys[entry_index] ^ data == key:
+                evaluation, entry_depth, bound, move = unpack_entry(data=data)
+                if is_mate_evaluation(evaluation=evaluation):
+                    evaluation = decode_mate_evaluation(evaluation=evaluation,
+                                                        depth=entry_depth if depth is None else depth)
+                return evaluation, entry_depth, bound, move
+        return None
+
+    def store_entry(self, key: int, evaluation: int, depth: int, bound: int, move: PlayerAction):
+        """
+        Function to save an evaluation in the transposition table. The depth-preferred entry of the bucket is replaced
+        if it is empty, belongs to an earlier search or was calculated with at most the given depth. Otherwise, the
+        always-replace entry of the bucket is overwritten. Wins and losses are saved independent of the depth, see
+        encode_mate_evaluation.
+
+        Parameters
+        ----------
+        key: int
+            Key of the board-position.
+        evaluation: int
+            Evaluation of the position.
+        depth: int
+            Remaining depth the evaluation was calculated with.
+        bound: int
+            Either BOUND_EXACT, BOUND_LOWER or BOUND_UPPER.
+        move: PlayerAction
+            Best move in the given position, NO_MOVE if there is none.
+        """
+        index = key % self.number_of_buckets * ENTRIES_PER_BUCKET
+        if not 0 <= depth <= MAX_DEPTH:
+            depth = min(max(depth, 0), MAX_DEPTH)
+        if is_mate_evaluation(evaluation=evaluation):
+            evaluation = encode_mate_evaluation(evaluation=evaluation, depth=depth)
+        saved_data = self.data[index]
+        if saved_data and (saved_data & MASK_GENERATION) == self.generation and \
+                depth < (saved_data >> SHIFT_DEPTH) & MASK_DEPTH:
+            index += 1
+        data = pack_entry(evaluation=evaluation, depth=depth, bound=bound, move=move, generation=self.generation)
+        self.keys[index] = key ^ data
+        self.data[index] = data
+
+    def __len__(self) -> int:
+        return len(self.data) - self.data.tolist().count(0)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    Transposition table backed by shared memory. The process creating the table owns the memory, other processes
+    attach to it without copying when the table is pickled, e.g. when it is passed to a new process or sent through a
+    pipe. All processes read and write the same entries without locks, relying on the XOR verification of the entries.
+    The generation of the search is kept in the shared memory as well.
+    """
+
+    def __init__(self, size_mb: int = TRANSPOSITION_TABLE_SIZE_MB, name: Optional[str] = None):
+        """
+        Parameters
+        ----------
+        size_mb: int
+            Size of the table.
+        name: Optional[str]
+            Name of the shared memory to attach to, a new shared memory is created if it is None.
+        """
+        self.size_mb: int = size_mb
+        self.number_of_buckets: int = previous_prime(max(2, size_mb * 2 ** 20 // BYTES_PER_BUCKET))
+        number_of_bytes: int = 8 * self.number_of_buckets * ENTRIES_PER_BUCKET
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=8 + 2 * number_of_bytes)
+            self.shared_memory.buf[:8 + 2 * number_of_bytes] = bytes(8 + 2 * number_of_bytes)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        self.header = self.shared_memory.buf[:8].cast('Q')  # Holds the generation.
+        self.keys = self.shared_memory.buf[8:8 + number_of_bytes].cast('Q')
+        self.data = self.shared_memory.buf[8 + number_of_bytes:8 + 2 * number_of_bytes].cast('Q')
+        self._finalizer = weakref.finalize(self, release_shared_memory, self.shared_memory,
+                                           [self.header, self.keys, self.data], os.getpid() if name is None else None)
+
+    @property
+    def generation(self) -> int:
+        return self.header[0]
+
+    @generation.setter
+    def generation(self, generation: int):
+        self.header[0] = generation
+
+    def close(self):
+        """
+        Closes the table in this process. The shared memory is freed if this process created it.
+        """
+        self._finalizer()
+
+    def __getstate__(self) -> dict:
+        return {"size_mb": self.size_mb, "name": self.shared_memory.name}
+
+    def __setstate__(self, state: dict):
+        self.__init__(size_mb=state["size_mb"], name=state["name"])
+
+
+def release_shared_memory(shared_memory_block: shared_memory.SharedMemory, views: list[memoryview],
+                          owner_process_id: Optional[int]):
+    """
+    Releases the views on the shared memory of a table and closes it. Called when the table is garbage collected or
+    closed.
+
+    Parameters
+    ----------
+    shared_memory_block: shared_memory.SharedMemory
+        The shared memory of the table.
+    views: list[memoryview]
+        Views on the shared memory used by the table.
+    owner_process_id: Optional[int]
+        Id of the process which created the shared memory, None if it was attached to. The shared memory is only freed
+        by its creator, not by copies of the table in forked processes.
+    """
+    for view in views:
+        view.release()
+    shared_memory_block.close()
+    if owner_process_id == os.getpid():
+        shared_memory_block.unlink()
+
+
+def previous_prime(number: int) -> int:
+    """
+    Finds the largest prime number which is not larger than the given number. Used as the number of buckets, so the
+    position keys are spread evenly over the table.
+
+    Parameters
+    ----------
+    number: int
+        Upper limit, at least 2.
+
+    Returns
+    -------
+    :int
+        The largest prime number not larger than the given number.
+    """
+    while any(number % divisor == 0 for divisor in range(2, int(number ** 0.5) + 1)):
+        number -= 1
+    return number
+
+
+def pack_entry(evaluation: int, depth: int, bound: int, move: PlayerAction, generation: int) -> int:
+    """
+    Packs the values of an entry into a single 64 bit word.
+
+    Parameters
+    ----------
+    evaluation: int
+        Evaluation of the position, clipped to the representable range.
+    depth: int
+        Remaining depth the evaluation was calculated with.
+    bound: int
+        Type of bound of the evaluation.
+    move: PlayerAction
+        Best move in the position, NO_MOVE if there is none.
+    generation: int
+        Generation of the search the entry was calculated in.
+
+    Returns
+    -------
+    :int
+        The packed data word, never 0.
+    """
+    if not -EVALUATION_OFFSET < evaluation < EVALUATION_OFFSET:
+        evaluation = min(max(evaluation, 1 - EVALUATION_OFFSET), EVALUATION_OFFSET - 1)
+    evaluation += EVALUATION_OFFSET
+    move = EMPTY_MOVE if move < 0 else int(move)
+    return evaluation << SHIFT_EVALUATION | depth << SHIFT_DEPTH | bound << SHIFT_BOUND | move << SHIFT_MOVE | \
+        generation
+
+
+def is_mate_evaluation(evaluation: int) -> bool:
+    """
+    Checks if an evaluation is a win or loss. Saved wins and losses, see encode_mate_evaluation, count as well.
+
+    Parameters
+    ----------
+    evaluation: int
+        Evaluation of a position.
+
+    Returns
+    -------
+    :bool
+        True if the evaluation is at least START_VALUE in absolute value, evaluations of the boards are smaller.
+    """
+    return abs(evaluation) >= START_VALUE
+
+
+def encode_mate_evaluation(evaluation: int, depth: int) -> int:
+    """
+    Converts the evaluation of a win or loss into the distance of the end of the game to the position, which stays the
+    same in searches of every depth. Bounds of the window between two wins are rounded towards the smaller win, which
+    keeps them correct, as only the wins themselves are possible evaluations.
+
+    Parameters
+    ----------
+    evaluation: int
+        Evaluation of the position, at least START_VALUE in absolute value.
+    depth: int
+        Remaining depth the evaluation was calculated with.
+
+    Returns
+    -------
+    :int
+        MATE_ENTRY minus the distance, negated for a loss.
+    """
+    remaining_depth: int = (abs(evaluation) // START_VALUE).bit_length() - 1
+    distance: int = max(depth - remaining_depth, 0)
+    return MATE_ENTRY - distance if evaluation > 0 else distance - MATE_ENTRY
+
+
+def decode_mate_evaluation(evaluation: int, depth: int) -> int:
+    """
+    Converts a win or loss saved by encode_mate_evaluation back into an evaluation for the given remaining depth. A
+    win further away than the depth is evaluated like a win at the maximum depth.
+
+    Parameters
+    ----------
+    evaluation: int
+        The saved evaluation.
+    depth: int
+        Remaining depth the position is searched with.
+
+    Returns
+    -------
+    :int
+        The evaluation of the win or loss.
+    """
+    distance: int = MATE_ENTRY - abs(evaluation)
+    mate: int = START_VALUE * 2 ** max(depth - distance, 0)
+    return mate if evaluation > 0 else -mate
+
+
+def unpack_entry(data: int) -> tuple[int, int, int, PlayerAction]:
+    """
+    Unpacks a data word created by pack_entry.
+
+    Parameters
+    ----------
+    data: int
+        The packed data word.
+
+    Returns
+    -------
+    :tuple[int, int, int, PlayerAction]
+        Tuple containing the evaluation, the depth, the bound type and the best move.
+    """
+    move = (data >> SHIFT_MOVE) & MASK_MOVE
+    return (data >> SHIFT_EVALUATION) - EVALUATION_OFFSET, (data >> SHIFT_DEPTH) & MASK_DEPTH, \
+        (data >> SHIFT_BOUND) & MASK_BOUND, NO_MOVE if move == EMPTY_MOVE else move
+
+
+def mirror_player_board(player_board) -> int:
+    """
+    Mirrors a single board around the middle column by bit shifting separate
+    columns and putting them together.
+
+    Parameters
+    ----------
+    player_board:
+        The players board.
+
+    Returns
+    -------
+    int:
+        The mirrored board.
+    """
+    new_column_0: int = COLUMN_0_FILLED & (player_board << SHIFT_6_COLUMNS)
+    # Shifts the board to the left so that column six is in place
+    # of column zero, then removes the other columns.
+    new_column_1: int = COLUMN_1_FILLED & (player_board << SHIFT_4_COLUMNS)
+    new_column_2: int = COLUMN_2_FILLED & (player_board << SHIFT_2_COLUMNS)
+    new_column_3: int = COLUMN_3_FILLED & player_board  # not shifted because in the middle
+    new_column_4: int = COLUMN_4_FILLED & (player_board >> SHIFT_2_COLUMNS)
+    new_column_5: int = COLUMN_5_FILLED & (player_board >> SHIFT_4_COLUMNS)
+    new_column_6: int = COLUMN_6_FILLED & (player_board >> SHIFT_6_COLUMNS)
+    return new_column_0 | new_column_1 | new_column_2 | new_column_3 | new_column_4 | new_column_5 | new_column_6
+    # Puts all the columns together.
+
+
+def mirror_move(move: PlayerAction) -> PlayerAction:
+    """
+    Mirrors a move around the middle column.
+
+    Parameters
+    ----------
+    move: PlayerAction
+        The move, NO_MOVE stays NO_MOVE.
+
+    Returns
+    -------
+    :PlayerAction
+        The mirrored move.
+    """
+    return NO_MOVE if move == NO_MOVE else 6 - move
+
+
+def get_canonical_key(board_player_one: int, board_player_two: int) -> tuple[int, bool]:
+    """
+    Calculates the key under which a board-position is saved in the transposition table. A board-position and its
+    mirrored board-position share the smaller one of their position keys.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board of player one.
+    board_player_two: int
+        Board of player two.
+
+    Returns
+    -------
+    :tuple[int, bool]
+        The canonical key and whether it is the key of the mirrored board-position, the moves of the entry have to be
+        mirrored then.
+    """
+    key: int = position_key(board_player_one=board_player_one, board_player_two=board_player_two)
+    mirrored_key: int = mirror_player_board(player_board=key)
+    if mirrored_key < key:
+        return mirrored_key, True
+    return key, False
+
+
+def canonical_position_key(board_player_one: int, board_player_two: int) -> int:
+    """
+    Calculates a key which is equal for a board-position and its mirrored board-position, by taking the minimum of
+    the position key and the mirrored position key.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board of player one.
+    board_player_two: int
+        Board of player two.
+
+    Returns
+    -------
+    int:
+        The canonical key of the board-position.
+    """
+    return get_canonical_key(board_player_one=board_player_one, board_player_two=board_player_two)[0]
+
+
+def get_entry_from_transposition_table(board_player_one: int, board_player_two: int,
+                                       transposition_table: TranspositionTable, depth: Optional[int] = None) -> \
+        Optional[tuple[int, int, int, PlayerAction]]:
+    """
+    Looks up a board-position in the transposition table using its canonical key. Mirrored board-positions share one
+    entry, the best move is saved for the board-position of the canonical key and mirrored back if needed.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board of player one.
+    board_player_two: int
+        Board of player two.
+    transposition_table: TranspositionTable
+        Transposition table.
+    depth: Optional[int]
+        Remaining depth the board-position is searched with, see TranspositionTable.get_entry.
+
+    Returns
+    -------
+    Optional[tuple[int, int, int, PlayerAction]]:
+        None if there is no entry, otherwise a tuple containing the evaluation, the depth, the bound type and the best
+        move for the given board-position.
+    """
+    key, mirrored = get_canonical_key(board_player_one=board_player_one, board_player_two=board_player_two)
+    entry = transposition_table.get_entry(key=key, depth=depth)
+    if entry is None or not mirrored:
+        return entry
+    return entry[0], entry[1], entry[2], mirror_move(move=entry[3])
+
+
+def save_entry_in_transposition_table(board_player_one: int, board_player_two: int,
+                                      transposition_table: TranspositionTable, evaluation: int, depth: int,
+                                      bound: int, move: PlayerAction):
+    """
+    Saves an evaluation of a board-position in the transposition table using its canonical key. If the canonical key
+    belongs to the mirrored board-position, the mirrored best move is saved.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board of player one.
+    board_player_two: int
+        Board of player two.
+    transposition_table: TranspositionTable
+        Transposition table.
+    evaluation: int
+        Evaluation of the board-position.
+    depth: int
+        Remaining depth the evaluation was calculated with.
+    bound: int
+        Type of bound of the evaluation.
+    move: PlayerAction
+        Best move on the board-position, NO_MOVE if there is none.
+    """
+    key, mirrored = get_canonical_key(board_player_one=board_player_one, board_player_two=board_player_two)
+    if mirrored:
+        move = mirror_move(move=move)
+    transposition_table.store_entry(key=key, evaluation=evaluation, depth=depth, bound=bound, move=move)
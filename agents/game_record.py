@@ -0,0 +1,201 @@
+"""
+Game records: one JSON object per line and game, so records can be appended while games are played and read back one
+at a time. Files ending with .gz are compressed.
+"""
+from typing import Iterator, Optional, TextIO
+import gzip
+import json
+
+from agents.game_utils import BoardPiece, PlayerAction, PLAYER1, PLAYER2, apply_player_action, connected_four
+
+# Lists with one entry per move played by the agents, None where an agent does not report the value.
+MOVE_FIELDS: tuple[str, ...] = ("moves", "milliseconds", "depths", "scores", "nodes")
+
+
+def open_record_file(path: str, mode: str) -> TextIO:
+    """
+    Opens a game record file as text, compressed if the path ends with .gz.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file.
+    mode: str
+        "r" to read, "a" to append.
+
+    Returns
+    -------
+    :TextIO
+        The opened file.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def create_game_record(agent_one: str, agent_two: str, opening: Optional[list[PlayerAction]] = None) -> dict:
+    """
+    Creates the record of a game which has not started yet.
+
+    Parameters
+    ----------
+    agent_one: str
+        Name of the agent playing as player one.
+    agent_two: str
+        Name of the agent playing as player two.
+    opening: Optional[list[PlayerAction]]
+        Moves played before the agents take over, starting with player one.
+
+    Returns
+    -------
+    :dict
+        The names of the agents, the opening, an empty list for every field of MOVE_FIELDS and the winner, which is 0
+        until the game is won.
+    """
+    record: dict = dict(agent_one=agent_one, agent_two=agent_two, opening=[int(move) for move in opening or []])
+    record.update({field: [] for field in MOVE_FIELDS})
+    record["winner"] = 0
+    return record
+
+
+def add_move(record: dict, move: PlayerAction, milliseconds: Optional[int] = None, depth: Optional[int] = None,
+             score: Optional[int] = None, nodes: Optional[int] = None):
+    """
+    Adds a move played by an agent to a game record.
+
+    Parameters
+    ----------
+    record: dict
+        Record of the game, see create_game_record.
+    move: PlayerAction
+        The move played.
+    milliseconds: Optional[int]
+        Time used for the move.
+    depth: Optional[int]
+        Deepest depth searched completely for the move.
+    score: Optional[int]
+        Evaluation of the position from the view of player one.
+    nodes: Optional[int]
+        Number of nodes searched for the move.
+    """
+    for field, value in zip(MOVE_FIELDS, (move, milliseconds, depth, score, nodes)):
+        record[field].append(None if value is None else int(value))
+
+
+class GameRecordWriter:
+    """
+    Appends game records to a file. Every record is flushed when it is written, so the records of finished games are
+    kept if the program stops.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.file: TextIO = open_record_file(path=path, mode="a")
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+
+def read_game_records(path: str) -> Iterator[dict]:
+    """
+    Reads the game records of a file one at a time, so files of any size can be processed.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file.
+
+    Returns
+    -------
+    :Iterator[dict]
+        The records in the order they were written.
+    """
+    with open_record_file(path=path, mode="r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def get_positions(record: dict) -> Iterator[tuple[int, int, BoardPiece]]:
+    """
+    Replays a game record.
+
+    Parameters
+    ----------
+    record: dict
+        Record of the game.
+
+    Raises
+    ----------
+    ValueError
+        If a move of the record is not a legal move.
+
+    Returns
+    -------
+    :Iterator[tuple[int, int, BoardPiece]]
+        The boards of both players and the player to move of every position of the game, from the empty board to the
+        position after the last move.
+    """
+    board_player_one, board_player_two, player = 0, 0, PLAYER1
+    yield board_player_one, board_player_two, player
+    for move in record["opening"] + record["moves"]:
+        if not 0 <= move <= 6:
+            raise ValueError("{} is not a column".format(move))
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=move)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+        yield board_player_one, board_player_two, player
+
+
+def get_final_boards(record: dict) -> tuple[int, int]:
+    """
+    Replays a game record to its last position.
+
+    Parameters
+    ----------
+    record: dict
+        Record of the game.
+
+    Returns
+    -------
+    :tuple[int, int]
+        The boards of player one and player two after the last move.
+    """
+    board_player_one, board_player_two = 0, 0
+    for board_player_one, board_player_two, _ in get_positions(record=record):
+        pass
+    return board_player_one, board_player_two
+
+
+def get_winner(board_player_one: int, board_player_two: int) -> BoardPiece:
+    """
+    Determines the winner of a final position.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+
+    Returns
+    -------
+    :BoardPiece
+        PLAYER1 or PLAYER2 if the player has won, 0 otherwise.
+    """
+    if connected_four(board=board_player_one):
+        return PLAYER1
+    if connected_four(board=board_player_two):
+        return PLAYER2
+    return BoardPiece(0)
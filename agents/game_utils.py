@@ -207,6 +207,51 @@ def apply_player_action(board_player_one: int, board_player_two: int, player: Bo
         return board_player_one, (move_board & ~board_player_one) | board_player_two
 
 
+def boards_from_line(line: [int]) -> (int, int, BoardPiece):
+    """
+    Plays the given moves starting from the empty board.
+
+    Parameters
+    ----------
+    line: [int]
+        Moves to play, starting with player one.
+
+    Returns
+    ----------
+    :(int, int, BoardPiece)
+        The boards of both players and the player to move next.
+    """
+    board_player_one, board_player_two, player = 0, 0, PLAYER1
+    for move in line:
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=move)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    return board_player_one, board_player_two, player
+
+
+def position_key(board_player_one: int, board_player_two: int) -> int:
+    """
+    Calculates a single number which uniquely identifies a board-position. The board of both players determines the
+    height of every column, adding the board of player one to it results in a different number for every possible
+    distribution of the pieces in a column. Every column keeps its HEIGHT_BOARD + 1 bits, so the key fits into
+    BINARY_SIZE bits.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+
+    Returns
+    ----------
+    :int
+        Unique key of the board-position.
+    """
+    return board_player_one + (board_player_one | board_player_two)
+
+
 def connected_four(board: int) -> bool:
     """
     Returns True if there are four adjacent pieces equal to `player` arranged
@@ -260,8 +305,8 @@ def check_end_state(board_player_one: int, board_player_two: int, player: BoardP
     return GameState.STILL_PLAYING
 
 
-def get_possible_moves(board_player_one: int, board_player_two: int, player: BoardPiece, next_move: int = 3) -> (
-        [PlayerAction], GameState):
+def get_possible_moves(board_player_one: int, board_player_two: int, player: BoardPiece, next_move: int = 3,
+                       move_order: Optional[list[PlayerAction]] = None) -> ([PlayerAction], GameState):
     """
     Calculates all possible moves from a give board-position.
 
@@ -279,6 +324,9 @@ def get_possible_moves(board_player_one: int, board_player_two: int, player: Boa
     next_move:
         The move which should be first in returned list if it is allowed. Used for better pruning in iterative deepening.
 
+    move_order: Optional[list[PlayerAction]]
+        Order of all columns to return the moves in, e.g. from a MoveOrdering. MOVE_ORDER is used if it is None.
+
     Returns
     -------
     :([PlayerAction], GameState)
@@ -289,7 +337,7 @@ def get_possible_moves(board_player_one: int, board_player_two: int, player: Boa
     if game_state == GameState.IS_WIN:  # no moves are possible if either player has already won
         return [], game_state
     board_both_players = board_player_one | board_player_two
-    out: [PlayerAction] = MOVE_ORDER.copy()
+    out: [PlayerAction] = (MOVE_ORDER if move_order is None else move_order).copy()
     out.insert(0, out.pop(out.index(next_move)))  # move preferred move to front
     for i in MOVE_ORDER:
         if board_both_players & (1 << (i * (HEIGHT_BOARD + 1) + (HEIGHT_BOARD - 1))):  # check for top piece in column
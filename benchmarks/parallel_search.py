@@ -0,0 +1,77 @@
+"""
+Benchmark of the root-parallel search: the depth reached in a fixed time for a growing number of processes. The pool
+of processes is started before the time is taken, like the pool kept by the search worker for the whole game.
+
+Run from the root of the project:
+    python -m benchmarks.parallel_search --milliseconds 2000 --processes 1 2 4 8
+"""
+from typing import Optional
+import argparse
+import multiprocessing
+import os
+import time
+
+from agents.game_utils import BoardPiece, boards_from_line
+from agents.agent_minimax.minimax import generate_move_loop_to_stop
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.parallel_search import create_search_pool, generate_move_loop_parallel
+
+# Positions given as the moves played from the empty board.
+BENCHMARK_LINES: [[int]] = [[], [3, 3], [3, 2, 4, 4], [3, 3, 3, 3, 2, 4], [0, 6, 1, 5, 3, 3, 4, 2]]
+
+
+def measure_depth(board_player_one: int, board_player_two: int, player: BoardPiece, milliseconds: int,
+                  processes: int) -> int:
+    """
+    Searches the position for the given time.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    milliseconds: int
+        Time for the search.
+    processes: int
+        Number of processes, the sequential search is used for one process.
+
+    Returns
+    -------
+    :int
+        The deepest depth searched completely.
+    """
+    move_output = multiprocessing.Value('i', -1)
+    saved_state: MinimaxSavedState = MinimaxSavedState()
+    arguments: dict = dict(move_output=move_output, board_player_one=board_player_one,
+                           board_player_two=board_player_two, player=player, depth=1,
+                           loop_over_flag=multiprocessing.Event(), saved_state=saved_state)
+    if processes == 1:
+        return generate_move_loop_to_stop(deadline=time.monotonic() + milliseconds / 1000, **arguments)
+    with create_search_pool(processes=processes, stop_flag=None,
+                            transposition_table_size_mb=saved_state.transposition_table.size_mb) as executor:
+        executor.submit(int).result()  # Starts the processes of the pool.
+        return generate_move_loop_parallel(executor=executor, deadline=time.monotonic() + milliseconds / 1000,
+                                           **arguments)
+
+
+def main(arguments: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--milliseconds", type=int, default=2000, help="time per position")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, min(7, os.cpu_count() or 1)}), help="numbers of processes to compare")
+    arguments = parser.parse_args(arguments)
+    print("cpus: {}, time per position: {} ms".format(os.cpu_count(), arguments.milliseconds))
+    print("{:>9} | {} | mean depth".format("processes", " | ".join("position {}".format(index).rjust(10)
+                                                                    for index in range(len(BENCHMARK_LINES)))))
+    for processes in arguments.processes:
+        depths: [int] = [measure_depth(*boards_from_line(line), milliseconds=arguments.milliseconds,
+                                       processes=processes) for line in BENCHMARK_LINES]
+        print("{:>9} | {} | {:>10.2f}".format(processes, " | ".join("{:>10}".format(depth) for depth in depths),
+                                              sum(depths) / len(depths)))
+
+
+if __name__ == "__main__":
+    main()
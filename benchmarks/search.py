@@ -0,0 +1,223 @@
+"""
+Benchmark of the search on a fixed corpus of opening, middlegame and endgame positions: nodes per second, the time to
+reach every depth, the hit rate of the transposition table and the stability of the best move over the depths. The
+results are written as JSON, and can be compared with the results of an earlier run.
+
+Run from the root of the project:
+    python -m benchmarks.search --depth 8 --output results.json --compare baseline.json
+"""
+from typing import Optional, Callable
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+
+from agents.game_utils import BoardPiece, PlayerAction, boards_from_line
+from agents.agent_minimax.minimax import generate_move_minimax_id, line_ends_game
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import generate_move_negamax_id, generate_move_pvs_id
+from agents.agent_minimax.search_statistics import SearchStatistics
+
+# Positions given as the moves played from the empty board, by name. The middlegame and endgame positions are taken
+# from games of generate_move_pvs_id against itself after random openings.
+CORPUS: dict[str, [int]] = {
+    "opening-0": [],
+    "opening-2": [3, 3],
+    "opening-4": [3, 2, 4, 4],
+    "opening-6": [3, 3, 3, 3, 2, 4],
+    "opening-8": [0, 6, 1, 5, 3, 3, 4, 2],
+    "middlegame-12a": [6, 5, 5, 6, 5, 5, 6, 3, 3, 3, 3, 3],
+    "middlegame-12b": [3, 0, 3, 1, 4, 5, 3, 3, 1, 3, 1, 1],
+    "middlegame-14a": [6, 3, 1, 0, 3, 3, 3, 3, 3, 6, 6, 4, 5, 5],
+    "middlegame-14b": [3, 0, 3, 1, 4, 5, 3, 3, 1, 3, 1, 1, 5, 4],
+    "endgame-22": [5, 0, 0, 2, 2, 2, 2, 3, 1, 1, 1, 3, 1, 2, 1, 1, 2, 5, 5, 5, 5, 5],
+    "endgame-24": [1, 1, 5, 1, 1, 5, 3, 4, 5, 3, 3, 3, 0, 2, 2, 5, 3, 2, 2, 4, 4, 4, 4, 2],
+    "endgame-28a": [0, 4, 4, 2, 3, 4, 3, 3, 3, 4, 2, 2, 3, 2, 3, 0, 0, 2, 2, 0, 1, 1, 1, 6, 5, 5, 5, 1],
+    "endgame-28b": [1, 1, 5, 1, 1, 5, 3, 4, 5, 3, 3, 3, 0, 2, 2, 5, 3, 2, 2, 4, 4, 4, 4, 2, 3, 2, 4, 5],
+}
+SEARCH_FUNCTIONS: dict[str, Callable[..., list]] = {"minimax": generate_move_minimax_id,
+                                                    "negamax": generate_move_negamax_id, "pvs": generate_move_pvs_id}
+BENCHMARK_DEPTH: int = 8
+SECONDS_PER_POSITION: float = 30.0  # No further depth is started after this time.
+REGRESSION_TOLERANCE: float = 0.1  # Relative slowdown of the nodes per second reported as a regression.
+
+
+def benchmark_position(board_player_one: int, board_player_two: int, player: BoardPiece,
+                       search_function: Callable[..., list] = generate_move_minimax_id, depth: int = BENCHMARK_DEPTH,
+                       seconds: float = SECONDS_PER_POSITION) -> dict:
+    """
+    Searches a position with iterative deepening, like generate_move_loop_to_stop, with a new transposition table.
+    The nodes and the transposition table accesses are taken from the search statistics.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    search_function: Callable[..., list]
+        Search of a single depth with the arguments of generate_move_minimax_id.
+    depth: int
+        Deepest depth to search.
+    seconds: float
+        Time after which no further depth is started.
+
+    Returns
+    -------
+    :dict
+        For every depth searched: the depth, the time since the start of the search, the nodes and transposition
+        table probes, hits and stores of the depth, the evaluation and the best move. Also the totals, the nodes per
+        second, the hit rate, the number of times the best move changed and the first depth from which on the best
+        move did not change anymore.
+    """
+    saved_state: MinimaxSavedState = MinimaxSavedState(collect_statistics=True)
+    statistics: SearchStatistics = saved_state.statistics
+    depths: [dict] = []
+    evaluation: list[int, [PlayerAction]] = [0, []]
+    start_time: float = time.perf_counter()
+    for search_depth in range(1, depth + 1):
+        nodes, probes, hits, stores = statistics.nodes, statistics.transposition_table_probes, \
+            statistics.transposition_table_hits, statistics.transposition_table_stores
+        evaluation = search_function(board_player_one=board_player_one, board_player_two=board_player_two,
+                                     player=player, saved_state=saved_state, next_moves=evaluation[1],
+                                     depth=search_depth)
+        depths.append(dict(depth=search_depth, seconds=time.perf_counter() - start_time,
+                           nodes=statistics.nodes - nodes, probes=statistics.transposition_table_probes - probes,
+                           hits=statistics.transposition_table_hits - hits,
+                           stores=statistics.transposition_table_stores - stores,
+                           evaluation=int(evaluation[0]), move=int(evaluation[1][0])))
+        if time.perf_counter() - start_time >= seconds or search_depth >= len(evaluation[1]) + 1 and \
+                line_ends_game(board_player_one=board_player_one, board_player_two=board_player_two, player=player,
+                               moves=evaluation[1]):
+            break
+    seconds_total: float = depths[-1]["seconds"]
+    moves: [int] = [result["move"] for result in depths]
+    stable_from_depth: int = len(moves)
+    while stable_from_depth > 1 and moves[stable_from_depth - 2] == moves[-1]:
+        stable_from_depth -= 1
+    return dict(depths=depths, depth=depths[-1]["depth"], seconds=seconds_total, nodes=statistics.nodes,
+                nodes_per_second=statistics.nodes / seconds_total if seconds_total else 0.0,
+                probes=statistics.transposition_table_probes, hits=statistics.transposition_table_hits,
+                stores=statistics.transposition_table_stores, hit_rate=statistics.transposition_table_hit_rate,
+                move=moves[-1], best_move_changes=sum(1 for first, second in zip(moves, moves[1:]) if first != second),
+                stable_from_depth=stable_from_depth)
+
+
+def run_benchmark(search: str = "minimax", depth: int = BENCHMARK_DEPTH, seconds: float = SECONDS_PER_POSITION,
+                  positions: Optional[list[str]] = None) -> dict:
+    """
+    Benchmarks the positions of the corpus.
+
+    Parameters
+    ----------
+    search: str
+        Name of the search function, a key of SEARCH_FUNCTIONS.
+    depth: int
+        Deepest depth to search.
+    seconds: float
+        Time per position after which no further depth is started.
+    positions: Optional[list[str]]
+        Names of the positions of CORPUS to benchmark, all if it is None.
+
+    Returns
+    -------
+    :dict
+        The settings and the environment of the run, the results of every position (see benchmark_position) and the
+        totals over all positions.
+    """
+    results: dict[str, dict] = {}
+    for name in positions or CORPUS:
+        results[name] = benchmark_position(*boards_from_line(CORPUS[name]), search_function=SEARCH_FUNCTIONS[search],
+                                           depth=depth, seconds=seconds)
+    nodes: int = sum(result["nodes"] for result in results.values())
+    seconds_total: float = sum(result["seconds"] for result in results.values())
+    probes: int = sum(result["probes"] for result in results.values())
+    return dict(search=search, depth=depth, python=platform.python_version(), machine=platform.machine(),
+                date=datetime.datetime.now().isoformat(timespec="seconds"), positions=results,
+                total=dict(nodes=nodes, seconds=seconds_total,
+                           nodes_per_second=nodes / seconds_total if seconds_total else 0.0,
+                           hit_rate=sum(result["hits"] for result in results.values()) / probes if probes else 0.0))
+
+
+def compare_results(baseline: dict, results: dict, tolerance: float = REGRESSION_TOLERANCE) -> [str]:
+    """
+    Compares the results of a run with the results of an earlier run of the same positions.
+
+    Parameters
+    ----------
+    baseline: dict
+        Results of the earlier run, see run_benchmark.
+    results: dict
+        Results of the new run.
+    tolerance: float
+        Relative slowdown of the nodes per second which is not reported.
+
+    Returns
+    -------
+    :[str]
+        A description of every regression: positions searched slower by more than the tolerance, positions in which
+        another best move or evaluation was found at the same depth and the total nodes per second.
+    """
+    regressions: [str] = []
+    for name, result in results["positions"].items():
+        baseline_result: Optional[dict] = baseline["positions"].get(name)
+        if baseline_result is None:
+            continue
+        if result["nodes_per_second"] < baseline_result["nodes_per_second"] * (1 - tolerance):
+            regressions.append("{}: {:.0f} nodes/s instead of {:.0f}".format(
+                name, result["nodes_per_second"], baseline_result["nodes_per_second"]))
+        for depth_result, baseline_depth_result in zip(result["depths"], baseline_result["depths"]):
+            if (depth_result["move"], depth_result["evaluation"]) != \
+                    (baseline_depth_result["move"], baseline_depth_result["evaluation"]):
+                regressions.append("{}: move {} with evaluation {} at depth {} instead of move {} with evaluation {}"
+                                   .format(name, depth_result["move"], depth_result["evaluation"],
+                                           depth_result["depth"], baseline_depth_result["move"],
+                                           baseline_depth_result["evaluation"]))
+                break
+    if results["total"]["nodes_per_second"] < baseline["total"]["nodes_per_second"] * (1 - tolerance):
+        regressions.append("total: {:.0f} nodes/s instead of {:.0f}".format(results["total"]["nodes_per_second"],
+                                                                          baseline["total"]["nodes_per_second"]))
+    return regressions
+
+
+def main(arguments: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--search", choices=sorted(SEARCH_FUNCTIONS), default="minimax", help="search to benchmark")
+    parser.add_argument("--depth", type=int, default=BENCHMARK_DEPTH, help="deepest depth to search")
+    parser.add_argument("--seconds", type=float, default=SECONDS_PER_POSITION,
+                        help="time per position after which no further depth is started")
+    parser.add_argument("--positions", nargs="+", choices=list(CORPUS), help="positions to benchmark, default all")
+    parser.add_argument("--output", help="path of the JSON file to write the results to")
+    parser.add_argument("--compare", help="path of the JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="relative slowdown of the nodes per second which is not reported as a regression")
+    arguments = parser.parse_args(arguments)
+    results: dict = run_benchmark(search=arguments.search, depth=arguments.depth, seconds=arguments.seconds,
+                                  positions=arguments.positions)
+    print("{:>14} | {:>5} | {:>9} | {:>10} | {:>8} | {:>8} | {:>4} | {:>7} | {:>6}".format(
+        "position", "depth", "seconds", "nodes", "nodes/s", "hit rate", "move", "changes", "stable"))
+    for name, result in results["positions"].items():
+        print("{:>14} | {:>5} | {:>9.3f} | {:>10} | {:>8.0f} | {:>8.3f} | {:>4} | {:>7} | {:>6}".format(
+            name, result["depth"], result["seconds"], result["nodes"], result["nodes_per_second"], result["hit_rate"],
+            result["move"], result["best_move_changes"], result["stable_from_depth"]))
+    print("{:>14} | {:>5} | {:>9.3f} | {:>10} | {:>8.0f} | {:>8.3f} |".format(
+        "total", "", results["total"]["seconds"], results["total"]["nodes"], results["total"]["nodes_per_second"],
+        results["total"]["hit_rate"]))
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=1)
+    if arguments.compare is None:
+        return 0
+    with open(arguments.compare) as file:
+        regressions: [str] = compare_results(baseline=json.load(file), results=results, tolerance=arguments.tolerance)
+    for regression in regressions:
+        print("regression: " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
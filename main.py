@@ -1,4 +1,5 @@
 from typing import Callable
+import logging
 
 from agents import generate_move_minimax, user_move
 from agents.game_utils import GenMove
@@ -59,5 +60,6 @@ def human_vs_agent(
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  # Shows the moves of every depth searched.
     # human_vs_agent(generate_move_minimax)
     human_vs_agent(generate_move_minimax, generate_move_minimax)
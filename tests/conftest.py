@@ -0,0 +1,18 @@
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+MIDDLE_TOWER_ONE_BOARD: int = 0b0000000_0000000_0000000_0000001_0000000_0000000_0000000
+TEST_BOARD_ALMOST_FULL_ONE: int = 0b0010101_0010101_0101010_0010101_0010101_0111010_0000000
+TEST_BOARD_ALMOST_FULL_TWO: int = 0b0101010_0101010_0010101_0101010_0101010_0010101_0000001
+
+
+class StopAfterNodes:
+    """
+    Stop flag which is set after the given amount of nodes.
+    """
+
+    def __init__(self, nodes: int):
+        self.nodes: int = nodes
+
+    @property
+    def value(self) -> bool:
+        self.nodes -= 1
+        return self.nodes < 0
@@ -0,0 +1,68 @@
+import pytest
+
+from agents.game_record import *
+from agents.game_utils import *
+
+
+def make_record() -> dict:
+    record = create_game_record("pvs", "minimax", opening=[3, 3])
+    for move, milliseconds, depth in ((2, 100, 7), (2, 98, 6), (4, 101, 8), (5, 95, 7), (1, 99, 9)):
+        add_move(record, PlayerAction(move), milliseconds=milliseconds, depth=depth, score=depth * 10, nodes=1000)
+    record["winner"] = int(PLAYER1)
+    return record
+
+
+def test_add_move():
+    record = create_game_record("random", "pvs")
+    add_move(record, PlayerAction(3), milliseconds=5)
+    assert record["moves"] == [3]
+    assert record["milliseconds"] == [5]
+    assert record["depths"] == record["scores"] == record["nodes"] == [None]
+    assert type(record["moves"][0]) is int
+
+
+@pytest.mark.parametrize("name", ["games.jsonl", "games.jsonl.gz"])
+def test_write_and_read_game_records(tmp_path, name):
+    path = str(tmp_path / name)
+    records = [make_record(), create_game_record("random", "random", opening=[0])]
+    with GameRecordWriter(path) as writer:
+        writer.write(records[0])
+    with GameRecordWriter(path) as writer:  # Appends to the existing records.
+        writer.write(records[1])
+    read_records = read_game_records(path)
+    assert next(read_records) == records[0]
+    assert list(read_records) == records[1:]
+
+
+def test_get_positions():
+    positions = list(get_positions(make_record()))
+    assert len(positions) == 8
+    assert positions[0] == (0, 0, PLAYER1)
+    assert positions[1] == (1 << 21, 0, PLAYER2)
+    assert positions[2] == (1 << 21, 1 << 22, PLAYER1)
+    assert positions[-1][2] == PLAYER2
+
+
+def test_get_final_boards_round_trip():
+    board_player_one, board_player_two = string_to_board(
+        "|==============|\n"
+        "|              |\n"
+        "|              |\n"
+        "|              |\n"
+        "|              |\n"
+        "|    O O       |\n"
+        "|  X X X X O   |\n"
+        "|==============|\n"
+        "|0 1 2 3 4 5 6 |")
+    record = make_record()
+    assert get_final_boards(record) == (board_player_one, board_player_two)
+    assert get_winner(*get_final_boards(record)) == record["winner"] == PLAYER1
+    assert get_winner(*list(get_positions(record))[-2][:2]) == 0
+
+
+def test_get_positions_illegal_move():
+    record = create_game_record("random", "random", opening=[0] * 7)
+    with pytest.raises(ValueError):
+        list(get_positions(record))
+    with pytest.raises(ValueError):
+        list(get_positions(create_game_record("random", "random", opening=[7])))
@@ -139,6 +139,12 @@ def test_apply_player_action_row_two():
     assert ret[1] == LEFT_TOWER_TWO_BOARD
 
 
+def test_boards_from_line():
+    assert boards_from_line([]) == (EMPTY_BOARD, EMPTY_BOARD, PLAYER1)
+    assert boards_from_line([3]) == (FIRST_PIECE_BOARD, EMPTY_BOARD, PLAYER2)
+    assert boards_from_line([0, 0, 0, 0, 0, 0]) == (LEFT_TOWER_FIVE_BOARD, LEFT_TOWER_SIX_BOARD, PLAYER1)
+
+
 def test_apply_player_action_row_three():
     ret = apply_player_action(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD, PLAYER1, PlayerAction(0))
     assert ret[0] == LEFT_TOWER_THREE_BOARD
@@ -264,3 +270,25 @@ def test_get_possible_moves_player_one_won():
 def test_get_possible_moves_player_two_won():
     ret = get_possible_moves(EMPTY_BOARD, DIAGONAL_BOARD_RIGHT_TOP, PLAYER1)
     assert ret == ([], GameState.IS_WIN)
+
+
+def test_position_key_unique():
+    keys = set()
+    boards = [initialize_game_state()]
+    for _ in range(4):  # All positions up to four pieces.
+        new_boards = []
+        for board_player_one, board_player_two in boards:
+            player = PLAYER1 if (board_player_one | board_player_two).bit_count() % 2 == 0 else PLAYER2
+            for action in range(7):
+                new_boards.append(apply_player_action(board_player_one, board_player_two, player, PlayerAction(action)))
+        boards = list(set(new_boards))
+        for board_player_one, board_player_two in boards:
+            key = position_key(board_player_one, board_player_two)
+            assert key < 2 ** BINARY_SIZE
+            keys.add(key)
+    assert len(keys) == 7 + 49 + 238 + 1120
+
+
+def test_position_key_full_board():
+    assert position_key(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO) < 2 ** BINARY_SIZE
+    assert position_key(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO) != position_key(DRAW_PLAYER_TWO, DRAW_PLAYER_ONE)
@@ -1,13 +1,21 @@
+import logging
 import multiprocessing
 import multiprocessing.sharedctypes
+import time
 import pytest
 
 from agents.agent_minimax.minimax import *
+from agents.agent_minimax import time_control
 from agents.game_utils import *
-from agents.agent_minimax.minimax_window_list import MINIMAX_EVALUATION_WINDOWS_LIST, list_windows
+from agents.agent_minimax.minimax_window_list import MINIMAX_EVALUATION_WINDOWS_LIST, list_windows, \
+    MINIMAX_EVALUATION_WINDOW_DIRECTIONS, list_window_directions
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.transposition_table import TranspositionTable, SharedTranspositionTable, BOUND_EXACT, \
+    BOUND_LOWER, BOUND_UPPER, NO_MOVE
+from tests.conftest import EMPTY_BOARD, MIDDLE_TOWER_ONE_BOARD, TEST_BOARD_ALMOST_FULL_ONE, \
+    TEST_BOARD_ALMOST_FULL_TWO, StopAfterNodes
 
 
-EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
 DRAW_PLAYER_ONE: int = 0b0001010_0010101_0111011_0101110_0000100_0010100_0100011
 DRAW_PLAYER_TWO: int = 0b0110101_0101010_0000100_0010001_0111011_0101011_0011100
 DIAGONAL_BOARD_LEFT_TOP: int = 0b0000000_0000000_0000001_0000010_0000100_0001000_0000000
@@ -18,12 +26,14 @@ MIRRORED_EXAMPLE_BOARD: int = 0b0000100_0000000_0000001_0000010_0000110_0001011_
 LEFT_TOWER_ONE_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000001
 LEFT_TOWER_TWO_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000010
 
-MIDDLE_TOWER_ONE_BOARD: int = 0b0000000_0000000_0000000_0000001_0000000_0000000_0000000
 MIDDLE_TOWER_TWO_BOARD: int = 0b0000000_0000000_0000000_0000010_0000000_0000000_0000000
 
 RIGHT_TOWER_ONE_BOARD: int = 0b0000001_0000000_0000000_0000000_0000000_0000000_0000000
 RIGHT_TOWER_TWO_BOARD: int = 0b0000010_0000000_0000000_0000000_0000000_0000000_0000000
 
+LEFT_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000111
+MIDDLE_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000111_0000000_0000000_0000000
+
 RIGHT_TOWER_TWO_IN_A_ROW: int = 0b0000011_0000000_0000000_0000000_0000000_0000000_0000000
 RIGHT_TOWER_THREE_IN_A_ROW: int = 0b0000111_0000000_0000000_0000000_0000000_0000000_0000000
 
@@ -34,8 +44,6 @@ TEST_WINDOW_RIGHT_TOWER: (int, int, int, int) = (0b0000001_0000000_0000000_00000
 
 EXAMPLE_DICTIONARY_ENTRY: [int, [int]] = [1, [1, 2, 3]]
 
-TEST_BOARD_ALMOST_FULL_ONE: int = 0b0010101_0010101_0101010_0010101_0010101_0111010_0000000
-TEST_BOARD_ALMOST_FULL_TWO: int = 0b0101010_0101010_0010101_0101010_0101010_0010101_0000001
 
 
 def test_handle_empty_moves_eval_draw():
@@ -95,7 +103,86 @@ def test_get_possible_moves_iterative_full_next_moves():
 def test_generate_move_minimax():
     res = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 1)
     assert isinstance(res[0], int)
-    assert res[1] is None
+    assert isinstance(res[1], MinimaxSavedState)
+    assert isinstance(res[1].transposition_table, SharedTranspositionTable)
+    assert len(res[1].transposition_table) > 0
+
+
+def test_generate_move_minimax_reuses_saved_state():
+    saved_state = MinimaxSavedState()
+    move, new_saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, 1)
+    board_player_one, board_player_two = apply_player_action(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, move)
+    number_of_entries = len(new_saved_state.transposition_table)
+    _, newest_saved_state = generate_move_minimax(board_player_one, board_player_two, PLAYER2, new_saved_state, 1)
+    assert len(newest_saved_state.transposition_table) >= number_of_entries
+
+
+def test_generate_move_minimax_milliseconds():
+    start_time = time.monotonic()
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, None, 200)
+    assert move in range(7)
+    assert time.monotonic() - start_time < 2
+
+
+def test_generate_move_minimax_game_clock():
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, None, None, 2000, 100)
+    assert move in range(7)
+    assert 0 < saved_state.clock.remaining_milliseconds < 2000
+    assert saved_state.clock.increment_milliseconds == 100
+
+
+def test_generate_move_minimax_on_info():
+    infos = []
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, None, 300,
+                                              on_info=infos.append)
+    assert [info["depth"] for info in infos] == list(range(1, len(infos) + 1))
+    assert infos[-1]["depth"] == saved_state.depth
+    assert all(len(info["pv"]) == info["depth"] for info in infos)
+    assert all(first["nodes"] < second["nodes"] for first, second in zip(infos, infos[1:]))
+    assert set(infos[0]) == {"depth", "score", "pv", "nodes", "nps", "seconds"}
+
+
+def test_generate_move_minimax_on_info_stops_search():
+    infos = []
+    start_time = time.monotonic()
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5,
+                                              on_info=lambda info: infos.append(info) or info["depth"] == 2)
+    assert time.monotonic() - start_time < 2
+    assert [info["depth"] for info in infos] == [1, 2]
+    assert saved_state.depth >= 2
+
+
+def test_generate_move_minimax_stable_iterations(monkeypatch):
+    # Every next iteration is predicted to not finish in time, the search stops as soon as the best move is stable.
+    monkeypatch.setattr(time_control, "STABLE_ITERATION_TIME_SHARE", 0.0)
+    start_time = time.monotonic()
+    infos = []
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, on_info=infos.append,
+                                              stable_iterations=2)
+    assert time.monotonic() - start_time < 4
+    assert infos[-1]["pv"][0] == infos[-2]["pv"][0]
+    assert all(first["pv"][0] != second["pv"][0] for first, second in zip(infos[:-1], infos[1:-1]))
+
+
+def test_receive_search_info():
+    info_receiver, info_sender = multiprocessing.Pipe(duplex=False)
+    for depth, best_move in enumerate([3, 2, 2, 3, 3, 3, 4], start=1):
+        info_sender.send(dict(depth=depth, pv=[best_move]))
+    infos = []
+    receive_search_info(info_receiver, time.monotonic() + 5, on_info=lambda info: infos.append(info) or
+                        info["depth"] == 3)
+    assert infos[-1]["depth"] == 3
+    # Without a stop, the info is received until the search is over.
+    info_sender.send(None)
+    receive_search_info(info_receiver, time.monotonic() + 5, on_info=infos.append)
+    assert infos[-1]["depth"] == 7
+
+
+def test_receive_search_info_deadline():
+    info_receiver, info_sender = multiprocessing.Pipe(duplex=False)
+    start_time = time.monotonic()
+    receive_search_info(info_receiver, start_time + 0.1)
+    assert 0.1 <= time.monotonic() - start_time < 1
 
 
 def test_generate_move_loop_to_stop():
@@ -106,6 +193,58 @@ def test_generate_move_loop_to_stop():
     assert res.value == 0
 
 
+def test_generate_move_loop_to_stop_stop_flag():
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    stop_flag = multiprocessing.RawValue('b', True)
+    generate_move_loop_to_stop(res, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 1, loop_over_flag, None, stop_flag)
+
+    assert res.value == -1
+    assert not loop_over_flag.is_set()
+
+
+def test_generate_move_loop_to_stop_logs_depths(caplog, capsys):
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    stop_flag = StopAfterNodes(2000)
+    with caplog.at_level(logging.INFO, logger="agents.agent_minimax.minimax"):
+        depth = generate_move_loop_to_stop(res, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 1, loop_over_flag, None, stop_flag)
+    messages = [record.getMessage() for record in caplog.records]
+    assert depth >= 1
+    assert [message[:len("Moves at depth  1")] for message in messages[:depth]] == \
+           ["Moves at depth {:>2}".format(search_depth) for search_depth in range(1, depth + 1)]
+    assert capsys.readouterr().out == ""
+
+
+def test_generate_move_loop_to_stop_deadline():
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    start_time = time.monotonic()
+    generate_move_loop_to_stop(res, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 1, loop_over_flag, deadline=start_time + 0.2)
+    assert time.monotonic() - start_time < 0.5
+    assert res.value in range(7)
+    assert not loop_over_flag.is_set()
+
+
+def test_minimax_rec_stopped_after_first_root_move():
+    alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    with pytest.raises(SearchInterrupted) as interrupted:
+        minimax_rec(5, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, TranspositionTable(1), [], [3], True,
+                    StopAfterNodes(300))
+    assert interrupted.value.args[0][1][0] in range(7)
+    assert len(interrupted.value.args[0][1]) == 5
+
+
+def test_minimax_rec_stopped_in_first_root_move():
+    alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    with pytest.raises(SearchInterrupted) as interrupted:
+        minimax_rec(5, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, TranspositionTable(1), [], [3], True,
+                    StopAfterNodes(10))
+    assert not interrupted.value.args
+
+
 def test_generate_move_minimax_id():
     res = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 2)
     assert res == [-3, [3, 3]]
@@ -116,19 +255,58 @@ def test_generate_move_minimax_id_two():
     assert res == [9, [3, 3]]
 
 
+# Twenty pieces, player one to move, no forced win in sight, but the windows evaluate to more than 100.
+HIGH_EVALUATION_LINE: [int] = [3, 4, 4, 2, 4, 3, 3, 0, 2, 6, 3, 0, 0, 6, 2, 6, 6, 6, 0, 6]
+
+
+def test_start_value_above_board_evaluations():
+    largest_window = max(abs(calculate_evaluation_score(number_of_player_one_pieces=pieces,
+                                                        number_of_player_two_pieces=0)) for pieces in range(5))
+    assert START_VALUE > len(MINIMAX_EVALUATION_WINDOWS_LIST) * largest_window
+
+
+def test_generate_move_minimax_id_high_evaluation_not_a_win():
+    board_player_one, board_player_two, player = boards_from_line(HIGH_EVALUATION_LINE)
+    evaluation, _ = generate_move_minimax_id(board_player_one, board_player_two, player, None, [], 1)
+    assert 100 < evaluation < START_VALUE
+
+
+def test_generate_move_minimax_high_evaluation_keeps_searching():
+    board_player_one, board_player_two, player = boards_from_line(HIGH_EVALUATION_LINE)
+    _, saved_state = generate_move_minimax(board_player_one, board_player_two, player, None, 1)
+    # A board evaluation taken for a forced win would stop the search after the first depth.
+    assert saved_state.depth > 1
+
+
+def test_generate_move_minimax_id_saved_state():
+    saved_state = MinimaxSavedState()
+    res_first = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], 4)
+    res_second = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], 4)
+    assert len(saved_state.transposition_table) > 0
+    assert res_first[0] == res_second[0]
+
+
 def test_minimax_rec():
     alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
     beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
-    dictio = {-1: {}}
-    res = minimax_rec(2, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, dictio, [], [], 1, False)
+    res = minimax_rec(2, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, TranspositionTable(), [], [], 1)
     assert res == [-3, [3, 3]]
 
 
+def test_minimax_rec_stop_flag():
+    alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    stop_flag = multiprocessing.RawValue('b', True)
+    with pytest.raises(SearchInterrupted):
+        minimax_rec(2, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, TranspositionTable(), [], [], 1,
+                    stop_flag)
+
+
 def test_get_alpha_no_dictionary_entry():
     alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
     beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
-    res = get_alpha(0, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, alpha, beta, {}, [], [],
-                    PlayerAction(1), False)
+    res = get_alpha(0, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, alpha, beta,
+                    TranspositionTable(), [], [], PlayerAction(1))
     assert isinstance(res[0], int)
     assert isinstance(res[1], list)
     assert isinstance(res[1][0], PlayerAction)
@@ -137,16 +315,29 @@ def test_get_alpha_no_dictionary_entry():
 def test_get_alpha_with_dictionary_entry():
     alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
     beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
-    res = get_alpha(0, MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, alpha, beta, {MIDDLE_TOWER_ONE_BOARD: {EMPTY_BOARD: (1, [2, 3])}},
-                    [], [], PlayerAction(1), False)
-    assert res == (1, [2, 3])
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table, 1, 0, BOUND_EXACT, 2)
+    res = get_alpha(1, MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, alpha, beta, transposition_table,
+                    [], [], PlayerAction(1))
+    assert res == [1, [1]]
+
+
+def test_get_alpha_with_too_shallow_dictionary_entry():
+    alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table, 1000, 0, BOUND_EXACT, 2)
+    res = get_alpha(2, MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, transposition_table,
+                    [], [], PlayerAction(3))
+    assert res[0] != 1000
+    assert get_entry_from_transposition_table(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table)[1] == 1
 
 
 def test_get_beta_no_dictionary_entry():
     alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
     beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
-    res = get_beta(0, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, alpha, beta, {}, [], [],
-                   PlayerAction(1), False)
+    res = get_beta(0, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, alpha, beta,
+                   TranspositionTable(), [], [], PlayerAction(1))
     # assert type(res[1]) == "list"
     assert isinstance(res[0], int)
     assert isinstance(res[1], list)
@@ -156,20 +347,66 @@ def test_get_beta_no_dictionary_entry():
 def test_get_beta_with_dictionary_entry():
     alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
     beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
-    res = get_beta(0, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, {EMPTY_BOARD: {EMPTY_BOARD: (4, [5, 6])}}, [], [],
-                   PlayerAction(1), False)
-    assert res == (4, [5, 6])
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table, 4, 0, BOUND_EXACT, 5)
+    res = get_beta(1, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, alpha, beta, transposition_table, [], [],
+                   PlayerAction(1))
+    assert res == [4, [1]]
 
 
-def test_get_eval_from_dictionary_not_existing():
-    ret = get_eval_from_dictionary(EMPTY_BOARD, EMPTY_BOARD, {})
+def test_get_eval_from_transposition_table_not_existing():
+    ret = get_eval_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, TranspositionTable(), 0, -MAX_VALUE,
+                                            MAX_VALUE, [])
     assert ret is None
 
 
-def test_get_eval_from_dictionary_entry_existing():
-    dictionary = {EMPTY_BOARD: {EMPTY_BOARD: EXAMPLE_DICTIONARY_ENTRY}}
-    ret = get_eval_from_dictionary(EMPTY_BOARD, EMPTY_BOARD, dictionary)
-    assert ret == EXAMPLE_DICTIONARY_ENTRY
+def test_get_eval_from_transposition_table_entry_existing():
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table, EXAMPLE_DICTIONARY_ENTRY[0], 2, BOUND_EXACT, 0)
+    save_entry_in_transposition_table(LEFT_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table, EXAMPLE_DICTIONARY_ENTRY[0], 1, BOUND_EXACT, 2)
+    ret = get_eval_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, transposition_table, 2, -MAX_VALUE,
+                                            MAX_VALUE, [4])
+    assert ret == [EXAMPLE_DICTIONARY_ENTRY[0], [4, 0, 2]]
+
+
+def test_get_eval_from_transposition_table_bounds():
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table, 10, 2, BOUND_LOWER, NO_MOVE)
+    save_entry_in_transposition_table(EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, transposition_table, -10, 2, BOUND_UPPER, NO_MOVE)
+    assert get_eval_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, transposition_table, 2, 0, 5,
+                                             []) == [10, []]
+    assert get_eval_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, transposition_table, 2, 0, 20,
+                                             []) is None
+    assert get_eval_from_transposition_table(EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, PLAYER1, transposition_table, 2, -5,
+                                             5, []) == [-10, []]
+    assert get_eval_from_transposition_table(EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, PLAYER1, transposition_table, 2, -20,
+                                             5, []) is None
+
+
+def test_save_eval_in_transposition_table_bound_types():
+    transposition_table = TranspositionTable()
+    save_eval_in_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table, 3, 0, 10, [10, [3, 2]], [3])
+    save_eval_in_transposition_table(LEFT_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table, 3, 0, 10, [0, [2]], [3])
+    save_eval_in_transposition_table(EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, transposition_table, 3, 0, 10, [5, [3, 4]],
+                                     [3])
+    assert get_entry_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table) == (10, 3, BOUND_LOWER, 2)
+    assert get_entry_from_transposition_table(LEFT_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table) == (0, 3, BOUND_UPPER, NO_MOVE)
+    assert get_entry_from_transposition_table(EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, transposition_table) == (5, 3, BOUND_EXACT, 4)
+
+
+def test_get_line_from_transposition_table():
+    transposition_table = TranspositionTable()
+    save_entry_in_transposition_table(EMPTY_BOARD, EMPTY_BOARD, transposition_table, 0, 3, BOUND_EXACT, 3)
+    save_entry_in_transposition_table(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, transposition_table, 0, 2, BOUND_EXACT, 3)
+    save_entry_in_transposition_table(MIDDLE_TOWER_ONE_BOARD, MIDDLE_TOWER_TWO_BOARD, transposition_table, 0, 1, BOUND_EXACT, 0)
+    assert get_line_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, transposition_table, 3) == [3, 3, 0]
+    assert get_line_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, transposition_table, 2) == [3, 3]
+
+
+def test_line_ends_game():
+    assert line_ends_game(LEFT_TOWER_THREE_IN_A_ROW, MIDDLE_TOWER_THREE_IN_A_ROW, PLAYER1, [0])
+    assert line_ends_game(LEFT_TOWER_ONE_BOARD, MIDDLE_TOWER_THREE_IN_A_ROW, PLAYER1, [6, 3])
+    assert not line_ends_game(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, [3, 3])
 
 
 def test_list_windows():
@@ -177,6 +414,13 @@ def test_list_windows():
     assert ret == MINIMAX_EVALUATION_WINDOWS_LIST
 
 
+def test_list_window_directions():
+    ret = list_window_directions()
+    assert ret == MINIMAX_EVALUATION_WINDOW_DIRECTIONS
+    assert sorted(shift for shift, _ in ret) == [1, 6, 7, 8]
+    assert sum(lowest_positions.bit_count() for _, lowest_positions in ret) == len(MINIMAX_EVALUATION_WINDOWS_LIST)
+
+
 def test_mirror_player_board():
     ret = mirror_player_board(EXAMPLE_BOARD)
     assert ret == MIRRORED_EXAMPLE_BOARD
@@ -187,24 +431,31 @@ def test_mirror_boards():
     assert ret == (MIRRORED_EXAMPLE_BOARD, EXAMPLE_BOARD)
 
 
-def test_add_mirrored_boards_to_dictionary():
-    dictionary = {-1: {}}
-    add_mirrored_boards_to_dictionary(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD, dictionary, [10, [1, 1, 2]])
-    # Mirrored boards should be in the dictionary, evaluation and mirrored move list.
-    ret = dictionary[RIGHT_TOWER_ONE_BOARD][RIGHT_TOWER_TWO_BOARD]
-    assert ret == [10, [5, 5, 4]]
+def test_canonical_position_key():
+    assert canonical_position_key(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD) == \
+           canonical_position_key(RIGHT_TOWER_ONE_BOARD, RIGHT_TOWER_TWO_BOARD)
+    assert canonical_position_key(EXAMPLE_BOARD, EMPTY_BOARD) == \
+           canonical_position_key(MIRRORED_EXAMPLE_BOARD, EMPTY_BOARD)
+    assert canonical_position_key(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD) != \
+           canonical_position_key(LEFT_TOWER_TWO_BOARD, LEFT_TOWER_ONE_BOARD)
 
 
-def test_use_mirror_functions_one():
-    assert use_mirror_functions(EMPTY_BOARD, EMPTY_BOARD)
+def test_mirror_player_board_position_key():
+    key = position_key(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO)
+    assert mirror_player_board(key) == position_key(mirror_player_board(DRAW_PLAYER_ONE),
+                                                    mirror_player_board(DRAW_PLAYER_TWO))
 
 
-def test_use_mirror_functions_two():
-    assert use_mirror_functions(MIDDLE_TOWER_ONE_BOARD, MIDDLE_TOWER_TWO_BOARD)
-
-
-def test_use_mirror_functions_three():
-    assert not use_mirror_functions(LEFT_TOWER_ONE_BOARD, RIGHT_TOWER_ONE_BOARD)
+def test_save_entry_in_transposition_table_mirrored_boards_share_entry():
+    transposition_table = TranspositionTable(1)
+    save_entry_in_transposition_table(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD, transposition_table, 10, 3,
+                                      BOUND_EXACT, 1)
+    # Mirrored boards should find the same entry with the mirrored move.
+    ret = get_entry_from_transposition_table(RIGHT_TOWER_ONE_BOARD, RIGHT_TOWER_TWO_BOARD, transposition_table)
+    assert ret == (10, 3, BOUND_EXACT, 5)
+    ret = get_entry_from_transposition_table(LEFT_TOWER_ONE_BOARD, LEFT_TOWER_TWO_BOARD, transposition_table)
+    assert ret == (10, 3, BOUND_EXACT, 1)
+    assert len(transposition_table) == 1
 
 
 def test_evaluate_board_using_windows_one():
@@ -224,6 +475,97 @@ def test_evaluate_board_using_windows_three():
     assert res == 14
 
 
+def test_evaluate_action_difference_random_games():
+    random_generator = np.random.default_rng(4)
+    for _ in range(50):
+        board_player_one, board_player_two = EMPTY_BOARD, EMPTY_BOARD
+        board_evaluation = 0
+        player = PLAYER1
+        possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+        while possible_moves:
+            move = int(random_generator.choice(possible_moves))
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player, move)
+            board_evaluation += evaluate_action_difference(board_player_one, board_player_two, player, move)
+            assert board_evaluation == evaluate_board_using_windows(board_player_one, board_player_two)
+            player = BoardPiece(3 - player)
+            possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+
+
+def test_evaluate_board_using_bitboards():
+    assert evaluate_board_using_bitboards(LEFT_TOWER_ONE_BOARD, RIGHT_TOWER_ONE_BOARD) == EVAL_DRAWN_POSITION
+    assert evaluate_board_using_bitboards(LEFT_TOWER_ONE_BOARD, EMPTY_BOARD) == 3
+    assert evaluate_board_using_bitboards(RIGHT_TOWER_THREE_IN_A_ROW, LEFT_TOWER_ONE_BOARD) == 14
+    assert evaluate_board_using_bitboards(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO) == \
+           evaluate_board_using_windows(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO)
+
+
+def test_evaluate_board_using_bitboards_random_games():
+    random_generator = np.random.default_rng(5)
+    for _ in range(300):
+        board_player_one, board_player_two = EMPTY_BOARD, EMPTY_BOARD
+        player = PLAYER1
+        possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+        while possible_moves:
+            move = int(random_generator.choice(possible_moves))
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player, move)
+            assert evaluate_board_using_bitboards(board_player_one, board_player_two) == \
+                   evaluate_board_using_windows(board_player_one, board_player_two)
+            player = BoardPiece(3 - player)
+            possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+
+
+def test_evaluate_boards_batch():
+    boards_one = np.array([EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, LEFT_TOWER_ONE_BOARD, RIGHT_TOWER_THREE_IN_A_ROW,
+                           DRAW_PLAYER_ONE], dtype=np.uint64)
+    boards_two = np.array([EMPTY_BOARD, RIGHT_TOWER_ONE_BOARD, EMPTY_BOARD, LEFT_TOWER_ONE_BOARD, DRAW_PLAYER_TWO],
+                          dtype=np.uint64)
+    res = evaluate_boards_batch(boards_one, boards_two)
+    assert res.tolist() == [0, EVAL_DRAWN_POSITION, 3, 14,
+                            evaluate_board_using_windows(DRAW_PLAYER_ONE, DRAW_PLAYER_TWO)]
+
+
+def test_evaluate_boards_batch_random_games():
+    random_generator = np.random.default_rng(6)
+    boards_one, boards_two = [], []
+    for _ in range(100):
+        board_player_one, board_player_two = EMPTY_BOARD, EMPTY_BOARD
+        player = PLAYER1
+        possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+        while possible_moves:
+            move = int(random_generator.choice(possible_moves))
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player, move)
+            boards_one.append(board_player_one)
+            boards_two.append(board_player_two)
+            player = BoardPiece(3 - player)
+            possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+    res = evaluate_boards_batch(np.array(boards_one, dtype=np.uint64), np.array(boards_two, dtype=np.uint64))
+    assert res.tolist() == [evaluate_board_using_windows(board_player_one, board_player_two)
+                            for board_player_one, board_player_two in zip(boards_one, boards_two)]
+
+
+def test_evaluate_boards_batch_different_shapes():
+    with pytest.raises(ValueError, match=r"\(2,\) and \(3,\)"):
+        evaluate_boards_batch(np.zeros(2, dtype=np.uint64), np.zeros(3, dtype=np.uint64))
+
+
+def test_generate_move_minimax_id_evaluate_using_bitboards():
+    ret = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 5)
+    res = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 5,
+                                   evaluate_board=evaluate_board_using_bitboards)
+    assert res == ret
+
+
+def test_minimax_rec_incremental_evaluation():
+    alpha: [int, [PlayerAction]] = [-MAX_VALUE, [PlayerAction(-1)]]
+    beta: [int, [PlayerAction]] = [MAX_VALUE, [PlayerAction(-1)]]
+    res_incremental = minimax_rec(4, EXAMPLE_BOARD, MIRRORED_EXAMPLE_BOARD & ~EXAMPLE_BOARD, PLAYER1, alpha, beta,
+                                  TranspositionTable(1), [], [], True, None,
+                                  evaluate_board_using_windows(EXAMPLE_BOARD, MIRRORED_EXAMPLE_BOARD & ~EXAMPLE_BOARD))
+    res = minimax_rec(4, EXAMPLE_BOARD, MIRRORED_EXAMPLE_BOARD & ~EXAMPLE_BOARD, PLAYER1, alpha, beta,
+                      TranspositionTable(1), [], [], True)
+    assert res_incremental == res
+
+
 def test_evaluate_window_one():
     res = evaluate_window(TEST_WINDOW_RIGHT_TOWER, RIGHT_TOWER_ONE_BOARD, LEFT_TOWER_ONE_BOARD)
     assert res == 1
@@ -267,3 +609,57 @@ def test_calculate_evaluation_score_four():
 def test_calculate_evaluation_score_five():
     res = calculate_evaluation_score(0, 3)
     assert res == -THREE_PIECES_IN_A_WINDOW_EVAL
+
+
+def test_generate_move_minimax_id_keeps_next_moves():
+    next_moves = [3, 3, 3]
+    generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, next_moves, 3)
+    assert next_moves == [3, 3, 3]
+
+
+def test_get_single_move():
+    board_player_one = 0b0000000_0000000_0000000_0000000_0000001_0000001_0000001
+    assert get_single_move(board_player_one, MIDDLE_TOWER_THREE_IN_A_ROW, PLAYER1) == 3
+    assert get_single_move(EMPTY_BOARD, EMPTY_BOARD, PLAYER1) is None
+
+
+def test_get_fallback_move():
+    assert get_fallback_move(EMPTY_BOARD, EMPTY_BOARD, PLAYER1) == 3
+    board_player_one, board_player_two, player = boards_from_line([3, 3, 3, 3, 3, 3])
+    assert get_fallback_move(board_player_one, board_player_two, player) == 2
+    # Player two cannot stop both threats of player one, any legal move is played.
+    board_player_one, board_player_two, player = boards_from_line([3, 3, 2, 2, 4])
+    assert get_fallback_move(board_player_one, board_player_two, player) in range(7)
+    board_player_one, board_player_two, player = boards_from_line([3, 2, 3, 2, 3, 2, 3])
+    assert get_fallback_move(board_player_one, board_player_two, player) == -1
+
+
+@pytest.mark.parametrize("line", [[], [3, 3, 2], [5, 2, 1, 1, 6, 4, 4, 2, 1, 5]])
+def test_generate_move_minimax_tiny_budget_returns_legal_move(line):
+    board_player_one, board_player_two, player = boards_from_line(line)
+    moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+    for _ in range(5):
+        move, _ = generate_move_minimax(board_player_one, board_player_two, player, None, milliseconds=1)
+        assert move in moves
+
+
+def test_generate_move_minimax_single_move():
+    board_player_one = 0b0000000_0000000_0000000_0000000_0000001_0000001_0000001
+    start_time = time.monotonic()
+    move, _ = generate_move_minimax(board_player_one, MIDDLE_TOWER_THREE_IN_A_ROW, PLAYER1, None, 5)
+    assert move == 3
+    assert time.monotonic() - start_time < 1
+
+
+def test_generate_move_loop_to_stop_forced_win():
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    saved_state = MinimaxSavedState()
+    start_time = time.monotonic()
+    depth = generate_move_loop_to_stop(res, LEFT_TOWER_THREE_IN_A_ROW, RIGHT_TOWER_TWO_IN_A_ROW, PLAYER1, 1,
+                                       loop_over_flag, saved_state, deadline=start_time + 60)
+    assert time.monotonic() - start_time < 5
+    assert res.value == 0
+    assert depth == 1
+    assert saved_state.evaluation >= START_VALUE
+    assert loop_over_flag.is_set()
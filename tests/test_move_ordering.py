@@ -0,0 +1,46 @@
+from agents.agent_minimax.move_ordering import MoveOrdering
+from agents.game_utils import *
+
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+COLUMN_TWO_ONE_PIECE: int = 0b0000000_0000000_0000000_0000000_0000001_0000000_0000000
+
+
+def test_get_move_order_without_information():
+    assert MoveOrdering().get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 0) == MOVE_ORDER
+
+
+def test_get_move_order_first_moves():
+    move_ordering = MoveOrdering()
+    assert move_ordering.get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 0, (6, None, -1, 6, 0)) == \
+           [6, 0, 3, 2, 4, 1, 5]
+
+
+def test_update_killer_moves():
+    move_ordering = MoveOrdering()
+    for move in [1, 5, 1, 0]:
+        move_ordering.update(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 2, move, 1)
+    assert move_ordering.killer_moves[2] == [0, 1]
+    assert move_ordering.get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 2, (4,))[:3] == [4, 0, 1]
+    assert move_ordering.get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 3)[:3] == [1, 5, 0]  # By history.
+
+
+def test_update_history():
+    move_ordering = MoveOrdering()
+    move_ordering.update(COLUMN_TWO_ONE_PIECE, EMPTY_BOARD, PLAYER2, 1, 2, 3)
+    assert move_ordering.history[PLAYER2][2 * (HEIGHT_BOARD + 1) + 1] == 9
+    assert move_ordering.get_move_order(COLUMN_TWO_ONE_PIECE, EMPTY_BOARD, PLAYER2, 0) == [2, 3, 4, 1, 5, 0, 6]
+    assert move_ordering.get_move_order(COLUMN_TWO_ONE_PIECE, EMPTY_BOARD, PLAYER1, 0) == MOVE_ORDER
+    assert move_ordering.get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER2, 0) == MOVE_ORDER
+
+
+def test_new_search():
+    move_ordering = MoveOrdering()
+    move_ordering.update(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 0, 6, 4)
+    move_ordering.new_search()
+    assert move_ordering.killer_moves[0] == []
+    assert move_ordering.history[PLAYER1][6 * (HEIGHT_BOARD + 1)] == 8
+
+
+def test_get_possible_moves_with_move_order():
+    move_order = MoveOrdering().get_move_order(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 0, (6, 0))
+    assert get_possible_moves(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 3, move_order)[0] == [3, 6, 0, 2, 4, 1, 5]
@@ -0,0 +1,223 @@
+import multiprocessing
+import multiprocessing.sharedctypes
+import numpy as np
+import pytest
+
+from agents.agent_minimax.minimax import SearchInterrupted, START_VALUE, generate_move_minimax_id, \
+    generate_move_loop_to_stop, evaluate_board_using_bitboards, get_entry_from_transposition_table, \
+    save_entry_in_transposition_table
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import NegamaxSearch, ASPIRATION_WINDOW, generate_move_negamax_id, \
+    generate_move_pvs_id
+from agents.agent_minimax.transposition_table import TranspositionTable, BOUND_EXACT, NO_MOVE
+from agents.game_utils import *
+from tests.conftest import EMPTY_BOARD, MIDDLE_TOWER_ONE_BOARD, \
+    TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, StopAfterNodes
+
+TEST_POSITIONS: [(int, int, BoardPiece)] = [(EMPTY_BOARD, EMPTY_BOARD, PLAYER1),
+                                            (MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2),
+                                            boards_from_line([3, 2, 4, 4]), boards_from_line([0, 6, 1, 5, 3, 3, 4, 2]),
+                                            (TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1)]
+
+
+def iterative_deepening(search_function, board_player_one: int, board_player_two: int, player: BoardPiece,
+                        max_depth: int, **kwargs) -> [[int, [PlayerAction]]]:
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    results = []
+    evaluation = [0, []]
+    for depth in range(1, max_depth + 1):
+        evaluation = search_function(board_player_one, board_player_two, player, saved_state, evaluation[1].copy(),
+                                     depth, **kwargs)
+        results.append(evaluation)
+    return results, list(saved_state.transposition_table.data)
+
+
+def test_generate_move_negamax_id():
+    res = generate_move_negamax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 2)
+    assert res == [-3, [3, 3]]
+
+
+def test_generate_move_negamax_id_two():
+    res = generate_move_negamax_id(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, None, [], 2)
+    assert res == [9, [3, 3]]
+
+
+def test_generate_move_negamax_id_depth_zero():
+    res = generate_move_negamax_id(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, None, [], 0)
+    assert res == generate_move_minimax_id(MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, None, [], 0)
+
+
+def test_generate_move_negamax_id_game_over():
+    board_player_one = 0b0000000_0000000_0000000_0001111_0000000_0000000_0000000
+    assert generate_move_negamax_id(board_player_one, EMPTY_BOARD, PLAYER2, None, [], 3) == [START_VALUE * 2 ** 3, []]
+
+
+def test_generate_move_negamax_id_same_as_minimax_on_test_positions():
+    for board_player_one, board_player_two, player in TEST_POSITIONS:
+        assert iterative_deepening(generate_move_negamax_id, board_player_one, board_player_two, player, 7) == \
+               iterative_deepening(generate_move_minimax_id, board_player_one, board_player_two, player, 7)
+
+
+def test_generate_move_negamax_id_same_as_minimax_random_positions():
+    random_generator = np.random.default_rng(11)
+    for _ in range(40):
+        board_player_one, board_player_two, player = EMPTY_BOARD, EMPTY_BOARD, PLAYER1
+        for _ in range(random_generator.integers(0, 30)):
+            possible_moves, game_state = get_possible_moves(board_player_one, board_player_two, player)
+            if not possible_moves:
+                break
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player,
+                                                                     int(random_generator.choice(possible_moves)))
+            player = BoardPiece(3 - player)
+        max_depth = int(random_generator.integers(1, 6))
+        assert iterative_deepening(generate_move_negamax_id, board_player_one, board_player_two, player, max_depth) \
+               == iterative_deepening(generate_move_minimax_id, board_player_one, board_player_two, player, max_depth)
+
+
+def test_generate_move_negamax_id_evaluate_board():
+    kwargs = dict(evaluate_board=evaluate_board_using_bitboards)
+    assert iterative_deepening(generate_move_negamax_id, MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, 5, **kwargs) == \
+           iterative_deepening(generate_move_minimax_id, MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2, 5, **kwargs)
+
+
+def test_negamax_search_counts_nodes():
+    search = NegamaxSearch(TranspositionTable(1))
+    search.search(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 3, [])
+    assert search.nodes > 7
+
+
+def test_negamax_search_stop_flag():
+    stop_flag = multiprocessing.RawValue('b', True)
+    with pytest.raises(SearchInterrupted) as interrupted:
+        generate_move_negamax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 2, stop_flag)
+    assert not interrupted.value.args
+
+
+def test_negamax_search_stopped_after_first_root_move():
+    search = NegamaxSearch(TranspositionTable(1), StopAfterNodes(300))
+    with pytest.raises(SearchInterrupted) as interrupted:
+        search.search(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 5, [3])
+    assert interrupted.value.args[0][1][0] in range(7)
+    assert len(interrupted.value.args[0][1]) == 5
+
+
+def test_negamax_search_stopped_in_first_root_move():
+    search = NegamaxSearch(TranspositionTable(1), StopAfterNodes(10))
+    with pytest.raises(SearchInterrupted) as interrupted:
+        search.search(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 5, [3])
+    assert not interrupted.value.args
+
+
+def test_generate_move_loop_to_stop_negamax():
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    generate_move_loop_to_stop(res, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, 5, loop_over_flag,
+                               search_function=generate_move_negamax_id)
+    assert res.value == 0
+
+
+def test_generate_move_pvs_id():
+    res = generate_move_pvs_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, [], 2)
+    assert res == [-3, [3, 3]]
+
+
+def test_generate_move_negamax_id_pvs_same_evaluation_as_minimax():
+    kwargs = dict(principal_variation_search=True, aspiration_window=ASPIRATION_WINDOW, dynamic_move_ordering=True)
+    for board_player_one, board_player_two, player in TEST_POSITIONS:
+        results = iterative_deepening(generate_move_negamax_id, board_player_one, board_player_two, player, 7,
+                                      **kwargs)[0]
+        expected = iterative_deepening(generate_move_minimax_id, board_player_one, board_player_two, player, 7)[0]
+        assert [evaluation for evaluation, _ in results] == [evaluation for evaluation, _ in expected]
+        for depth in range(1, 7):
+            assert generate_move_negamax_id(board_player_one, board_player_two, player, None, [], depth,
+                                            **kwargs)[0] == \
+                   generate_move_minimax_id(board_player_one, board_player_two, player, None, [], depth)[0]
+
+
+def test_generate_move_pvs_id_saves_root():
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    res = generate_move_pvs_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], 4)
+    assert get_entry_from_transposition_table(EMPTY_BOARD, EMPTY_BOARD, saved_state.transposition_table) == \
+           (res[0], 4, BOUND_EXACT, res[1][0])
+
+
+@pytest.mark.parametrize("previous_evaluation", [-1000, -20, 20, 1000])
+def test_generate_move_pvs_id_aspiration_window_fails(previous_evaluation: int):
+    board_player_one, board_player_two, player = boards_from_line([3, 2, 4, 4])
+    expected = generate_move_minimax_id(board_player_one, board_player_two, player, None, [], 5)
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    save_entry_in_transposition_table(board_player_one, board_player_two, saved_state.transposition_table,
+                                      previous_evaluation, 4, BOUND_EXACT, NO_MOVE)
+    search = NegamaxSearch(saved_state.transposition_table, aspiration_window=ASPIRATION_WINDOW)
+    assert search.search(board_player_one, board_player_two, player, 5, [])[0] == expected[0]
+
+
+def test_generate_move_loop_to_stop_pvs():
+    res: multiprocessing.sharedctypes.Synchronized = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    generate_move_loop_to_stop(res, TEST_BOARD_ALMOST_FULL_ONE, TEST_BOARD_ALMOST_FULL_TWO, PLAYER1, 5, loop_over_flag,
+                               search_function=generate_move_pvs_id)
+    assert res.value == 0
+
+
+def test_generate_move_negamax_id_keeps_next_moves():
+    next_moves = [3, 3, 3]
+    generate_move_negamax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, next_moves, 3)
+    assert next_moves == [3, 3, 3]
+
+
+def test_generate_move_negamax_id_dynamic_move_ordering():
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    board_player_one, board_player_two, player = boards_from_line([3, 2, 4, 4])
+    for depth in range(1, 7):
+        res = generate_move_negamax_id(board_player_one, board_player_two, player, saved_state, [], depth,
+                                       dynamic_move_ordering=True)
+        assert res[0] == generate_move_minimax_id(board_player_one, board_player_two, player, None, [], depth)[0]
+    assert any(saved_state.move_ordering.killer_moves)
+    assert any(map(any, saved_state.move_ordering.history))
+
+
+def test_generate_move_negamax_id_threat_pruning_finds_forced_wins():
+    for line in [[3, 3, 2, 2], [3, 2, 3, 2, 3], [3, 3, 4, 4, 2, 5]]:
+        board_player_one, board_player_two, player = boards_from_line(line)
+        for depth in range(3, 7):
+            res = generate_move_negamax_id(board_player_one, board_player_two, player, None, [], depth,
+                                           threat_pruning=True)
+            expected = generate_move_minimax_id(board_player_one, board_player_two, player, None, [], depth)
+            assert res[0] == expected[0]
+
+
+def test_negamax_search_threat_pruning_searches_fewer_nodes():
+    board_player_one, board_player_two, player = boards_from_line([0, 6, 1, 5, 3, 3, 4, 2])
+    search = NegamaxSearch(TranspositionTable(1))
+    pruned_search = NegamaxSearch(TranspositionTable(1), threat_pruning=True)
+    search.search(board_player_one, board_player_two, player, 6, [])
+    pruned_search.search(board_player_one, board_player_two, player, 6, [])
+    assert pruned_search.nodes < search.nodes
+
+
+@pytest.mark.parametrize("search_function", [generate_move_minimax_id, generate_move_negamax_id,
+                                             generate_move_pvs_id])
+def test_mate_evaluation_reused_two_moves_later(search_function):
+    line: [PlayerAction] = [5, 5, 4, 3, 4, 6, 5, 1, 2, 2, 4]
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    evaluation = [0, []]
+    for depth in range(1, 9):
+        evaluation = search_function(*boards_from_line(line), saved_state, evaluation[1].copy(), depth)
+    assert evaluation[0] == START_VALUE * 2 ** (8 - 6)  # Player one wins after five more moves.
+    board_player_one, board_player_two, player = boards_from_line(line + [int(move) for move in evaluation[1][:2]])
+    reused, fresh = [0, []], [0, []]
+    for depth in range(1, 6):
+        reused = search_function(board_player_one, board_player_two, player, saved_state, reused[1].copy(), depth)
+        fresh = search_function(board_player_one, board_player_two, player, None, fresh[1].copy(), depth)
+    assert reused[0] == fresh[0] == START_VALUE * 2 ** (5 - 4)
+
+
+def test_search_functions_count_nodes_in_saved_state():
+    nodes = []
+    for search_function in (generate_move_minimax_id, generate_move_negamax_id):
+        saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+        search_function(*boards_from_line([3, 2, 4, 4]), saved_state, [], 3)
+        search_function(*boards_from_line([3, 2, 4, 4]), saved_state, [], 4)
+        nodes.append(saved_state.nodes)
+    assert nodes[0] == nodes[1] > 0
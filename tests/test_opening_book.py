@@ -0,0 +1,83 @@
+import pytest
+
+from agents.agent_minimax.minimax import generate_move_minimax, mirror_boards
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import generate_move_pvs_id
+from agents.agent_minimax.opening_book import OpeningBook, HEADER, RECORD, generate_opening_book, \
+    get_book_positions
+from agents.agent_minimax.search_worker import generate_move_minimax_worker
+from agents.game_utils import *
+
+
+@pytest.fixture(scope="module")
+def book_path(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("book") / "book.bin")
+    generate_opening_book(path, plies=2, depth=3, transposition_table_size_mb=1)
+    return path
+
+
+def test_get_book_positions():
+    # The empty board, 4 different first moves and 25 different positions after two moves.
+    assert len(get_book_positions(0)) == 1
+    assert len(get_book_positions(1)) == 5
+    assert len(get_book_positions(2)) == 30
+
+
+def test_generate_opening_book(book_path: str):
+    with open(book_path, "rb") as file:
+        content = file.read()
+    assert len(content) == HEADER.size + 30 * RECORD.size
+    keys = [RECORD.unpack_from(content, HEADER.size + index * RECORD.size)[0] for index in range(30)]
+    assert keys == sorted(keys)
+
+
+def test_opening_book_get_entry(book_path: str):
+    book = OpeningBook(book_path)
+    assert len(book) == 30
+    assert (book.plies, book.depth) == (2, 3)
+    for line in [[], [3], [0, 6], [2, 3], [4, 3]]:
+        board_player_one, board_player_two, player = boards_from_line(line)
+        evaluation, move = book.get_entry(board_player_one, board_player_two)
+        expected = [0, []]
+        for depth in range(1, 4):
+            expected = generate_move_pvs_id(board_player_one, board_player_two, player,
+                                            MinimaxSavedState(transposition_table_size_mb=1), expected[1], depth)
+        assert evaluation == expected[0]
+    book.close()
+
+
+def test_opening_book_mirrored_positions(book_path: str):
+    book = OpeningBook(book_path)
+    for line in [[0], [1, 5], [2, 3]]:
+        board_player_one, board_player_two, _ = boards_from_line(line)
+        mirrored_board_player_one, mirrored_board_player_two = mirror_boards(board_player_one, board_player_two)
+        evaluation, move = book.get_entry(board_player_one, board_player_two)
+        assert book.get_entry(mirrored_board_player_one, mirrored_board_player_two) == (evaluation, 6 - move)
+    book.close()
+
+
+def test_opening_book_unknown_position(book_path: str):
+    book = OpeningBook(book_path)
+    assert book.get_move(*boards_from_line([3, 3, 3])[:2]) is None
+    book.close()
+
+
+def test_opening_book_invalid_file(tmp_path):
+    path = tmp_path / "invalid.bin"
+    path.write_bytes(b"not an opening book")
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+
+
+def test_generate_move_minimax_uses_opening_book(book_path: str):
+    book = OpeningBook(book_path)
+    board_player_one, board_player_two, player = boards_from_line([1])
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    assert generate_move_minimax(board_player_one, board_player_two, player, saved_state, seconds=100,
+                                 opening_book=book) == (book.get_move(board_player_one, board_player_two), saved_state)
+    assert len(saved_state.transposition_table) == 0
+    move, worker = generate_move_minimax_worker(board_player_one, board_player_two, player, None, seconds=100,
+                                                opening_book=book)
+    worker.close()
+    assert move == book.get_move(board_player_one, board_player_two)
+    book.close()
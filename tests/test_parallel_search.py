@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import time
+import pytest
+
+from agents.agent_minimax.parallel_search import *
+from agents.agent_minimax.minimax import generate_move_minimax, generate_move_minimax_id
+from agents.game_utils import *
+from agents.agent_minimax.transposition_table import BOUND_EXACT, BOUND_UPPER, get_entry_from_transposition_table
+
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+MIDDLE_TOWER_ONE_BOARD: int = 0b0000000_0000000_0000000_0000001_0000000_0000000_0000000
+LEFT_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000111
+SECOND_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000000_0000000_0000111_0000000
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2, initializer=initialize_search_process, initargs=(None, 1)) as executor:
+        yield executor
+
+
+def test_generate_move_minimax_parallel_same_evaluation(executor):
+    for depth in range(1, 6):
+        for board_player_one, board_player_two, player in [(EMPTY_BOARD, EMPTY_BOARD, PLAYER1),
+                                                           (MIDDLE_TOWER_ONE_BOARD, EMPTY_BOARD, PLAYER2)]:
+            res = generate_move_minimax_parallel(board_player_one, board_player_two, player, MinimaxSavedState(1), [],
+                                                 executor, depth)
+            ret = generate_move_minimax_id(board_player_one, board_player_two, player, MinimaxSavedState(1), [],
+                                           depth)
+            assert res[0] == ret[0]
+            assert len(res[1]) == depth
+
+
+def test_generate_move_minimax_parallel_saves_root_moves(executor):
+    saved_state = MinimaxSavedState(1)
+    generate_move_minimax_parallel(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], executor, 3)
+    entries = [get_entry_from_transposition_table(*apply_player_action(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, move),
+                                                  saved_state.transposition_table) for move in range(7)]
+    assert [entry[1] for entry in entries] == [2] * 7
+    # The first move is searched with the full window, the other moves against its evaluation.
+    assert entries[3][2] == BOUND_EXACT
+    for entry in entries:
+        assert entry[2] == BOUND_UPPER and entry[0] <= entries[3][0] or entry[2] == BOUND_EXACT
+
+
+def test_generate_move_minimax_parallel_window_saves_nodes():
+    initialize_search_process(None, 1)
+    results = [search_root_move(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, move, 6) for move in range(7)]
+    with ProcessPoolExecutor(max_workers=1, initializer=initialize_search_process, initargs=(None, 1)) as executor:
+        saved_state = MinimaxSavedState(1)
+        res = generate_move_minimax_parallel(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], executor, 6)
+    assert res[0] == max(result[0] for result, _ in results)
+    # The moves searched against the window of the first move need fewer nodes than with the full window.
+    assert saved_state.nodes < sum(nodes for _, nodes in results)
+
+
+def test_generate_move_minimax_parallel_interrupted(executor):
+    with pytest.raises(SearchInterrupted):
+        generate_move_minimax_parallel(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, MinimaxSavedState(1), [], executor, 20,
+                                       time.monotonic() - 1)
+
+
+def test_search_root_move():
+    res, nodes = search_root_move(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW, PLAYER1, 0, 2)
+    assert res[0] > 0
+    assert res[1] == [0]
+    assert nodes == 1
+
+
+def test_generate_move_loop_parallel():
+    move_output = multiprocessing.Value('i', -1)
+    loop_over_flag = multiprocessing.Event()
+    depth = generate_move_loop_parallel(move_output, LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW,
+                                        PLAYER1, 1, loop_over_flag, MinimaxSavedState(1), processes=2)
+    assert move_output.value == 0
+    assert loop_over_flag.is_set()
+    assert depth == 1  # The win is forced, deeper searches cannot find a faster one.
+
+
+def test_generate_move_loop_parallel_shared_transposition_table():
+    move_output = multiprocessing.Value('i', -1)
+    saved_state = MinimaxSavedState(1, True)
+    depth = generate_move_loop_parallel(move_output, EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 1, multiprocessing.Event(),
+                                        saved_state, deadline=time.monotonic() + 1, processes=2)
+    assert depth > 1
+    # The entries of the processes of the pool are visible, not only the ones of the root moves.
+    assert len(saved_state.transposition_table) > 4
+
+
+def test_generate_move_loop_parallel_high_evaluation_keeps_searching():
+    # Twenty pieces, player one to move, no forced win in sight, but the windows evaluate to more than 100.
+    board_player_one, board_player_two, player = boards_from_line([3, 4, 4, 2, 4, 3, 3, 0, 2, 6, 3, 0, 0, 6, 2, 6,
+                                                                   6, 6, 0, 6])
+    loop_over_flag = multiprocessing.Event()
+    depth = generate_move_loop_parallel(multiprocessing.Value('i', -1), board_player_one, board_player_two, player, 1,
+                                        loop_over_flag, MinimaxSavedState(1), deadline=time.monotonic() + 1,
+                                        processes=2)
+    assert depth > 1
+
+
+def test_generate_move_minimax_processes():
+    move, saved_state = generate_move_minimax(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, None, 500, processes=2)
+    assert move in range(7)
@@ -0,0 +1,142 @@
+import multiprocessing
+import pickle
+import pytest
+
+from agents.agent_minimax.minimax import START_VALUE, generate_move_minimax, generate_move_minimax_id, \
+    handle_proven_eval
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import generate_move_negamax_id, generate_move_pvs_id
+from agents.agent_minimax.position_cache import PositionCache, RECORDS_PER_BUCKET, get_distance_of_score, \
+    get_score_of_distance
+from agents.agent_minimax.search_worker import generate_move_minimax_worker
+from agents.agent_minimax.solver import solve
+from agents.game_utils import *
+
+
+def store_in_other_process(path: str, board_player_one: int, board_player_two: int):
+    PositionCache(path).store_entry(board_player_one, board_player_two, -3, 6)
+
+
+def test_position_cache_store_and_get_entry(tmp_path):
+    cache = PositionCache(str(tmp_path / "cache.bin"), size_mb=1)
+    board_player_one, board_player_two, _ = boards_from_line([3, 2, 4])
+    assert cache.get_entry(board_player_one, board_player_two) is None
+    cache.store_entry(board_player_one, board_player_two, -5, 1)
+    assert cache.get_entry(board_player_one, board_player_two) == (-5, 1)
+    cache.store_entry(board_player_one, board_player_two, 7, 4)
+    assert cache.get_entry(board_player_one, board_player_two) == (7, 4)
+    assert len(cache) == 1
+    assert cache.get_entry(*boards_from_line([3, 4, 2])[:2]) is None
+    cache.close()
+
+
+def test_position_cache_persistent(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    board_player_one, board_player_two, _ = boards_from_line([0, 6])
+    cache = PositionCache(path, size_mb=1)
+    cache.store_entry(board_player_one, board_player_two, 0, 3)
+    cache.close()
+    cache = PositionCache(path)
+    assert cache.get_entry(board_player_one, board_player_two) == (0, 3)
+    cache.close()
+
+
+def test_position_cache_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    board_player_one, board_player_two, _ = boards_from_line([1, 1, 1])
+    cache = PositionCache(path, size_mb=1)
+    process = multiprocessing.Process(target=store_in_other_process, args=(path, board_player_one, board_player_two))
+    process.start()
+    process.join()
+    assert cache.get_entry(board_player_one, board_player_two) == (-3, 6)
+    cache.close()
+
+
+def test_position_cache_pickle(tmp_path):
+    cache = PositionCache(str(tmp_path / "cache.bin"), size_mb=1)
+    cache.store_entry(EMPTY_BOARD, EMPTY_BOARD, 1, 3)
+    unpickled_cache = pickle.loads(pickle.dumps(cache))
+    assert unpickled_cache.get_entry(EMPTY_BOARD, EMPTY_BOARD) == (1, 3)
+    cache.close()
+    unpickled_cache.close()
+
+
+def test_position_cache_full_bucket(tmp_path):
+    cache = PositionCache(str(tmp_path / "cache.bin"), size_mb=1)
+    keys = [index * cache.number_of_buckets for index in range(1, RECORDS_PER_BUCKET + 2)]
+    for key in keys:
+        cache.store_entry(key, EMPTY_BOARD, 2, 2)  # All keys fall into the first bucket.
+    assert len(cache) == RECORDS_PER_BUCKET
+    assert cache.get_entry(keys[-1], EMPTY_BOARD) == (2, 2)
+    cache.close()
+
+
+def test_position_cache_invalid_file(tmp_path):
+    path = tmp_path / "invalid.bin"
+    path.write_bytes(b"not a position cache")
+    with pytest.raises(ValueError):
+        PositionCache(str(path))
+
+
+def test_generate_move_minimax_id_uses_position_cache(tmp_path):
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1, position_cache_path=str(tmp_path / "cache.bin"))
+    assert generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], 2)[1][0] == 3
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1, position_cache_path=str(tmp_path / "cache.bin"))
+    # Pretend that player two wins after the first move into the middle column.
+    saved_state.position_cache.store_entry(*boards_from_line([3])[:2], 10, 3)
+    evaluation = generate_move_minimax_id(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, saved_state, [], 2)
+    assert evaluation[1][0] != 3
+
+
+def test_generate_move_minimax_saves_solved_positions(tmp_path):
+    board_player_one, board_player_two, player = boards_from_line([5, 2, 1, 1, 6, 4, 4, 2, 1, 5, 1, 4, 1, 1, 5, 2,
+                                                                   2, 5, 0, 3, 3, 3])
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1, position_cache_path=str(tmp_path / "cache.bin"))
+    move, saved_state = generate_move_minimax(board_player_one, board_player_two, player, saved_state, seconds=5)
+    assert saved_state.position_cache.get_entry(board_player_one, board_player_two) == \
+           solve(board_player_one, board_player_two, player)
+    saved_state.position_cache.store_entry(board_player_one, board_player_two, 0, 6)
+    assert generate_move_minimax(board_player_one, board_player_two, player, saved_state, seconds=5)[0] == 6
+
+
+@pytest.mark.parametrize("line, distance", [([3, 3, 2, 2, 4, 4], 1), ([3, 3, 2, 2, 4], 2), ([3, 3, 2, 2, 4, 4, 0], 2)])
+def test_distance_of_score(line, distance):
+    score = solve(*boards_from_line(line))[0]
+    assert get_distance_of_score(score, len(line)) == distance
+    assert get_score_of_distance(distance, len(line)) == score
+
+
+def test_handle_proven_eval():
+    # Player one wins with the next move, player two loses after two moves.
+    assert handle_proven_eval(PLAYER1, 18, 3, 6) == START_VALUE * 2 ** 2
+    assert handle_proven_eval(PLAYER2, -18, 3, 5) == START_VALUE * 2 ** 1
+    assert handle_proven_eval(PLAYER2, -18, 1, 5) == START_VALUE
+    assert handle_proven_eval(PLAYER1, 0, 3, 6) == 0
+
+
+@pytest.mark.parametrize("search_function", [generate_move_minimax_id, generate_move_negamax_id,
+                                             generate_move_pvs_id])
+def test_search_saves_proven_results(tmp_path, search_function):
+    line = [3, 3, 2, 2, 4]
+    board_player_one, board_player_two, player = boards_from_line(line)
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1, position_cache_path=str(tmp_path / "cache.bin"))
+    evaluation = search_function(board_player_one, board_player_two, player, saved_state, [], 4)
+    assert evaluation[0] == START_VALUE * 2 ** 2
+    # Every reply of player two loses, the first one is searched with the full window, so its result is exact.
+    child_boards = boards_from_line(line + [3])[:2]
+    assert saved_state.position_cache.get_entry(*child_boards)[0] == solve(*child_boards, PLAYER1)[0]
+    # The results of the cache give the same evaluation.
+    saved_state.transposition_table = MinimaxSavedState(transposition_table_size_mb=1).transposition_table
+    assert search_function(board_player_one, board_player_two, player, saved_state, [], 4)[0] == evaluation[0]
+
+
+def test_generate_move_minimax_worker_uses_position_cache(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    board_player_one, board_player_two, player = boards_from_line([5, 0, 6, 2, 2, 4, 5, 5, 2, 6, 3, 2, 6, 5, 5, 2,
+                                                                   2, 5, 1, 4])
+    move, saved_state = generate_move_minimax_worker(board_player_one, board_player_two, player, None, seconds=5,
+                                                     position_cache_path=path)
+    assert saved_state.position_cache.get_entry(board_player_one, board_player_two) == \
+           solve(board_player_one, board_player_two, player)
+    saved_state.position_cache.store_entry(board_player_one, board_player_two, 0, 6)
+    assert generate_move_minimax_worker(board_player_one, board_player_two, player, saved_state, seconds=5)[0] == 6
@@ -0,0 +1,66 @@
+import copy
+import json
+
+from agents.agent_minimax.minimax import generate_move_minimax_id
+from agents.game_utils import *
+from benchmarks.search import CORPUS, SEARCH_FUNCTIONS, benchmark_position, run_benchmark, compare_results, main
+
+
+def test_corpus_positions_are_still_playing():
+    for line in CORPUS.values():
+        board_player_one, board_player_two, player = boards_from_line(line)
+        assert check_end_state(board_player_one, board_player_two, PLAYER2 if player == PLAYER1 else PLAYER1) == \
+               GameState.STILL_PLAYING
+
+
+def test_benchmark_position():
+    board_player_one, board_player_two, player = boards_from_line(CORPUS["opening-2"])
+    result = benchmark_position(board_player_one, board_player_two, player, depth=4)
+    assert [depth_result["depth"] for depth_result in result["depths"]] == [1, 2, 3, 4]
+    assert result["nodes"] == sum(depth_result["nodes"] for depth_result in result["depths"]) > 0
+    assert 0 < result["hit_rate"] < 1
+    assert result["probes"] >= result["hits"]
+    assert 1 <= result["stable_from_depth"] <= 4
+    # The search is not changed by the benchmark.
+    assert result["move"] == generate_move_minimax_id(board_player_one, board_player_two, player, None, [], 4)[1][0]
+
+
+def test_benchmark_position_counts_transposition_table_of_every_search():
+    board_player_one, board_player_two, player = boards_from_line(CORPUS["opening-4"])
+    for search_function in SEARCH_FUNCTIONS.values():
+        result = benchmark_position(board_player_one, board_player_two, player, search_function=search_function,
+                                    depth=5)
+        assert result["stores"] > 0
+        assert result["probes"] >= result["hits"] > 0
+        assert result["nodes"] > 0
+
+
+def test_benchmark_position_stops_at_end_of_game():
+    result = benchmark_position(*boards_from_line(CORPUS["endgame-28b"]), depth=20)
+    assert result["depth"] < 20
+
+
+def test_compare_results():
+    results = run_benchmark(depth=2, positions=["opening-0", "endgame-22"])
+    assert compare_results(results, results) == []
+    slower = copy.deepcopy(results)
+    slower["positions"]["opening-0"]["nodes_per_second"] /= 2
+    slower["total"]["nodes_per_second"] /= 2
+    assert len(compare_results(results, slower)) == 2
+    other_move = copy.deepcopy(results)
+    other_move["positions"]["endgame-22"]["depths"][1]["move"] += 1
+    assert compare_results(results, other_move) == \
+           ["endgame-22: move {} with evaluation {} at depth 2 instead of move {} with evaluation {}".format(
+               results["positions"]["endgame-22"]["depths"][1]["move"] + 1,
+               results["positions"]["endgame-22"]["depths"][1]["evaluation"],
+               results["positions"]["endgame-22"]["depths"][1]["move"],
+               results["positions"]["endgame-22"]["depths"][1]["evaluation"])]
+
+
+def test_main_writes_results(tmp_path):
+    path = str(tmp_path / "results.json")
+    assert main(["--depth", "2", "--positions", "opening-0", "--output", path]) == 0
+    with open(path) as file:
+        results = json.load(file)
+    assert list(results["positions"]) == ["opening-0"]
+    assert main(["--depth", "2", "--positions", "opening-0", "--compare", path, "--tolerance", "1"]) == 0
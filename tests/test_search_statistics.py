@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+
+from agents.agent_minimax.minimax import generate_move_minimax, generate_move_minimax_id, generate_move_loop_to_stop
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.negamax import generate_move_negamax_id, generate_move_pvs_id
+from agents.agent_minimax.search_statistics import *
+from agents.game_utils import *
+
+MIDDLEGAME_LINE: [int] = [3, 3, 3, 3, 2, 4]
+
+
+def test_search_statistics_finish_depth():
+    statistics = SearchStatistics()
+    assert statistics.branching_factor is None
+    statistics.nodes = 10
+    statistics.finish_depth()
+    statistics.nodes = 50
+    statistics.finish_depth()
+    assert statistics.depth == 2
+    assert statistics.nodes_per_depth == [10, 40]
+    assert statistics.branching_factor == 4
+    assert len(statistics.seconds_per_depth) == 2
+    statistics.new_search()
+    assert statistics.depth == statistics.nodes == 0
+
+
+def test_search_statistics_to_dict():
+    statistics = SearchStatistics()
+    statistics.transposition_table_probes, statistics.transposition_table_hits = 4, 1
+    statistics.cutoffs[0] = 3
+    values = statistics.to_dict()
+    assert values["transposition_table_hit_rate"] == 0.25
+    assert values["cutoffs"] == [3, 0, 0, 0, 0, 0, 0]
+    assert values["branching_factor"] is None
+
+
+def test_minimax_and_negamax_count_the_same_search():
+    # Both searches visit the same tree, only the negamax search evaluates leaves without a call of its own.
+    board_player_one, board_player_two, player = boards_from_line(MIDDLEGAME_LINE)
+    results = []
+    for search_function in (generate_move_minimax_id, generate_move_negamax_id):
+        saved_state = MinimaxSavedState(collect_statistics=True)
+        evaluation = search_function(board_player_one, board_player_two, player, saved_state, [], 5)
+        results.append((evaluation, saved_state.statistics))
+    (minimax_evaluation, minimax_statistics), (negamax_evaluation, negamax_statistics) = results
+    assert minimax_evaluation == negamax_evaluation
+    assert minimax_statistics.nodes == negamax_statistics.nodes
+    assert minimax_statistics.leaves == negamax_statistics.leaves
+    assert minimax_statistics.cutoffs == negamax_statistics.cutoffs
+    assert minimax_statistics.transposition_table_hits == negamax_statistics.transposition_table_hits
+    assert minimax_statistics.max_ply == negamax_statistics.max_ply == 5
+
+
+def test_search_statistics_of_iterative_deepening():
+    board_player_one, board_player_two, player = boards_from_line(MIDDLEGAME_LINE)
+    saved_state = MinimaxSavedState(collect_statistics=True)
+    depth = generate_move_loop_to_stop(multiprocessing.Value('i', -1), board_player_one, board_player_two, player, 1,
+                                       multiprocessing.Event(), saved_state, deadline=time.monotonic() + 0.5,
+                                       search_function=generate_move_pvs_id)
+    statistics = saved_state.statistics
+    assert statistics.depth == depth
+    assert sum(statistics.nodes_per_depth) <= statistics.nodes
+    assert statistics.nodes == saved_state.nodes
+    assert statistics.leaves < statistics.nodes
+    assert statistics.max_ply >= depth
+    assert 0 < statistics.transposition_table_hits < statistics.transposition_table_probes
+    assert statistics.transposition_table_stores > 0
+    assert statistics.cutoffs[0] > sum(statistics.cutoffs[1:])  # The best move is usually searched first.
+    assert statistics.branching_factor > 1
+
+
+def test_generate_move_minimax_returns_statistics():
+    board_player_one, board_player_two, player = boards_from_line(MIDDLEGAME_LINE)
+    move, saved_state = generate_move_minimax(board_player_one, board_player_two, player,
+                                              MinimaxSavedState(collect_statistics=True), milliseconds=300)
+    assert saved_state.statistics.depth == saved_state.depth > 0
+    assert saved_state.statistics.nodes > 0
+    _, saved_state = generate_move_minimax(board_player_one, board_player_two, player, MinimaxSavedState(),
+                                           milliseconds=100)
+    assert saved_state.statistics is None
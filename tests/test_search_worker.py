@@ -0,0 +1,166 @@
+import pickle
+import time
+import pytest
+
+from agents.agent_minimax.search_worker import *
+from agents.game_utils import *
+
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+LEFT_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000111
+SECOND_TOWER_THREE_IN_A_ROW: int = 0b0000000_0000000_0000000_0000000_0000000_0000111_0000000
+
+
+def test_generate_move_minimax_worker():
+    move, saved_state = generate_move_minimax_worker(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW, PLAYER1,
+                                                     None, 1)
+    assert move == 0
+    assert isinstance(saved_state, SearchWorker)
+    saved_state.close()
+
+
+def test_generate_move_minimax_worker_tiny_budget_returns_legal_move():
+    board_player_one, board_player_two, player = boards_from_line([5, 2, 1, 1, 6, 4, 4, 2, 1, 5])
+    moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+    saved_state = None
+    for _ in range(5):
+        move, saved_state = generate_move_minimax_worker(board_player_one, board_player_two, player, saved_state,
+                                                         milliseconds=1)
+        assert move in moves
+    saved_state.close()
+
+
+def test_generate_move_minimax_worker_reuses_worker():
+    worker = SearchWorker(1)
+    process = worker.process
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.5)
+    assert saved_state is worker
+    assert move in range(7)
+    move, saved_state = generate_move_minimax_worker(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW,
+                                                     PLAYER2, worker, 1)
+    assert move == 1
+    assert saved_state.process is process
+    assert process.is_alive()
+    worker.close()
+    assert not process.is_alive()
+
+
+def test_generate_move_minimax_worker_processes():
+    move, worker = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 0.5, processes=2)
+    assert move in range(7)
+    assert worker.processes == 2
+    assert worker.line[0] == move
+    process = worker.process
+    move, saved_state = generate_move_minimax_worker(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW,
+                                                     PLAYER1, worker, 1)
+    assert move == 0
+    assert saved_state.process is process
+    worker.close()
+    assert not process.is_alive()
+
+
+def test_search_worker_processes_ponder_hit():
+    worker = SearchWorker(1, processes=2)
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.3, ponder=True)
+    board_player_one, board_player_two, player = saved_state.ponder_position
+    time.sleep(0.3)
+    start_time = time.monotonic()
+    move, saved_state = generate_move_minimax_worker(board_player_one, board_player_two, PLAYER1, worker, 0.3)
+    assert time.monotonic() - start_time < 1
+    assert move in range(7)
+    assert saved_state.ponder_hits == 1
+    worker.close()
+
+
+def test_generate_move_minimax_worker_on_info():
+    worker = SearchWorker(1)
+    for _ in range(2):  # The info of the first search, stopped at depth 3, does not reach the second one.
+        infos = []
+        start_time = time.monotonic()
+        move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 5,
+                                                         on_info=lambda info: infos.append(info) or
+                                                         info["depth"] == 3)
+        assert time.monotonic() - start_time < 2
+        assert [info["depth"] for info in infos] == [1, 2, 3]
+        assert set(infos[0]) == {"depth", "score", "pv", "nodes", "nps", "seconds"}
+        assert move in range(7)
+    worker.close()
+
+
+def test_search_worker_restarts_closed_worker():
+    worker = SearchWorker(1)
+    worker.close()
+    assert worker.search(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW, PLAYER1, 1) == 0
+    assert worker.process.is_alive()
+    worker.close()
+
+
+def test_search_worker_not_picklable():
+    worker = SearchWorker(1)
+    with pytest.raises(TypeError):
+        pickle.dumps(worker)
+    worker.close()
+
+
+def test_generate_move_minimax_worker_game_clock():
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, None, 5, None, None, 1200)
+    assert move in range(7)
+    assert 1200 - 200 < saved_state.clock.remaining_milliseconds < 1200
+    saved_state.close()
+
+
+def test_search_worker_returns_statistics():
+    worker = SearchWorker(1, collect_statistics=True)
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.3)
+    assert saved_state.statistics.depth > 0
+    assert saved_state.statistics.nodes > 0
+    move, saved_state = generate_move_minimax_worker(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW,
+                                                     PLAYER1, worker, 1)
+    assert saved_state.statistics.nodes == 0  # The winning move is played without searching.
+    worker.close()
+
+
+def test_search_worker_ponder_hit():
+    worker = SearchWorker(1, collect_statistics=True)
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.3, ponder=True)
+    assert saved_state.line[0] == move
+    board_player_one, board_player_two, player = saved_state.ponder_position
+    assert player == PLAYER1
+    time.sleep(0.5)
+    move, saved_state = generate_move_minimax_worker(board_player_one, board_player_two, PLAYER1, worker, 0.3)
+    assert move in range(7)
+    assert saved_state.ponder_hits == 1
+    assert saved_state.ponder_position is None
+    assert saved_state.statistics.depth > 0
+    worker.close()
+
+
+def test_search_worker_ponder_miss():
+    worker = SearchWorker(1)
+    move, saved_state = generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.3, ponder=True)
+    assert saved_state.ponder_position is not None
+    reply = (saved_state.line[1] + 1) % 7
+    board_player_one, board_player_two = apply_player_action(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, move)
+    board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, PLAYER2, reply)
+    move, saved_state = generate_move_minimax_worker(board_player_one, board_player_two, PLAYER1, worker, 0.3)
+    assert move in range(7)
+    assert saved_state.ponder_hits == 0
+    assert saved_state.ponder_position is None
+    worker.close()
+
+
+def test_search_worker_close_while_pondering():
+    worker = SearchWorker(1)
+    generate_move_minimax_worker(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, worker, 0.3, ponder=True)
+    assert worker.ponder_position is not None
+    start_time = time.monotonic()
+    worker.close()
+    assert time.monotonic() - start_time < SECONDS_TO_RETURN_STATE
+    assert not worker.process.is_alive()
+
+
+def test_search_worker_no_ponder_without_search():
+    move, saved_state = generate_move_minimax_worker(LEFT_TOWER_THREE_IN_A_ROW, SECOND_TOWER_THREE_IN_A_ROW, PLAYER1,
+                                                     None, 1, ponder=True)
+    assert move == 0
+    assert saved_state.ponder_position is None
+    saved_state.close()
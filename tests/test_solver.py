@@ -0,0 +1,157 @@
+import functools
+import logging
+import multiprocessing
+import time
+import numpy as np
+import pytest
+
+from agents.agent_minimax.minimax import SearchInterrupted, generate_move_minimax
+from agents.agent_minimax.solver import Solver, solve, solve_endgame, estimate_solving_seconds, NUMBER_OF_POSITIONS, \
+    SOLVER_SECONDS_AT_20_PIECES, SOLVER_MINIMUM_SECONDS
+from agents.agent_minimax.transposition_table import TranspositionTable, NO_MOVE
+from agents.game_utils import *
+
+
+@functools.lru_cache(maxsize=None)
+def brute_force_score(board_player: int, both_boards: int) -> int:
+    moves_played = both_boards.bit_count()
+    children = []
+    for column in range(7):
+        if both_boards & (1 << (column * (HEIGHT_BOARD + 1) + HEIGHT_BOARD - 1)):
+            continue
+        new_both_boards = both_boards | (both_boards + (1 << (column * (HEIGHT_BOARD + 1))))
+        new_board_player = board_player | (new_both_boards ^ both_boards)
+        if connected_four(new_board_player):
+            return (NUMBER_OF_POSITIONS + 1 - moves_played) // 2
+        children.append((new_board_player ^ new_both_boards, new_both_boards))
+    if not children:
+        return 0
+    return max(-brute_force_score(*child) for child in children)
+
+
+def random_endgame_positions(number: int, seed: int) -> [(int, int, BoardPiece)]:
+    random_generator = np.random.default_rng(seed)
+    positions = []
+    while len(positions) < number:
+        board_player_one, board_player_two, player = EMPTY_BOARD, EMPTY_BOARD, PLAYER1
+        for _ in range(random_generator.integers(30, 38)):
+            possible_moves, _ = get_possible_moves(board_player_one, board_player_two, player)
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player,
+                                                                     int(random_generator.choice(possible_moves)))
+            player = BoardPiece(3 - player)
+            if connected_four(board_player_one) or connected_four(board_player_two):
+                break
+        else:
+            positions.append((board_player_one, board_player_two, player))
+    return positions
+
+
+def test_solve_same_as_brute_force():
+    for board_player_one, board_player_two, player in random_endgame_positions(40, 15):
+        board_player = board_player_one if player == PLAYER1 else board_player_two
+        both_boards = board_player_one | board_player_two
+        score, move = solve(board_player_one, board_player_two, player)
+        assert score == brute_force_score(board_player, both_boards)
+        new_board_player_one, new_board_player_two = apply_player_action(board_player_one, board_player_two, player,
+                                                                         move)
+        new_board_player = new_board_player_one if player == PLAYER1 else new_board_player_two
+        if not connected_four(new_board_player):
+            new_both_boards = new_board_player_one | new_board_player_two
+            assert -brute_force_score(new_both_boards ^ new_board_player, new_both_boards) == score
+
+
+def test_solve_immediate_win():
+    board_player_one, board_player_two, player = boards_from_line([0, 3, 0, 3, 0, 3])
+    assert solve(board_player_one, board_player_two, player) == (NUMBER_OF_POSITIONS // 2 + 1 - 4, 0)
+
+
+def test_solve_loss_in_two():
+    board_player_one, board_player_two, player = boards_from_line([3, 3, 2, 2, 4])
+    score, move = solve(board_player_one, board_player_two, player)
+    assert score == -(NUMBER_OF_POSITIONS // 2 + 1 - 4)
+    assert move in (1, 5)
+
+
+def test_solve_forced_win():
+    board_player_one, board_player_two, player = boards_from_line([3, 3, 2, 2])
+    assert solve(board_player_one, board_player_two, player) in [(NUMBER_OF_POSITIONS // 2 + 1 - 4, 1),
+                                                                 (NUMBER_OF_POSITIONS // 2 + 1 - 4, 4)]
+
+
+def test_solve_game_over():
+    board_player_one, board_player_two, player = boards_from_line([0, 3, 0, 3, 0, 3, 0])
+    assert solve(board_player_one, board_player_two, player) == (-(NUMBER_OF_POSITIONS // 2 + 1 - 4), NO_MOVE)
+
+
+def test_solve_middle_game_position():
+    board_player_one, board_player_two, player = boards_from_line([5, 2, 1, 1, 6, 4, 4, 2, 1, 5, 1, 4, 1, 1, 5, 2,
+                                                                   2, 5, 0, 3])
+    solver = Solver(TranspositionTable(4))
+    score, move = solver.solve(board_player_one, board_player_two, player)
+    assert score == 0
+    assert 0 < solver.nodes < 50_000
+    board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player, move)
+    assert solver.solve(board_player_one, board_player_two, BoardPiece(3 - player))[0] == 0
+
+
+def test_solver_stop_flag():
+    stop_flag = multiprocessing.RawValue('b', True)
+    with pytest.raises(SearchInterrupted):
+        solve(*boards_from_line([3, 3, 2, 2, 4, 4, 0]), stop_flag=stop_flag)
+
+
+def test_estimate_solving_seconds():
+    board_player_one, board_player_two, _ = boards_from_line([5, 2, 1, 1, 6, 4, 4, 2, 1, 5, 1, 4, 1, 1, 5, 2, 2, 5,
+                                                              0, 3])
+    assert estimate_solving_seconds(board_player_one, board_player_two) == SOLVER_SECONDS_AT_20_PIECES
+    assert estimate_solving_seconds(EMPTY_BOARD, EMPTY_BOARD) > 1000
+    full_board_player_one, full_board_player_two, _ = boards_from_line([0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 2, 2,
+                                                                        2, 2, 2, 2, 4, 4, 4, 4, 4, 4])
+    assert estimate_solving_seconds(full_board_player_one, full_board_player_two) == SOLVER_MINIMUM_SECONDS
+
+
+def test_solve_endgame():
+    board_player_one, board_player_two, player = boards_from_line([5, 2, 1, 1, 6, 4, 4, 2, 1, 5, 1, 4, 1, 1, 5, 2,
+                                                                   2, 5, 0, 3])
+    assert solve_endgame(board_player_one, board_player_two, player, 10) == \
+           solve(board_player_one, board_player_two, player)
+    assert solve_endgame(board_player_one, board_player_two, player, 0.1) is None
+
+
+def test_solve_endgame_not_affordable():
+    assert solve_endgame(EMPTY_BOARD, EMPTY_BOARD, PLAYER1, 10) is None
+
+
+def test_solve_endgame_interrupted():
+    stop_flag = multiprocessing.RawValue('b', True)
+    assert solve_endgame(*boards_from_line([3, 3, 2, 2, 4, 4, 0]), seconds=10 ** 6, stop_flag=stop_flag) is None
+
+
+def test_generate_move_minimax_solves_endgame():
+    board_player_one, board_player_two, player = boards_from_line([5, 0, 6, 2, 2, 4, 5, 5, 2, 6, 3, 2, 6, 5, 5, 2,
+                                                                   2, 5, 1, 4])
+    start_time = time.monotonic()
+    move, _ = generate_move_minimax(board_player_one, board_player_two, player, None, seconds=5)
+    assert time.monotonic() - start_time < 4
+    assert move == solve(board_player_one, board_player_two, player)[1]
+
+
+def test_solve_endgame_keeps_transposition_table(caplog):
+    board_player_one, board_player_two, player = boards_from_line([5, 0, 6, 2, 2, 4, 5, 5, 2, 6, 3, 2, 6, 5, 5, 2,
+                                                                   2, 5, 1, 4])
+    transposition_table = TranspositionTable(size_mb=1)
+    with caplog.at_level(logging.INFO):
+        solved = solve_endgame(board_player_one, board_player_two, player, 10, transposition_table=transposition_table)
+    assert solved == solve(board_player_one, board_player_two, player)
+    assert "Solved with score" in caplog.text
+    assert any(transposition_table.data)
+
+
+def test_generate_move_minimax_keeps_solver_transposition_table():
+    board_player_one, board_player_two, player = boards_from_line([5, 0, 6, 2, 2, 4, 5, 5, 2, 6, 3, 2, 6, 5, 5, 2,
+                                                                   2, 5, 1, 4])
+    _, saved_state = generate_move_minimax(board_player_one, board_player_two, player, None, seconds=5)
+    solver_transposition_table = saved_state.solver_transposition_table
+    assert solver_transposition_table is not None
+    _, saved_state = generate_move_minimax(board_player_one, board_player_two, player, saved_state, seconds=5)
+    assert saved_state.solver_transposition_table is solver_transposition_table
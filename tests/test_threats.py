@@ -0,0 +1,93 @@
+import numpy as np
+
+from agents.agent_minimax.minimax import generate_move_minimax
+from agents.agent_minimax.minimax_saved_state import MinimaxSavedState
+from agents.agent_minimax.threats import get_playable_positions, get_winning_positions, \
+    get_threat_aware_positions, get_immediate_win, get_threat_aware_moves, COLUMNS_FILLED
+from agents.game_utils import *
+
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+
+
+def brute_force_winning_positions(board_player: int, both_boards: int) -> int:
+    positions = 0
+    for cell in range(BINARY_SIZE):
+        if (1 << cell) & FULL_BOARD and not (1 << cell) & both_boards and \
+                connected_four(board_player | (1 << cell)):
+            positions |= 1 << cell
+    return positions
+
+
+def test_get_playable_positions():
+    board_player_one, board_player_two, _ = boards_from_line([3, 3, 0])
+    playable = get_playable_positions(board_player_one | board_player_two)
+    assert playable == sum(1 << (column * (HEIGHT_BOARD + 1) + {0: 1, 3: 2}.get(column, 0)) for column in range(7))
+
+
+def test_get_playable_positions_full_column():
+    board_player_one, board_player_two, _ = boards_from_line([3] * 6)
+    assert not get_playable_positions(board_player_one | board_player_two) & COLUMNS_FILLED[3]
+
+
+def test_get_winning_positions_same_as_brute_force():
+    random_generator = np.random.default_rng(14)
+    for _ in range(300):
+        board_player_one, board_player_two, player = EMPTY_BOARD, EMPTY_BOARD, PLAYER1
+        for _ in range(random_generator.integers(0, 40)):
+            possible_moves, game_state = get_possible_moves(board_player_one, board_player_two, player)
+            if not possible_moves:
+                break
+            board_player_one, board_player_two = apply_player_action(board_player_one, board_player_two, player,
+                                                                     int(random_generator.choice(possible_moves)))
+            player = BoardPiece(3 - player)
+        both_boards = board_player_one | board_player_two
+        for board_player in (board_player_one, board_player_two):
+            if not connected_four(board_player):
+                assert get_winning_positions(board_player, both_boards) == \
+                       brute_force_winning_positions(board_player, both_boards)
+
+
+def test_get_immediate_win():
+    board_player_one, board_player_two, player = boards_from_line([3, 3, 2, 2, 4, 4])
+    assert get_immediate_win(board_player_one, board_player_two, player) in (1, 5)
+    assert get_immediate_win(board_player_one, board_player_two, PLAYER2) is None
+
+
+def test_get_immediate_win_none():
+    assert get_immediate_win(EMPTY_BOARD, EMPTY_BOARD, PLAYER1) is None
+
+
+def test_get_threat_aware_moves_forced_block():
+    board_player_one, board_player_two, player = boards_from_line([1, 0, 2, 0, 3])
+    assert get_threat_aware_moves(board_player_one, board_player_two, player) == ([4], GameState.STILL_PLAYING)
+    board_player_one, board_player_two, player = boards_from_line([0, 3, 0, 3, 0])
+    assert get_threat_aware_moves(board_player_one, board_player_two, player)[0] == [0]
+
+
+def test_get_threat_aware_moves_immediate_win():
+    board_player_one, board_player_two, player = boards_from_line([0, 3, 0, 3, 0, 3])
+    assert get_threat_aware_moves(board_player_one, board_player_two, player)[0] == [0]
+
+
+def test_get_threat_aware_moves_below_winning_cell():
+    # Player one wins at the second row of column three, player two must not play into column three.
+    board_player_one, board_player_two, player = boards_from_line([0, 1, 0, 0, 1, 2, 2])
+    assert get_winning_positions(board_player_one, board_player_one | board_player_two) == \
+           1 << (3 * (HEIGHT_BOARD + 1) + 1)
+    moves, _ = get_threat_aware_moves(board_player_one, board_player_two, player)
+    assert 3 not in moves
+    assert len(moves) == 6
+
+
+def test_get_threat_aware_positions_all_moves_lose():
+    board_player_one, board_player_two, _ = boards_from_line([0, 3, 0, 2, 6, 4])
+    playable = get_playable_positions(board_player_one | board_player_two)
+    assert get_threat_aware_positions(board_player_one, board_player_two) == playable
+
+
+def test_generate_move_minimax_plays_immediate_win():
+    board_player_one, board_player_two, player = boards_from_line([0, 3, 0, 3, 0, 3])
+    saved_state = MinimaxSavedState(transposition_table_size_mb=1)
+    assert generate_move_minimax(board_player_one, board_player_two, player, saved_state, seconds=1,
+                                 game_milliseconds=10_000) == (0, saved_state)
+    assert saved_state.clock.remaining_milliseconds <= 10_000
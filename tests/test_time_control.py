@@ -0,0 +1,79 @@
+import math
+import multiprocessing
+import time
+import pytest
+
+from agents.agent_minimax.time_control import *
+
+EMPTY_BOARD: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+DRAW_PLAYER_ONE: int = 0b0001010_0010101_0111011_0101110_0000100_0010100_0100011
+DRAW_PLAYER_TWO: int = 0b0110101_0101010_0000100_0010001_0111011_0101011_0011100
+
+
+def test_search_deadline_not_passed():
+    deadline = SearchDeadline(time.monotonic() + 60)
+    assert not any(deadline.value for _ in range(2 * NODES_BETWEEN_TIME_CHECKS))
+
+
+def test_search_deadline_passed():
+    deadline = SearchDeadline(time.monotonic() - 1)
+    values = [deadline.value for _ in range(NODES_BETWEEN_TIME_CHECKS)]
+    assert values[-1]
+    assert not values[0]  # The time is only checked every NODES_BETWEEN_TIME_CHECKS nodes.
+
+
+def test_search_deadline_stop_flag():
+    stop_flag = multiprocessing.RawValue('b', False)
+    deadline = SearchDeadline(time.monotonic() + 60, stop_flag)
+    assert not deadline.value
+    stop_flag.value = True
+    assert deadline.value
+
+
+def test_game_clock_get_budget_milliseconds():
+    clock = GameClock(12_000, 100)
+    assert clock.get_budget_milliseconds(EMPTY_BOARD, EMPTY_BOARD) == 12_000 // MOVES_TO_GO + 100
+    # Only one move is left for the player.
+    assert clock.get_budget_milliseconds(DRAW_PLAYER_ONE & ~0b1, DRAW_PLAYER_TWO & ~0b1) == \
+           12_000 - SAFETY_MARGIN_MILLISECONDS
+
+
+def test_game_clock_get_budget_milliseconds_no_time_left():
+    clock = GameClock(20)
+    assert clock.get_budget_milliseconds(EMPTY_BOARD, EMPTY_BOARD) == MIN_BUDGET_MILLISECONDS
+
+
+def test_game_clock_update():
+    clock = GameClock(1000, 100)
+    clock.update(300)
+    assert clock.remaining_milliseconds == 800
+
+
+def test_get_time_budget():
+    assert get_time_budget(2, None, None, EMPTY_BOARD, EMPTY_BOARD) == 2
+    assert get_time_budget(2, 300, None, EMPTY_BOARD, EMPTY_BOARD) == 0.3
+    assert get_time_budget(2, 300, GameClock(12_000), EMPTY_BOARD, EMPTY_BOARD) == 1
+
+
+def test_predict_iteration_seconds():
+    assert predict_iteration_seconds([0.1], [100]) is None
+    assert predict_iteration_seconds([0.1, 0.4], [100, 400]) == pytest.approx(1.6)
+    assert predict_iteration_seconds([0.0, 0.1], [0, 100]) is None
+
+
+def test_stable_best_move():
+    stable_best_move = StableBestMove(2)
+    assert not stable_best_move.update(3, 0.1, 100, 10)
+    assert not stable_best_move.update(2, 0.4, 400, 10)
+    # The best move is stable, but the next iteration is predicted to finish in time.
+    assert not stable_best_move.update(2, 1.6, 1600, 10)
+    assert stable_best_move.update(2, 3.2, 3200, 5)
+    assert not stable_best_move.update(4, 6.4, 6400, 1)
+
+
+def test_ponder_deadline():
+    shared_deadline = multiprocessing.RawValue('d', math.inf)
+    deadline = PonderDeadline(shared_deadline)
+    assert not any(deadline.value for _ in range(2 * NODES_BETWEEN_TIME_CHECKS))
+    shared_deadline.value = time.monotonic() - 1  # A ponder hit after the time of the move.
+    assert any(deadline.value for _ in range(NODES_BETWEEN_TIME_CHECKS))
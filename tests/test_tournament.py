@@ -0,0 +1,132 @@
+import pytest
+
+from agents.game_record import get_final_boards, get_winner, read_game_records
+from agents.game_utils import *
+import tournament
+from tournament import main, calculate_elo, calculate_wilson_interval, generate_move_random, generate_openings, \
+    play_game, run_tournament, summarize_results
+
+
+def test_generate_move_random():
+    board_player_one, board_player_two = string_to_board(
+        "|==============|\n"
+        "|X             |\n"
+        "|O             |\n"
+        "|X             |\n"
+        "|O             |\n"
+        "|X             |\n"
+        "|O             |\n"
+        "|==============|\n"
+        "|0 1 2 3 4 5 6 |")
+    moves = {int(generate_move_random(board_player_one, board_player_two, PLAYER1, None, seed)[0])
+             for seed in range(50)}
+    assert moves == {1, 2, 3, 4, 5, 6}
+
+
+def test_generate_openings():
+    openings = generate_openings(number=20, plies=6, seed=1)
+    assert len(openings) == 20
+    assert all(len(opening) == 6 for opening in openings)
+    assert openings == generate_openings(number=20, plies=6, seed=1)
+    assert openings != generate_openings(number=20, plies=6, seed=2)
+
+
+def test_play_game():
+    record = play_game("random", "random", [3, 3], 10)
+    assert record["opening"] == [3, 3]
+    assert len(record["moves"]) == len(record["milliseconds"]) == len(record["depths"])
+    assert record["depths"] == record["scores"] == record["nodes"] == [None] * len(record["moves"])
+    assert record["winner"] in (0, PLAYER1, PLAYER2)
+    board_player_one, board_player_two = get_final_boards(record)
+    assert get_winner(board_player_one, board_player_two) == record["winner"]
+    assert record["winner"] or board_player_one | board_player_two == FULL_BOARD
+
+
+def test_play_game_records_search():
+    record = play_game("pvs", "random", [], 50)
+    assert all(depth >= 0 for depth in record["depths"][::2])
+    assert any(depth > 0 for depth in record["depths"][::2])
+    assert any(score is not None for score in record["scores"][::2])
+    assert any(nodes > 0 for nodes in record["nodes"][::2])
+    assert record["scores"][1::2] == record["nodes"][1::2] == [None] * (len(record["moves"]) // 2)
+    assert record["winner"] == PLAYER1
+
+
+def test_play_game_rejects_illegal_move(monkeypatch):
+    def generate_move_left_column(board_player_one, board_player_two, player, saved_state):
+        return PlayerAction(0), saved_state
+
+    monkeypatch.setattr(tournament, "get_agent", lambda name, milliseconds: generate_move_left_column)
+    # The opening fills the left column.
+    with pytest.raises(ValueError, match="Agent random played the illegal move 0"):
+        play_game("random", "pvs", [0, 0, 0, 0, 0, 0], 20)
+
+
+def test_calculate_elo():
+    assert calculate_elo(0.5) == 0
+    assert calculate_elo(0.75) == pytest.approx(190.85, abs=0.01)
+    assert calculate_elo(0.25) == pytest.approx(-190.85, abs=0.01)
+    assert calculate_elo(1.0) == -calculate_elo(0.0) > 0
+
+
+def test_summarize_results():
+    summary = summarize_results(wins=60, draws=20, losses=20)
+    assert summary["games"] == 100
+    assert summary["score"] == pytest.approx(0.7)
+    assert summary["win_rate"] == pytest.approx(0.6)
+    assert summary["score_interval"][0] < 0.7 < summary["score_interval"][1]
+    assert summary["win_rate_interval"][0] < 0.6 < summary["win_rate_interval"][1]
+    assert summary["elo_interval"][0] < summary["elo"] < summary["elo_interval"][1]
+    # More games give narrower intervals.
+    more_games = summarize_results(wins=600, draws=200, losses=200)
+    assert more_games["score_interval"][1] - more_games["score_interval"][0] < \
+           summary["score_interval"][1] - summary["score_interval"][0]
+
+
+def test_calculate_wilson_interval():
+    lower, upper = calculate_wilson_interval(proportion=0.5, games=100, z=1.96)
+    assert lower == pytest.approx(0.4038, abs=0.0001)
+    assert upper == pytest.approx(0.5962, abs=0.0001)
+    # All games won still leave room below.
+    lower, upper = calculate_wilson_interval(proportion=1.0, games=10, z=1.96)
+    assert lower == pytest.approx(0.7225, abs=0.0001)
+    assert upper == 1.0
+
+
+def test_summarize_results_all_won():
+    summary = summarize_results(wins=10, draws=0, losses=0)
+    assert summary["score_interval"][0] < 1.0
+    assert summary["elo_interval"][0] == calculate_elo(summary["score_interval"][0]) < summary["elo"]
+
+
+def test_run_tournament_rejects_duplicate_agents():
+    with pytest.raises(ValueError):
+        run_tournament(["pvs", "pvs"], games=2)
+
+
+def test_main_rejects_duplicate_agents():
+    with pytest.raises(SystemExit):
+        main(["--agents", "pvs", "pvs"])
+
+
+def test_run_tournament():
+    records = []
+    # Enough time for pvs to beat the random agent every game, even if the processes share one CPU.
+    summaries = run_tournament(["random", "pvs"], games=4, milliseconds=100, processes=1, on_game=records.append)
+    assert list(summaries) == [("random", "pvs")]
+    assert summaries[("random", "pvs")]["games"] == 4
+    assert summaries[("random", "pvs")]["losses"] == 4
+    assert len(records) == 4
+    # Every opening is played with both agents starting.
+    assert sorted((record["agent_one"], tuple(record["opening"])) for record in records) == \
+           sorted((agent, tuple(opening)) for agent in ("random", "pvs")
+                  for opening in generate_openings(number=2, plies=4, seed=0))
+
+
+def test_main_writes_records(tmp_path, capsys):
+    path = str(tmp_path / "games.jsonl")
+    main(["--agents", "random", "pvs", "--games", "2", "--milliseconds", "20", "--processes", "1", "--records", path])
+    assert "random vs pvs: " in capsys.readouterr().out
+    records = list(read_game_records(path))
+    assert len(records) == 2
+    assert all(get_winner(*get_final_boards(record)) == record["winner"] for record in records)
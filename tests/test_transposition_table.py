@@ -0,0 +1,182 @@
+import multiprocessing
+import pickle
+import pytest
+
+from agents.agent_minimax.transposition_table import *
+
+EMPTY_BOARD_KEY: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000000
+LEFT_TOWER_ONE_BOARD_KEY: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000010
+MIDDLE_TOWER_ONE_BOARD_KEY: int = 0b0000000_0000000_0000000_0000010_0000000_0000000_0000000
+
+
+def test_pack_entry_unpack_entry():
+    for evaluation, depth, bound, move in [(0, 0, BOUND_EXACT, 0), (-3, 8, BOUND_LOWER, 6),
+                                           (100 * 2 ** 42, 42, BOUND_UPPER, NO_MOVE),
+                                           (-100 * 2 ** 42, MAX_DEPTH, BOUND_EXACT, 3)]:
+        data = pack_entry(evaluation, depth, bound, move, 5)
+        assert data != 0
+        assert data < 2 ** 64
+        assert unpack_entry(data) == (evaluation, depth, bound, move)
+
+
+def test_transposition_table_size():
+    transposition_table = TranspositionTable(1)
+    assert transposition_table.number_of_buckets == previous_prime(2 ** 20 // BYTES_PER_BUCKET)
+    assert len(transposition_table.data) * WORDS_PER_ENTRY * 8 <= 2 ** 20
+    assert len(transposition_table) == 0
+
+
+def test_previous_prime():
+    assert previous_prime(2) == 2
+    assert previous_prime(14) == 13
+    assert previous_prime(97) == 97
+
+
+def test_transposition_table_get_entry_empty():
+    transposition_table = TranspositionTable(1)
+    assert transposition_table.get_entry(EMPTY_BOARD_KEY) is None
+
+
+def test_transposition_table_store_entry():
+    transposition_table = TranspositionTable(1)
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 7, 4, BOUND_LOWER, 2)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (7, 4, BOUND_LOWER, 2)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) is None
+    assert len(transposition_table) == 1
+
+
+def test_transposition_table_depth_preferred_replacement():
+    transposition_table = TranspositionTable(1)
+    transposition_table.number_of_buckets = 1  # Force all positions into the same bucket.
+    transposition_table.store_entry(EMPTY_BOARD_KEY, 1, 6, BOUND_EXACT, 3)
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 2, 2, BOUND_EXACT, 3)
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 3, 1, BOUND_EXACT, 3)
+    # The deep entry is kept, the always-replace entry holds the newest shallow entry.
+    assert transposition_table.get_entry(EMPTY_BOARD_KEY) == (1, 6, BOUND_EXACT, 3)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) is None
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (3, 1, BOUND_EXACT, 3)
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 2, 7, BOUND_EXACT, 3)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) == (2, 7, BOUND_EXACT, 3)
+    assert transposition_table.get_entry(EMPTY_BOARD_KEY) is None
+
+
+def test_transposition_table_new_search_replaces_old_entries():
+    transposition_table = TranspositionTable(1)
+    transposition_table.number_of_buckets = 1
+    transposition_table.store_entry(EMPTY_BOARD_KEY, 1, 6, BOUND_EXACT, 3)
+    transposition_table.new_search()
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 2, 1, BOUND_EXACT, 3)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) == (2, 1, BOUND_EXACT, 3)
+    assert transposition_table.get_entry(EMPTY_BOARD_KEY) is None
+
+
+def test_transposition_table_torn_entry_ignored():
+    transposition_table = TranspositionTable(1)
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 7, 4, BOUND_LOWER, 2)
+    index = LEFT_TOWER_ONE_BOARD_KEY % transposition_table.number_of_buckets * ENTRIES_PER_BUCKET
+    # Data word of another entry written without its key.
+    transposition_table.data[index] = pack_entry(3, 5, BOUND_EXACT, 1, 0)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) is None
+
+
+def test_shared_transposition_table_store_entry():
+    transposition_table = SharedTranspositionTable(1)
+    assert transposition_table.number_of_buckets == TranspositionTable(1).number_of_buckets
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 7, 4, BOUND_LOWER, 2)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (7, 4, BOUND_LOWER, 2)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) is None
+    assert len(transposition_table) == 1
+    transposition_table.close()
+
+
+def test_shared_transposition_table_pickle_attaches():
+    transposition_table = SharedTranspositionTable(1)
+    transposition_table.new_search()
+    attached_table = pickle.loads(pickle.dumps(transposition_table))
+    assert len(pickle.dumps(transposition_table)) < 1000  # The entries are not copied.
+    assert attached_table.generation == 1
+    attached_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 7, 4, BOUND_LOWER, 2)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (7, 4, BOUND_LOWER, 2)
+    attached_table.new_search()
+    assert transposition_table.generation == 2
+    attached_table.close()
+    transposition_table.close()
+
+
+def store_entry_in_process(transposition_table: SharedTranspositionTable):
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, -5, 3, BOUND_UPPER, 6)
+
+
+def test_shared_transposition_table_other_process():
+    transposition_table = SharedTranspositionTable(1)
+    for context in ("fork", "spawn"):
+        process = multiprocessing.get_context(context).Process(target=store_entry_in_process,
+                                                               args=(transposition_table,))
+        process.start()
+        process.join()
+        assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY) == (-5, 3, BOUND_UPPER, 6)
+        transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 0, 0, BOUND_EXACT, 0)
+    transposition_table.close()
+
+
+def test_shared_transposition_table_close_frees_memory():
+    transposition_table = SharedTranspositionTable(1)
+    name = transposition_table.shared_memory.name
+    transposition_table.close()
+    with pytest.raises(FileNotFoundError):
+        SharedTranspositionTable(1, name)
+
+
+def test_get_canonical_key_mirrored():
+    left_tower: int = 0b0000000_0000000_0000000_0000000_0000000_0000000_0000001
+    right_tower: int = 0b0000001_0000000_0000000_0000000_0000000_0000000_0000000
+    assert get_canonical_key(left_tower, 0) == (LEFT_TOWER_ONE_BOARD_KEY, False)
+    assert get_canonical_key(right_tower, 0) == (LEFT_TOWER_ONE_BOARD_KEY, True)
+    assert get_canonical_key(0, 0) == (EMPTY_BOARD_KEY, False)
+
+
+def test_mirror_move():
+    assert mirror_move(0) == 6
+    assert mirror_move(3) == 3
+    assert mirror_move(NO_MOVE) == NO_MOVE
+
+
+def test_save_entry_in_transposition_table_mirrored_move():
+    right_tower: int = 0b0000001_0000000_0000000_0000000_0000000_0000000_0000000
+    transposition_table = TranspositionTable(1)
+    save_entry_in_transposition_table(right_tower, 0, transposition_table, 7, 4, BOUND_EXACT, 5)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (7, 4, BOUND_EXACT, 1)
+    assert get_entry_from_transposition_table(right_tower, 0, transposition_table) == (7, 4, BOUND_EXACT, 5)
+
+
+def test_mate_evaluation_independent_of_depth():
+    transposition_table = TranspositionTable(1)
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, START_VALUE * 2 ** 3, 5, BOUND_EXACT, 2)
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, -START_VALUE * 2 ** 3, 5, BOUND_EXACT, 2)
+    # The game ends two moves after the positions.
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY) == (START_VALUE * 2 ** 3, 5, BOUND_EXACT, 2)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY, 3) == (START_VALUE * 2, 5, BOUND_EXACT, 2)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 4) == (-START_VALUE * 4, 5, BOUND_EXACT, 2)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 1) == (-START_VALUE, 5, BOUND_EXACT, 2)
+
+
+def test_high_board_evaluation_independent_of_mates():
+    transposition_table = TranspositionTable(1)
+    # The windows of a board can evaluate to more than 100, which must not be saved as a win or loss.
+    transposition_table.store_entry(LEFT_TOWER_ONE_BOARD_KEY, 109, 5, BOUND_EXACT, 2)
+    transposition_table.store_entry(MIDDLE_TOWER_ONE_BOARD_KEY, -125, 5, BOUND_LOWER, 4)
+    assert transposition_table.get_entry(LEFT_TOWER_ONE_BOARD_KEY, 1) == (109, 5, BOUND_EXACT, 2)
+    assert transposition_table.get_entry(MIDDLE_TOWER_ONE_BOARD_KEY, 9) == (-125, 5, BOUND_LOWER, 4)
+
+
+def test_is_mate_evaluation():
+    assert is_mate_evaluation(START_VALUE) and is_mate_evaluation(-START_VALUE * 2 ** 3)
+    assert is_mate_evaluation(encode_mate_evaluation(START_VALUE * 2 ** 3, 5))
+    assert not is_mate_evaluation(125) and not is_mate_evaluation(-1104)
+
+
+def test_encode_mate_evaluation_bounds():
+    assert decode_mate_evaluation(encode_mate_evaluation(START_VALUE * 2 ** 4 + 1, 6), 6) == START_VALUE * 2 ** 4
+    assert decode_mate_evaluation(encode_mate_evaluation(START_VALUE * 2 ** 4 - 1, 6), 6) == START_VALUE * 2 ** 3
+    assert decode_mate_evaluation(encode_mate_evaluation(-START_VALUE * 2 ** 4 - 1, 6), 6) == -START_VALUE * 2 ** 4
+    assert decode_mate_evaluation(encode_mate_evaluation(-START_VALUE, 0), 2) == -START_VALUE * 2 ** 2
@@ -0,0 +1,374 @@
+"""
+Headless tournament between agents: plays games in parallel processes, every opening once with each agent starting,
+and reports the score, the Elo difference and the win rate of every pairing with 95 % Wilson confidence intervals.
+
+Run from the root of the project:
+    python -m tournament --agents pvs minimax --games 200 --milliseconds 200 --processes 4 --records games.jsonl
+"""
+from typing import Optional, Callable
+import argparse
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import math
+import os
+import statistics
+import time
+
+import numpy as np
+
+from agents import generate_move_minimax
+from agents.agent_minimax.negamax import generate_move_negamax_id, generate_move_pvs_id
+from agents.game_record import GameRecordWriter, create_game_record, add_move
+from agents.game_utils import BoardPiece, PlayerAction, GameState, GenMove, PLAYER1, PLAYER2, apply_player_action, \
+    check_end_state, get_possible_moves
+from agents.saved_state import SavedState
+
+MILLISECONDS_PER_MOVE: int = 200
+OPENING_PLIES: int = 4
+CONFIDENCE: float = 0.95
+MAX_ELO: float = 2000.0  # Elo differences of scores of 0 or 1 are reported as this value.
+# Search functions of the agents playing with generate_move_minimax, None for its default search and the random
+# baseline.
+AGENTS: dict = {"minimax": None, "negamax": generate_move_negamax_id, "pvs": generate_move_pvs_id, "random": None}
+
+
+def generate_move_random(board_player_one: int, board_player_two: int, player: BoardPiece,
+                         saved_state: Optional[SavedState], seed: Optional[int] = None) -> \
+        tuple[PlayerAction, Optional[SavedState]]:
+    """
+    Plays a random legal move, as a baseline for the tournament.
+
+    Parameters
+    ----------
+    board_player_one: int
+        Board player one.
+    board_player_two: int
+        Board player two.
+    player: BoardPiece
+        The player to make a move.
+    saved_state: Optional[SavedState]
+        Not used, returned as it is.
+    seed: Optional[int]
+        Seed of the random generator.
+
+    Returns
+    -------
+    :tuple[PlayerAction, Optional[SavedState]]
+        Tuple containing the move to play and the saved state.
+    """
+    moves, _ = get_possible_moves(board_player_one=board_player_one, board_player_two=board_player_two, player=player)
+    return PlayerAction(np.random.default_rng(seed).choice(moves)), saved_state
+
+
+def get_agent(name: str, milliseconds: int) -> GenMove:
+    """
+    Creates the generate_move function of an agent of the tournament.
+
+    Parameters
+    ----------
+    name: str
+        Name of the agent, a key of AGENTS.
+    milliseconds: int
+        Time per move.
+
+    Returns
+    -------
+    :GenMove
+        The generate_move function of the agent.
+    """
+    if name == "random":
+        return generate_move_random
+    return functools.partial(generate_move_minimax, milliseconds=milliseconds, search_function=AGENTS[name])
+
+
+def generate_openings(number: int, plies: int, seed: int) -> [[PlayerAction]]:
+    """
+    Generates random openings, none of them ending the game.
+
+    Parameters
+    ----------
+    number: int
+        Number of openings.
+    plies: int
+        Number of moves of every opening.
+    seed: int
+        Seed of the random generator.
+
+    Returns
+    -------
+    :[[PlayerAction]]
+        The moves of every opening, starting with player one.
+    """
+    random_generator = np.random.default_rng(seed)
+    openings: [[PlayerAction]] = []
+    while len(openings) < number:
+        board_player_one, board_player_two, player = 0, 0, PLAYER1
+        opening: [PlayerAction] = []
+        for _ in range(plies):
+            moves, game_state = get_possible_moves(board_player_one=board_player_one,
+                                                   board_player_two=board_player_two, player=player)
+            if game_state != GameState.STILL_PLAYING:
+                break
+            opening.append(int(random_generator.choice(moves)))
+            board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                     board_player_two=board_player_two,
+                                                                     player=player, action=opening[-1])
+            player = PLAYER2 if player == PLAYER1 else PLAYER1
+        if check_end_state(board_player_one=board_player_one, board_player_two=board_player_two,
+                           player=PLAYER2 if player == PLAYER1 else PLAYER1) == GameState.STILL_PLAYING:
+            openings.append(opening)
+    return openings
+
+
+def play_game(agent_one: str, agent_two: str, opening: [PlayerAction], milliseconds: int) -> dict:
+    """
+    Plays one game after the given opening, without printing anything. Target of the tournament processes.
+
+    Parameters
+    ----------
+    agent_one: str
+        Name of the agent playing as player one.
+    agent_two: str
+        Name of the agent playing as player two.
+    opening: [PlayerAction]
+        Moves played before the agents take over, starting with player one.
+    milliseconds: int
+        Time per move.
+
+    Raises
+    ----------
+    ValueError
+        If an agent plays a move outside the board or into a full column, the result of the game would be meaningless.
+
+    Returns
+    -------
+    :dict
+        The game record, see agents.game_record. The depth, score and nodes of a move are None if the agent does not
+        report them.
+    """
+    names: {BoardPiece: str} = {PLAYER1: agent_one, PLAYER2: agent_two}
+    generate_moves: {BoardPiece: GenMove} = {PLAYER1: get_agent(name=agent_one, milliseconds=milliseconds),
+                                             PLAYER2: get_agent(name=agent_two, milliseconds=milliseconds)}
+    saved_states: {BoardPiece: Optional[SavedState]} = {PLAYER1: None, PLAYER2: None}
+    board_player_one, board_player_two, player = 0, 0, PLAYER1
+    for move in opening:
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=move)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    record: dict = create_game_record(agent_one=agent_one, agent_two=agent_two, opening=opening)
+    while True:
+        start_time: float = time.monotonic()
+        move, saved_states[player] = generate_moves[player](board_player_one, board_player_two, player,
+                                                            saved_states[player])
+        moves, _ = get_possible_moves(board_player_one=board_player_one, board_player_two=board_player_two,
+                                      player=player)
+        if move not in moves:
+            raise ValueError("Agent {} played the illegal move {} after the moves {}".format(
+                names[player], move, " ".join(str(played) for played in record["opening"] + record["moves"])))
+        add_move(record=record, move=move, milliseconds=round((time.monotonic() - start_time) * 1000),
+                 depth=getattr(saved_states[player], "depth", None),
+                 score=getattr(saved_states[player], "evaluation", None),
+                 nodes=getattr(saved_states[player], "nodes", None))
+        board_player_one, board_player_two = apply_player_action(board_player_one=board_player_one,
+                                                                 board_player_two=board_player_two, player=player,
+                                                                 action=record["moves"][-1])
+        game_state: GameState = check_end_state(board_player_one=board_player_one,
+                                                board_player_two=board_player_two, player=player)
+        if game_state != GameState.STILL_PLAYING:
+            record["winner"] = int(player) if game_state == GameState.IS_WIN else 0
+            return record
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+
+
+def calculate_elo(score: float) -> float:
+    """
+    Calculates the Elo difference corresponding to the expected score against the opponent.
+
+    Parameters
+    ----------
+    score: float
+        Expected score, between 0 and 1.
+
+    Returns
+    -------
+    :float
+        The Elo difference, clipped to MAX_ELO.
+    """
+    if score <= 0:
+        return -MAX_ELO
+    if score >= 1:
+        return MAX_ELO
+    return max(-MAX_ELO, min(MAX_ELO, -400 * math.log10(1 / score - 1)))
+
+
+def calculate_wilson_interval(proportion: float, games: int, z: float) -> tuple[float, float]:
+    """
+    Calculates the Wilson score interval of a proportion. Other than the normal approximation, it stays within 0 and 1
+    and does not shrink to a single point when all games end the same way.
+
+    Parameters
+    ----------
+    proportion: float
+        Observed proportion, between 0 and 1.
+    games: int
+        Number of games the proportion was observed in.
+    z: float
+        Quantile of the standard normal distribution of the confidence level.
+
+    Returns
+    -------
+    :tuple[float, float]
+        Lower and upper bound of the interval.
+    """
+    denominator: float = 1 + z ** 2 / games
+    center: float = (proportion + z ** 2 / (2 * games)) / denominator
+    margin: float = z / denominator * math.sqrt(proportion * (1 - proportion) / games + z ** 2 / (4 * games ** 2))
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def summarize_results(wins: int, draws: int, losses: int, confidence: float = CONFIDENCE) -> dict:
+    """
+    Summarizes the results of one agent against another with Wilson score intervals, see calculate_wilson_interval.
+    The score is treated like a proportion, a draw counting half, which makes its interval a bit wider than needed if
+    there are draws. The bounds of the Elo difference are the Elo differences of the bounds of the score.
+
+    Parameters
+    ----------
+    wins: int
+        Number of games won.
+    draws: int
+        Number of games drawn.
+    losses: int
+        Number of games lost.
+    confidence: float
+        Confidence level of the intervals.
+
+    Returns
+    -------
+    :dict
+        The number of games, the score (a draw counts half) and the win rate, each with its confidence interval, and
+        the Elo difference with its confidence interval.
+    """
+    games: int = wins + draws + losses
+    z: float = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    score: float = (wins + draws / 2) / games
+    score_interval: tuple[float, float] = calculate_wilson_interval(proportion=score, games=games, z=z)
+    win_rate: float = wins / games
+    return dict(games=games, wins=wins, draws=draws, losses=losses, score=score, score_interval=score_interval,
+                win_rate=win_rate, win_rate_interval=calculate_wilson_interval(proportion=win_rate, games=games, z=z),
+                elo=calculate_elo(score=score),
+                elo_interval=(calculate_elo(score=score_interval[0]), calculate_elo(score=score_interval[1])))
+
+
+def run_tournament(agents: [str], games: int, milliseconds: int = MILLISECONDS_PER_MOVE,
+                   processes: Optional[int] = None, opening_plies: int = OPENING_PLIES, seed: int = 0,
+                   on_game: Optional[Callable[[dict], None]] = None) -> dict[tuple[str, str], dict]:
+    """
+    Plays every pairing of the agents. Every opening is played twice, once with each agent starting. The games are
+    played in a ProcessPoolExecutor, whose worker processes are not daemonic, so the agents can start their own
+    search processes.
+
+    Parameters
+    ----------
+    agents: [str]
+        Names of the agents, keys of AGENTS, each at most once.
+    games: int
+        Number of games of every pairing, rounded up to an even number.
+    milliseconds: int
+        Time per move.
+    processes: Optional[int]
+        Number of games played at the same time, the number of CPUs if it is None.
+    opening_plies: int
+        Number of random moves played before the agents take over.
+    seed: int
+        Seed of the random openings.
+    on_game: Optional[Callable[[dict], None]]
+        Called with the record of every finished game, see play_game.
+
+    Raises
+    ----------
+    ValueError
+        If an agent is given more than once, its games could not be told apart from the games of the pairing.
+
+    Returns
+    -------
+    :dict[tuple[str, str], dict]
+        The summary of the results of the first agent of every pairing against the second, see summarize_results.
+    """
+    if len(set(agents)) != len(agents):
+        raise ValueError("Every agent can only take part once: {}".format(" ".join(agents)))
+    openings: [[PlayerAction]] = generate_openings(number=(games + 1) // 2, plies=opening_plies, seed=seed)
+    results: {tuple[str, str]: [int]} = {pairing: [0, 0, 0] for pairing in itertools.combinations(agents, 2)}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+        futures = [executor.submit(play_game, agent_one, agent_two, opening, milliseconds)
+                   for (agent_a, agent_b), opening in itertools.product(results, openings)
+                   for agent_one, agent_two in ((agent_a, agent_b), (agent_b, agent_a))]
+        for future in concurrent.futures.as_completed(futures):
+            record: dict = future.result()
+            if on_game is not None:
+                on_game(record)
+            pairing_reversed: bool = (record["agent_one"], record["agent_two"]) not in results
+            pairing: tuple[str, str] = (record["agent_two"], record["agent_one"]) if pairing_reversed else \
+                (record["agent_one"], record["agent_two"])
+            if record["winner"] == 0:
+                results[pairing][1] += 1
+            else:
+                first_agent_won: bool = (record["winner"] == PLAYER1) != pairing_reversed
+                results[pairing][0 if first_agent_won else 2] += 1
+    return {pairing: summarize_results(*result) for pairing, result in results.items()}
+
+
+def format_summary(pairing: tuple[str, str], summary: dict) -> str:
+    """
+    Formats the summary of a pairing for printing.
+
+    Parameters
+    ----------
+    pairing: tuple[str, str]
+        Names of the two agents.
+    summary: dict
+        Results of the first agent against the second, see summarize_results.
+
+    Returns
+    -------
+    :str
+        One line describing the results.
+    """
+    return "{} vs {}: +{} ={} -{} | score {:.3f} [{:.3f}, {:.3f}] | win rate {:.3f} [{:.3f}, {:.3f}] | " \
+           "elo {:+.0f} [{:+.0f}, {:+.0f}]".format(pairing[0], pairing[1], summary["wins"], summary["draws"],
+                                                  summary["losses"], summary["score"], *summary["score_interval"],
+                                                  summary["win_rate"], *summary["win_rate_interval"],
+                                                  summary["elo"], *summary["elo_interval"])
+
+
+def main(arguments: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", nargs="+", choices=sorted(AGENTS), default=["pvs", "minimax"],
+                        help="agents playing every other agent")
+    parser.add_argument("--games", type=int, default=100, help="games of every pairing")
+    parser.add_argument("--milliseconds", type=int, default=MILLISECONDS_PER_MOVE, help="time per move")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="games played at the same time")
+    parser.add_argument("--opening-plies", type=int, default=OPENING_PLIES, help="random moves of every opening")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random openings")
+    parser.add_argument("--records", help="game record file to append the games to, compressed if it ends with .gz")
+    arguments = parser.parse_args(arguments)
+    if len(set(arguments.agents)) != len(arguments.agents):
+        parser.error("every agent can only be given once")
+    with contextlib.ExitStack() as stack:
+        on_game: Optional[Callable[[dict], None]] = None
+        if arguments.records is not None:
+            on_game = stack.enter_context(GameRecordWriter(path=arguments.records)).write
+        summaries: dict[tuple[str, str], dict] = run_tournament(agents=arguments.agents, games=arguments.games,
+                                                                milliseconds=arguments.milliseconds,
+                                                                processes=arguments.processes,
+                                                                opening_plies=arguments.opening_plies,
+                                                                seed=arguments.seed, on_game=on_game)
+    for pairing, summary in summaries.items():
+        print(format_summary(pairing=pairing, summary=summary))
+
+
+if __name__ == "__main__":
+    main()